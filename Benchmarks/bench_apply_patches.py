@@ -0,0 +1,337 @@
+#
+# Benchmark (and check): applying a seed's patches offline with Scripts/apply_patches.py.
+# We don't ship the game's assets, so we generate a "maximal" seed (the 'everything' preset, plus players with each of the
+#   starting-party options) and build a synthetic MagiciteExport for it (see make_fixture()): every asset the seed patches,
+#   with just enough in it for each patch to find what it expects (the right mnemonic/label, enough Mnemonics after it,
+#   every treasure property, every master csv row), plus --pad filler Mnemonics per script to make them a realistic size.
+# Then we:
+#   * apply every player's patches serially (--jobs 1) and with N worker processes, and check that both report the same
+#     results, with no errors
+#   * write out the first seed's patched assets (--out), and check that each InlinePatch'd script decodes to the original
+#     one with its snippets written in (and is stored under the same key)
+#   * break the fixture in a few ways (a script that's too short, a label in the way, the wrong mnemonic, a missing treasure
+#     property, a missing master csv row) and check that each is reported
+#
+# Usage:
+#   python bench_apply_patches.py [--jobs 4] [--pad 400] [--runs 3]
+#
+
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import tempfile
+
+import harness
+from bench_script_patches import PlayerOptions
+
+ScriptsPath = os.path.join(os.path.dirname(harness.BenchmarksPath), 'Scripts')
+if ScriptsPath not in sys.path:
+  sys.path.insert(0, ScriptsPath)
+import apply_patches
+import json_path
+
+
+# A Mnemonic that's safe to overwrite
+def filler_mnemonic(mnemonic='Wait', label=''):
+  return { 'label': label, 'mnemonic': mnemonic, 'operands': { 'iValues': [0]*8, 'rValues': [0]*8, 'sValues': ['']*8 }, 'type': 1, 'comment': '' }
+
+
+# Walk (and create, as needed) 'parts' from 'root'; returns (parent, node)
+# New list entries are None until fill_placeholders() decides what they should be.
+def materialize(root, parts, make_leaf):
+  parent = None
+  node = root
+  for i, part in enumerate(parts):
+    last = (i == len(parts) - 1)
+    def make_child():
+      if last:
+        return make_leaf()
+      return [] if parts[i+1][0] in '[{' else {}
+
+    parent = node
+    if part.startswith('['):
+      index = int(part[1:-1])
+      node.extend([None] * (index + 1 - len(node)))
+      if node[index] is None:
+        node[index] = make_child()
+      node = node[index]
+    elif part.startswith('{'):
+      key, value = part[1:-1].split('=', 1)
+      found = None
+      for candidate in node:
+        if isinstance(candidate, dict) and key in candidate and json_path.json_value_str(candidate[key]) == value:
+          found = candidate
+      if found is None:
+        found = make_child()
+        found[key] = int(value) if value.isdigit() else value
+        node.append(found)
+      node = found
+    else:
+      if part not in node:
+        node[part] = make_child()
+      node = node[part]
+  return parent, node
+
+
+# Replace the None entries that materialize() left in lists, based on what else is in the list
+def fill_placeholders(node):
+  if isinstance(node, dict):
+    for value in node.values():
+      fill_placeholders(value)
+  elif isinstance(node, list):
+    isMnemonics = any(isinstance(obj, dict) and 'mnemonic' in obj for obj in node)
+    isInts = any(type(obj) is int for obj in node)
+    for i, obj in enumerate(node):
+      if obj is None:
+        node[i] = filler_mnemonic() if isMnemonics else (0 if isInts else {})
+      else:
+        fill_placeholders(obj)
+
+
+# Make an array of Mnemonics long enough for 'count' more after 'index', plus 'pad' fillers at the end
+def reserve_mnemonics(mnemonics, index, count, pad):
+  mnemonics.extend([None] * (index + count + pad - len(mnemonics)))
+
+
+# Build a synthetic MagiciteExport at 'exportPath' that every seed in 'seedPaths' can be applied to cleanly
+def make_fixture(seedPaths, exportPath, pad):
+  jsonAssets = {}      # { assetPath -> root }
+  inlineScripts = {}   # { (assetPath, outer xpath) -> inner root }
+  csvAssets = {}       # { assetPath -> (headers, { id -> row }) }
+  for seedPath in seedPaths:
+    tasks, errors = apply_patches.plan_tasks(seedPath, exportPath, None)
+    if len(errors) > 0:
+      raise Exception(f"Couldn't read {seedPath}: {errors}")
+    for task in tasks:
+      if task[0] is apply_patches.patch_json_asset:
+        _, _, assetPath, treasurePatches, eventPatches, _ = task
+        root = jsonAssets.setdefault(assetPath, {})
+        for patch in treasurePatches:
+          props = [ { 'name': name, 'type': 'int' if value.lstrip('-').isdigit() else 'string', 'value': value } for name, value in patch.patches.items() ]
+          _, node = materialize(root, json_path.compile_xpath(patch.json_xpath).parts, list)
+          known = set(prop['name'] for prop in node)
+          node.extend(prop for prop in props if prop['name'] not in known)
+        claimed = set()   # (id(array), index) of Mnemonics that an earlier patch overwrites
+        for patch in eventPatches:
+          target = root
+          parts = json_path.compile_xpath(patch.json_xpath).parts
+          if patch.command == 'InlinePatch':
+            materialize(root, parts, str)
+            target = inlineScripts.setdefault((assetPath, patch.json_xpath), {})
+            parts = json_path.compile_xpath(patch.inline_xpath).parts
+          if patch.command == 'SpotIArray':
+            _, node = materialize(target, parts, list)
+            node.extend([0] * (max(int(index) for index in patch.snippet.keys()) + 1 - len(node)))
+            continue
+          expected = patch.expected_name + ['']
+          _, mnemonics = materialize(target, parts[:-1], list)
+          index = int(parts[-1][1:-1])
+          reserve_mnemonics(mnemonics, index, 1 + patch.args[0] + len(patch.snippet or []) if patch.command != 'SetSVal' else 1, pad)
+          if (id(mnemonics), index) not in claimed and mnemonics[index] is None:
+            mnemonics[index] = filler_mnemonic(expected[0] or 'Wait', expected[1])
+          if patch.command != 'SetSVal':
+            claimed.update((id(mnemonics), index + patch.args[0] + i) for i in range(len(patch.snippet or [])))
+      else:
+        _, _, assetPath, patches, _ = task
+        headers, rows = csvAssets.setdefault(assetPath, ([], {}))
+        for patch in patches:
+          if len(patch.header) == 1:
+            headers[:] = patch.header[0].split(',')
+          else:
+            headers.extend(col for col in patch.header if col not in headers)
+            for row in patch.rows:
+              rows.setdefault(int(row[0]), True)
+        # Rows added by a seed mustn't be in the export (but each seed adds the same ones)
+        for patch in patches:
+          if len(patch.header) == 1:
+            for row in patch.rows:
+              rows.pop(int(row[0].split(',')[0]), None)
+
+  # Write it all out
+  for (assetPath, outer), inner in inlineScripts.items():
+    fill_placeholders(inner)
+    parent, _, key = json_path.XPathResolver(jsonAssets[assetPath]).resolve(outer)
+    parent[key] = base64.b64encode(json.dumps(inner, separators=(',', ':'), ensure_ascii=False).encode('utf-8')).decode('ascii')
+  for assetPath, root in jsonAssets.items():
+    fill_placeholders(root)
+    path = os.path.join(exportPath, asset_group(assetPath), f"{assetPath}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+      json.dump(root, f, ensure_ascii=False)
+  for assetPath, (headers, rows) in csvAssets.items():
+    if 'id' not in headers:
+      headers.insert(0, 'id')
+    path = os.path.join(exportPath, asset_group(assetPath), f"{assetPath}.csv")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+      f.write(','.join(headers) + "\r\n")
+      for rowId in sorted(rows.keys()):
+        f.write(','.join(str(rowId) if col == 'id' else '0' for col in headers) + "\r\n")
+
+
+# The top-level directory that MagiciteExport keeps an asset in
+def asset_group(assetPath):
+  parts = assetPath.split('/')
+  return 'master' if '/Data/Master/' in assetPath else parts[4].lower()
+
+
+# Generate the seeds; returns their paths
+def generate_seeds(outDir):
+  multiworld = harness.build_multiworld(len(PlayerOptions), options=PlayerOptions)
+  harness.run_stages(multiworld, outDir)
+  return sorted(os.path.join(outDir, name) for name in os.listdir(outDir) if name.endswith('.apff5pr'))
+
+
+# Apply every seed; returns (seconds, { seedName -> (results, readErrors) })
+def apply_all(seedPaths, exportPath, jobs):
+  start = time.perf_counter()
+  res = { os.path.basename(seedPath): apply_patches.apply_seed(seedPath, exportPath, jobs) for seedPath in seedPaths }
+  return time.perf_counter() - start, res
+
+
+def count_errors(results):
+  return sum(len(readErrors) + sum(len(result[2]) for result in assets) for assets, readErrors in results.values())
+
+
+# Break the fixture in one way, and check that apply_seed() reports it
+def check_broken(seedPath, exportPath, label, relPath, breakIt, expected):
+  path = os.path.join(exportPath, relPath)
+  with open(path, encoding='utf-8') as f:
+    orig = f.read()
+  try:
+    with open(path, 'w', encoding='utf-8') as f:
+      f.write(breakIt(orig))
+    assets, _ = apply_patches.apply_seed(seedPath, exportPath, 1)
+    errors = [ error for result in assets for error in result[2] ]
+    if not any(expected in error for error in errors):
+      raise Exception(f"'{label}' wasn't reported (expected: '{expected}'); got: {errors}")
+  finally:
+    with open(path, 'w', encoding='utf-8') as f:
+      f.write(orig)
+
+
+# Apply 'seedPath' with --out, and check every script its InlinePatches touch; returns how many patches were checked
+def check_inline_patches(seedPath, exportPath, outPath):
+  assets, _ = apply_patches.apply_seed(seedPath, exportPath, 1, outPath)
+  if any(len(result[2]) > 0 for result in assets):
+    raise Exception("Couldn't write out the patched assets")
+  tasks, _ = apply_patches.plan_tasks(seedPath, exportPath, None)
+  numChecked = 0
+  for task in tasks:
+    inlinePatches = [ patch for patch in task[4] if patch.command == 'InlinePatch' ] if task[0] is apply_patches.patch_json_asset else []
+    if len(inlinePatches) == 0:
+      continue
+    relPath = apply_patches.find_asset_file(exportPath, task[2], 'json')
+    roots = []
+    for basePath in [exportPath, outPath]:
+      with open(os.path.join(basePath, relPath), encoding='utf-8') as f:
+        roots.append(json.load(f))
+
+    # What each inline script should be: the export's, with the snippets written in (in order)
+    original = {}   # outer xpath -> (keys of its parent, inner root)
+    expected = {}   # outer xpath -> inner root
+    for patch in inlinePatches:
+      if patch.json_xpath not in original:
+        parent, node, _ = json_path.XPathResolver(roots[0]).resolve(patch.json_xpath)
+        original[patch.json_xpath] = (sorted(parent.keys()), json.loads(base64.b64decode(node)))
+        expected[patch.json_xpath] = json.loads(base64.b64decode(node))
+      mnemonics, _, index = json_path.XPathResolver(expected[patch.json_xpath]).resolve(patch.inline_xpath)
+      start = index + patch.args[0]
+      mnemonics[start:start + len(patch.snippet)] = patch.snippet
+      numChecked += 1
+
+    for outer, inner in expected.items():
+      parent, node, _ = json_path.XPathResolver(roots[1]).resolve(outer)
+      if sorted(parent.keys()) != original[outer][0]:
+        raise Exception(f"{relPath}: InlinePatch changed the keys at {outer}: {original[outer][0]} -> {sorted(parent.keys())}")
+      actual = json.loads(base64.b64decode(node))
+      if actual == original[outer][1] or actual != inner:
+        raise Exception(f"{relPath}: the inline script at {outer} wasn't patched as expected")
+  return numChecked
+
+
+def edit_json(edit):
+  def breakIt(text):
+    root = json.loads(text)
+    edit(root)
+    return json.dumps(root)
+  return breakIt
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time and check Scripts/apply_patches.py against a synthetic MagiciteExport.')
+  parser.add_argument('--jobs', type=int, default=4, help='Number of worker processes')
+  parser.add_argument('--pad', type=int, default=400, help='Filler Mnemonics to add to each script')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as seedDir, tempfile.TemporaryDirectory() as exportPath:
+    seedPaths = generate_seeds(seedDir)
+    start = time.perf_counter()
+    make_fixture(seedPaths, exportPath, args.pad)
+    fixtureTime = time.perf_counter() - start
+    fixtureFiles = [ os.path.join(dirPath, name) for dirPath, _, names in os.walk(exportPath) for name in names ]
+    print(f"{len(seedPaths)} seeds; fixture: {len(fixtureFiles)} assets, {sum(map(os.path.getsize, fixtureFiles))/1024/1024:.1f} MiB (built in {fixtureTime:.2f} s)")
+
+    timings = {}
+    results = {}
+    for _ in range(args.runs):
+      for label, jobs in [('serial', 1), (f"{args.jobs} jobs", args.jobs)]:
+        elapsed, results[label] = apply_all(seedPaths, exportPath, jobs)
+        timings[label] = min(elapsed, timings.get(label, elapsed))
+
+    if results['serial'] != results[f"{args.jobs} jobs"]:
+      raise Exception("Serial and parallel runs reported different results")
+    numErrors = count_errors(results['serial'])
+    if numErrors > 0:
+      for seedName, (assets, readErrors) in results['serial'].items():
+        for error in readErrors + [ f"{result[0]}: {error}" for result in assets for error in result[2] ]:
+          print(f"ERROR: {seedName}: {error}")
+      raise Exception(f"{numErrors} patches didn't apply to the fixture")
+
+    numAssets = sum(len(assets) for assets, _ in results['serial'].values())
+    numPatches = sum(result[1] for assets, _ in results['serial'].values() for result in assets)
+    print(f"{numPatches} patches to {numAssets} assets; no errors ({os.cpu_count()} CPUs)")
+    print(f"{'':>8} {'total (s)':>10} {'per seed (s)':>13}")
+    for label, elapsed in timings.items():
+      print(f"{label:>8} {elapsed:>10.3f} {elapsed/len(seedPaths):>13.3f}")
+
+    # The InlinePatches must actually patch their scripts
+    seedPath = seedPaths[0]
+    with tempfile.TemporaryDirectory() as outPath:
+      numInline = check_inline_patches(seedPath, exportPath, outPath)
+    if numInline == 0:
+      raise Exception("The first seed has no InlinePatches to check")
+    print(f"{numInline} InlinePatches wrote their snippets into the decoded scripts")
+
+    # Each of these must be reported
+    tasks, _ = apply_patches.plan_tasks(seedPath, exportPath, None)
+    overwrite = next(task for task in tasks if task[0] is apply_patches.patch_json_asset and any(patch.command == 'Overwrite' and patch.expected_name[0] != '' for patch in task[4]))
+    patch = next(patch for patch in overwrite[4] if patch.command == 'Overwrite' and patch.expected_name[0] != '')
+    scriptPath = apply_patches.find_asset_file(exportPath, overwrite[2], 'json')
+    index = json_path.compile_xpath(patch.json_xpath).steps[-1][1]
+    def add_label(root):
+      root['Mnemonics'][index + patch.args[0] + len(patch.snippet) - 1] = filler_mnemonic('Nop', 'SomeLabel')
+    def rename(root):
+      root['Mnemonics'][index]['mnemonic'] = 'NotTheRightOne'
+    treasure = next(task for task in tasks if task[0] is apply_patches.patch_json_asset and len(task[3]) > 0)
+    treasurePath = apply_patches.find_asset_file(exportPath, treasure[2], 'json')
+    csvTask = next(task for task in tasks if task[0] is apply_patches.patch_csv_asset and any(len(patch.header) > 1 for patch in task[3]))
+    csvPath = apply_patches.find_asset_file(exportPath, csvTask[2], 'csv')
+    checks = [
+      ('script too short', scriptPath, edit_json(lambda root: root.update(Mnemonics=root['Mnemonics'][:index + patch.args[0] + len(patch.snippet) - 1])), 'Mnemonic Buffer Overflow'),
+      ('label in the way', scriptPath, edit_json(add_label), 'Trying to overwrite label'),
+      ('wrong mnemonic', scriptPath, edit_json(rename), 'Expected mnemonic'),
+      ('missing property', treasurePath, lambda text: text.replace('"name": "', '"name": "x_'), 'properties; but we only patched'),
+      ('missing csv row', csvPath, lambda text: text.split('\n')[0] + '\n', 'Could not retrieve an existing asset'),
+    ]
+    for label, relPath, breakIt, expected in checks:
+      check_broken(seedPath, exportPath, label, relPath, breakIt, expected)
+    print(f"{len(checks)} broken fixtures were all reported")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,167 @@
+#
+# Benchmark (and check): CsvAsset's columnar mode (Scripts/helpers.py), on made-up copies of the biggest master tables.
+# Each table has the shape of the real one (monster.csv is wide and mostly numbers; item.csv and ability.csv are
+#   narrower), with --scale times as many rows. For each one we load it both ways and compare:
+#   * load time (best of N), and the memory the loaded asset holds on to (tracemalloc)
+#   * reading one integer column of every row, the way the scripts do (int(entry[col])); and, for the columnar asset,
+#     straight from its column (asset.columns[col], which is already ints)
+# ...and check that write() makes exactly the same file as the one we read, both ways; and that after the same
+#   add_entry() / modify_prop() / row edits (including values that don't fit an integer column), both ways write the
+#   same file and find the same rows.
+#
+# Usage:
+#   python bench_columnar_csv.py [--scale 4] [--runs 3]
+#
+
+import io
+import gc
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Scripts'))
+
+from helpers import CsvAsset
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+# name -> (rows, string columns, integer columns); roughly the real tables' shapes
+# (cursor_x_position is all numbers, but with leading zeros, so it has to stay a string column)
+Tables = {
+  'monster': (600, ['mes_id_name', 'resource_id', 'script_name', 'cursor_x_position'],
+              ['type', 'species', 'boss', 'lv', 'hp', 'mp', 'exp', 'gill', 'attack_count', 'attack_plus', 'defense',
+               'ability_defense', 'ability_evasion_rate', 'magic', 'agility', 'steal_content_id1', 'steal_content_id2',
+               'steal_content_id3', 'steal_content_id4'] +
+              [ f"drop_content_id{i}{suffix}" for i in range(1, 9) for suffix in ['', '_value'] ] +
+              [ f"resistance_{kind}" for kind in ['fire', 'ice', 'thunder', 'earth', 'wind', 'water', 'holy', 'dark', 'poison', 'body'] ] +
+              [ f"condition_{i}" for i in range(1, 31) ] + [ f"ability_id{i}" for i in range(1, 21) ]),
+  'item': (400, ['mes_id_name', 'mes_id_description', 'icon_type'],
+           ['type_id', 'sort_id', 'use_type', 'buy', 'sell', 'has_max', 'attribute_id', 'condition_group_id', 'effect_id',
+            'target_type', 'table_id', 'battle_effect_asset_id', 'menu_se_asset_id', 'standard_value', 'power', 'rare']),
+  'ability': (800, ['mes_id_name', 'mes_id_effect', 'mes_id_battle'],
+              ['ability_group_id', 'type_id', 'use_value', 'sort_id', 'command_id', 'system_id', 'battle_effect_asset_id',
+               'standard_value', 'power', 'hit_rate', 'accuracy_rate', 'cast_time', 'target_range', 'target_segment',
+               'attribute_id', 'attribute_group_id', 'condition_group_id', 'use_limit', 'rare', 'resource_id']),
+}
+
+def make_table(path, numRows, strCols, intCols, seed):
+  rng = random.Random(seed)
+  headers = ['id'] + strCols + intCols
+  lines = [ ','.join(headers) ]
+  for entryId in range(1, numRows + 1):
+    values = [ str(entryId) ]
+    for col in strCols:
+      if col == 'cursor_x_position':
+        values.append(f"{rng.randrange(1000):03}")
+      else:
+        values.append(rng.choice(['None', f"MSG_{col.upper()}_{entryId}", f"{col}_{rng.randrange(50):03}", '1.5']))
+    for col in intCols:
+      values.append(str(rng.choice([0, 0, 0, 1, rng.randrange(-5, 100), rng.randrange(100000)])))
+    lines.append(','.join(values))
+  with open(path, 'w', encoding='utf-8', newline='') as f:
+    f.write(''.join(f"{line}\r\n" for line in lines))
+  return headers
+
+
+def read(path, columnar):
+  with contextlib.redirect_stdout(io.StringIO()):
+    return CsvAsset.ReadFile(path, columnar)
+
+def write(asset, path):
+  open(path, 'wb').close()   # write() only overwrites existing files
+  with contextlib.redirect_stdout(io.StringIO()):
+    asset.write(path)
+  with open(path, 'rb') as f:
+    return f.read()
+
+
+# The memory held by a loaded asset (and the peak while loading it)
+def measure_memory(path, columnar):
+  gc.collect()
+  tracemalloc.start()
+  asset = read(path, columnar)
+  current, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  del asset
+  return current, peak
+
+
+# Make the same changes to each asset, and check that they still agree
+def check_edits(path, headers, intCols, tmpDir):
+  assets = [ read(path, False), read(path, True) ]
+  for asset in assets:
+    nextId = int(asset.data[-1]['id']) + 1
+    asset.add_entry({ col: (str(nextId) if col == 'id' else '7') for col in headers })
+    asset.modify_prop('all', intCols[0], '+', 3)
+    asset.modify_prop([1, 2, 3], intCols[1], '*', 2)
+    asset.modify_prop([4, 5], intCols[2], '=', 'None')   # No longer an integer column
+    asset.modify_prop(6, intCols[3], '=', '007')         # ...nor this one
+    asset.modify_prop(7, intCols[4], '=', 12)
+    asset.data[8][intCols[5]] = '42'
+    asset.reindex()
+  files = [ write(asset, os.path.join(tmpDir, f"edited_{i}.csv")) for i, asset in enumerate(assets) ]
+  if files[0] != files[1]:
+    raise Exception(f"{os.path.basename(path)}: the edited tables differ")
+  for col, value in [('id', 3), (intCols[2], 'None'), (intCols[3], '007'), (intCols[4], 12), (intCols[5], 42), (headers[1], 'None')]:
+    found = [ [ str(entry['id']) for entry in asset.search_for_prop(col, value) ] for asset in assets ]
+    if found[0] != found[1]:
+      raise Exception(f"{os.path.basename(path)}: search_for_prop({col}, {value}) differs: {found}")
+  for entryId in [1, 5, len(assets[0].data), 999999]:
+    rows = [ asset.get_prop(entryId) for asset in assets ]
+    if (rows[0] is None) != (rows[1] is None) or (rows[0] is not None and [ str(v) for v in rows[0].values() ] != [ str(v) for v in rows[1].values() ]):
+      raise Exception(f"{os.path.basename(path)}: get_prop({entryId}) differs: {rows}")
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Compare CsvAsset's columnar mode with the regular one (Scripts/helpers.py).")
+  parser.add_argument('--scale', type=int, default=4, help='Rows, as a multiple of the real table sizes')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as tmpDir:
+    print(f"{'':>8} {'rows':>6} {'cols':>5} {'KiB':>6}   {'load (ms)':>17}   {'memory (KiB)':>17}   {'peak (KiB)':>17}   {'int column (ms)':>26}")
+    print(f"{'':>8} {'':>6} {'':>5} {'':>6}   {'dicts':>8} {'columns':>8}   {'dicts':>8} {'columns':>8}   {'dicts':>8} {'columns':>8}   {'dicts':>8} {'columns':>8} {'direct':>8}")
+    for seed, (name, (numRows, strCols, intCols)) in enumerate(Tables.items()):
+      path = os.path.join(tmpDir, f"{name}.csv")
+      headers = make_table(path, numRows * args.scale, strCols, intCols, seed)
+      with open(path, 'rb') as f:
+        original = f.read()
+
+      loadTimes = []
+      memory = []
+      readTimes = []
+      for columnar in [False, True]:
+        memory.append(measure_memory(path, columnar))
+        loadTimes.append(best_time(lambda: read(path, columnar), args.runs))
+        asset = read(path, columnar)
+        if write(asset, os.path.join(tmpDir, 'out.csv')) != original:
+          raise Exception(f"{name}.csv: write() (columnar={columnar}) doesn't make the same file")
+        col = intCols[6]
+        readTimes.append(best_time(lambda: sum(int(entry[col]) for entry in asset.data), args.runs))
+      readTimes.append(best_time(lambda: sum(asset.columns[col]), args.runs))
+      check_edits(path, headers, intCols, tmpDir)
+
+      print(f"{name:>8} {len(asset.data):>6} {len(headers):>5} {len(original)/1024:>6.0f}   " +
+            f"{1000*loadTimes[0]:>8.1f} {1000*loadTimes[1]:>8.1f}   " +
+            f"{memory[0][0]/1024:>8.0f} {memory[1][0]/1024:>8.0f}   {memory[0][1]/1024:>8.0f} {memory[1][1]/1024:>8.0f}   " +
+            f"{1000*readTimes[0]:>8.2f} {1000*readTimes[1]:>8.2f} {1000*readTimes[2]:>8.2f}")
+
+    print("\nwrite() makes the same bytes as the file we read, both ways; and both ways agree after the same edits.")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,135 @@
+#
+# Benchmark: how should the members of an .apff5pr be compressed?
+# We generate one "maximal" seed (the 'everything' preset: every shop item is a Location, split shops, shuffled bosses, etc.),
+#   keep the members that generate_output() wrote, and then write them again with each compression plan (see CompressionPlan
+#   in custom_world/ff5pr/Output.py), recording:
+#   * size     -- the .apff5pr file size
+#   * write    -- time to write the archive (best of N), including compression
+#   * read     -- time to open the archive and read every member (best of N). The game client does this with .NET's
+#                 ZipArchive, which also uses zlib; Python's zipfile is our stand-in for it.
+# Every member is read back and checked against the original. We also check that Worlds writing at the same time (in
+#   threads, as Archipelago does) can share the compression threads, even while other Worlds ask for more of them.
+# Plans marked "(client can't read)" use codecs that .NET's
+#   ZipArchive doesn't support; they're here for comparison only (the world won't use them for anything but archipelago.json).
+#
+# Usage:
+#   python bench_compression.py [--runs 20] [--plans "deflate:3;auto,threads=4"]
+#
+
+import os
+import time
+import zipfile
+import threading
+import argparse
+import tempfile
+
+import harness
+from bench_generation import OptionPresets
+
+
+DefaultPlans = [
+  'stored',
+  'deflate:1',
+  'deflate:3',
+  'deflate:6',
+  'deflate:9',
+  'bzip2:9',
+  'lzma',
+  'auto',
+  'deflate:3,threads=4',
+  'auto,threads=4',
+]
+
+
+# Generate a maximal seed and capture the members passed to write_archive()
+# Returns: [ (name, chunks), ... ], and the function that writes archipelago.json
+def capture_members(outDir):
+  Output = harness.get_world_submodule('Output')   # (The world imports these from Output when it writes its output)
+  captured = []
+  origWriteArchive = Output.write_archive
+  def capture(file_path, members, plan, finish=None):
+    captured.append((members, finish))
+    return origWriteArchive(file_path, members, plan, finish)
+  Output.write_archive = capture
+  try:
+    multiworld = harness.build_multiworld(1, options=OptionPresets['everything'])
+    harness.run_stages(multiworld, outDir)
+  finally:
+    Output.write_archive = origWriteArchive
+  return captured[0]
+
+
+# Read every member; returns { name -> bytes }
+def read_archive(file_path):
+  with zipfile.ZipFile(file_path) as zf:
+    return { name: zf.read(name) for name in zf.namelist() }
+
+
+# Write archives from a few threads with 'threads=2' while another keeps asking for a bigger pool, and check every archive
+def check_shared_pool(Output, members, finish, expected, outDir, writers=3, archives=10):
+  errors = []
+  def write(writer, spec):
+    try:
+      for i in range(archives):
+        file_path = os.path.join(outDir, f"shared_{writer}_{i}.apff5pr")
+        Output.write_archive(file_path, members, Output.CompressionPlan(spec), finish)
+        if { name: data for name, data in read_archive(file_path).items() if name in expected } != expected:
+          errors.append(f"{file_path} has the wrong contents")
+    except Exception as ex:
+      errors.append(repr(ex))
+  threads = [ threading.Thread(target=write, args=(writer, 'deflate:3,threads=2')) for writer in range(writers) ]
+  for thread in threads:
+    thread.start()
+  while any(thread.is_alive() for thread in threads):
+    Output.get_compress_pool(Output.compress_pool_size + 1)
+    time.sleep(0.001)
+  for thread in threads:
+    thread.join()
+  if len(errors) > 0:
+    raise Exception(f"Sharing the compression threads failed: {errors[0]}")
+  return writers * archives
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare .apff5pr size, write time and read time for each compression plan.')
+  parser.add_argument('--runs', type=int, default=20, help='Best-of-N timing')
+  parser.add_argument('--plans', type=str, default=';'.join(DefaultPlans), help='Compression plans to compare, separated by semicolons')
+  args = parser.parse_args()
+
+  Output = harness.get_world_submodule('Output')
+
+  with tempfile.TemporaryDirectory() as outDir:
+    members, finish = capture_members(outDir)
+    expected = { name: ''.join(chunk if isinstance(chunk, str) else chunk.decode('utf-8') for chunk in chunks).encode('utf-8') for name, chunks in members }
+    print(f"Maximal seed: {len(members)} members, {sum(len(data) for data in expected.values())/1024:.1f} KiB uncompressed")
+    print(f"{check_shared_pool(Output, members, finish, expected, outDir)} archives written in parallel while the compression pool grew")
+
+    print(f"{'plan':>28} {'size (KiB)':>11} {'write (ms)':>11} {'read (ms)':>10}")
+    file_path = os.path.join(outDir, 'bench.apff5pr')
+    for spec in args.plans.split(';'):
+      plan = Output.CompressionPlan(spec, client_safe=False)
+      writeTime = best_time(lambda: Output.write_archive(file_path, members, plan, finish), args.runs)
+      readTime = best_time(lambda: read_archive(file_path), args.runs)
+
+      contents = read_archive(file_path)
+      for name, data in expected.items():
+        if contents.get(name) != data:
+          raise Exception(f"Member {name} is wrong with compression: {spec}")
+
+      unreadable = any(plan.choose(name, len(data))[0] not in Output.ClientCodecs for name, data in expected.items())
+      note = "  (client can't read)" if unreadable else ""
+      print(f"{spec:>28} {os.path.getsize(file_path)/1024:>11.1f} {1000*writeTime:>11.2f} {1000*readTime:>10.2f}{note}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,68 @@
+#
+# Benchmark: create_item() throughput.
+# We create one Item for each pristine Location (using its original, possibly non-normalized, item name), the same
+#   way create_items() does, and compare against the old create_item(), which normalized the name and parsed the
+#   classification string on every call.
+#
+# Usage:
+#   python bench_create_item.py [--rounds 20]
+#
+
+import time
+import argparse
+
+import harness
+
+
+def legacy_create_item(world, fullName):
+  ff5pr = harness.get_world_module()
+  normName = ff5pr.Pristine.normalize_item_name(fullName)
+  itemClassification = ff5pr.Items.ParseItemClassification(world.pristine_items[normName].classification) if normName in world.pristine_items else ff5pr.ItemClassification.filler
+  return ff5pr.FF5PRItem(normName, itemClassification, world.item_name_to_id[normName], world.player)
+
+
+def time_calls(fn, names, rounds):
+  best = None
+  for _ in range(rounds):
+    start = time.perf_counter()
+    for name in names:
+      fn(name)
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Measure create_item() throughput.')
+  parser.add_argument('--rounds', type=int, default=20, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  ff5pr = harness.get_world_module()
+
+  start = time.perf_counter()
+  ff5pr.Items.ItemTable(ff5pr.FF5PRWorld.item_name_to_id)
+  buildTime = time.perf_counter() - start
+
+  multiworld = harness.build_multiworld(1)
+  world = multiworld.worlds[1]
+  names = [ loc.orig_item for loc in world.pristine_locations.values() if loc.loc_id is not None ]
+
+  # Make sure both versions agree
+  for name in names:
+    a = world.create_item(name)
+    b = legacy_create_item(world, name)
+    if (a.name, a.classification, a.code) != (b.name, b.classification, b.code):
+      raise Exception(f"Mismatch for {name}: {a.name}/{a.classification}/{a.code} vs. {b.name}/{b.classification}/{b.code}")
+
+  newTime = time_calls(world.create_item, names, args.rounds)
+  oldTime = time_calls(lambda name: legacy_create_item(world, name), names, args.rounds)
+
+  print(f"Item table built in {1000*buildTime:.2f} ms (once per process)")
+  print(f"{len(names)} items per round; {sum(1 for name in names if name not in world.item_name_to_id)} of them have non-normalized names")
+  print(f"{'':>8} {'total (ms)':>12} {'items/sec':>12}")
+  for label, elapsed in [('legacy', oldTime), ('table', newTime)]:
+    print(f"{label:>8} {1000*elapsed:>12.3f} {len(names)/elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+  main()
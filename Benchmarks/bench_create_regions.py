@@ -0,0 +1,54 @@
+#
+# Benchmark: how does create_regions() scale with the number of FF5 players in a multiworld?
+# Each player's regions are appended to the one (shared) multiworld.regions list, so any per-player
+#   lookup that scans that list makes the total cost quadratic in the number of players.
+#
+# Usage:
+#   python bench_create_regions.py [--players 1,10,50,100,200] [--legacy]
+#
+# --legacy swaps in the old "scan multiworld.regions" getRegion(), for comparison.
+#
+
+import sys
+import time
+import argparse
+
+import harness
+
+
+# The original getRegion(), which scans every player's regions
+def legacy_get_region(self, regionName):
+  for region in self.multiworld.regions:
+    if region.player == self.player and region.name == regionName:
+      return region
+  return None
+
+
+def time_create_regions(num_players, options):
+  multiworld = harness.build_multiworld(num_players, seed=num_players, options=options)
+  harness.run_stage(multiworld, 'generate_early')
+  start = time.perf_counter()
+  harness.run_stage(multiworld, 'create_regions')
+  return time.perf_counter() - start
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time create_regions() for 1..N FF5 players.')
+  parser.add_argument('--players', default='1,10,50,100,200', help='Comma-separated list of player counts')
+  parser.add_argument('--legacy', action='store_true', help='Use the old linear-scan getRegion()')
+  args = parser.parse_args()
+
+  # Shop locations are the worst case, since each one looks up its Region
+  options = { 'add_shop_locations': 1, 'split_shared_shops': 1, 'sell_blue_magic_in_shops': 1 }
+
+  if args.legacy:
+    harness.get_world_module().FF5PRWorld.getRegion = legacy_get_region
+
+  print(f"{'players':>8} {'total (s)':>12} {'per player (ms)':>16}")
+  for num_players in [ int(x) for x in args.players.split(',') ]:
+    elapsed = time_create_regions(num_players, options)
+    print(f"{num_players:>8} {elapsed:>12.3f} {1000*elapsed/num_players:>16.3f}")
+
+
+if __name__ == "__main__":
+  main()
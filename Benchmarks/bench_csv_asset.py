@@ -0,0 +1,165 @@
+#
+# Microbenchmark (and check): CsvAsset lookups (Scripts/helpers.py).
+# get_prop() (by id) and search_for_prop() (by any column) used to scan every row; now they use lookups that are built
+#   the first time they're needed. We make a content.csv-like table of --rows rows and compare lookups per second:
+#   * linear:  the old way (scan every row)
+#   * indexed: CsvAsset today (the first lookup on a column builds its index; that's timed separately)
+# ...and check that both find the same rows, including after add_entry(), modify_prop() (on the indexed column, and on
+#   'id'), rows appended to .data directly, and reindex().
+# Then we build a made-up MagiciteExport (see bench_scan_maps.py), scan it once, and time writing the four scan_*.py tables
+#   with the old lookups and the new ones (and check that the tables are the same).
+#
+# Usage:
+#   python bench_csv_asset.py [--rows 5000] [--lookups 20000] [--areas 100] [--runs 3]
+#
+
+import io
+import os
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+
+from bench_scan_maps import make_export, read_tables   # (This also puts Scripts/ on sys.path)
+
+from helpers import CsvAsset
+import map_scan
+import scan_all
+
+
+# The old lookups
+def linear_get_prop(self, entryId):
+  for entry in self.data:
+    if int(entry['id']) == entryId:
+      return entry
+
+def linear_search_for_prop(self, key, value):
+  res = []
+  for entry in self.data:
+    if str(entry[key]) == str(value):
+      res.append(entry)
+  return res
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+Headers = ['id', 'mes_id_name', 'type_id', 'type_value', 'icon_type', 'sort_id', 'rare']
+
+def make_table(path, numRows):
+  rng = random.Random(3)
+  with open(path, 'w', encoding='utf-8') as f:
+    f.write(','.join(Headers) + '\n')
+    for entryId in range(1, numRows + 1):
+      f.write(f"{entryId},MSG_ITEM_NAME_{entryId},{rng.randrange(1, 6)},{rng.randrange(500)},{rng.randrange(40)},{rng.randrange(numRows)},0\n")
+  with contextlib.redirect_stdout(io.StringIO()):
+    return CsvAsset.ReadFile(path)
+
+
+# Check every lookup in 'queries' against the old way
+def check(asset, queries, label):
+  for kind, key, value in queries:
+    if kind == 'id':
+      expected = linear_get_prop(asset, value)
+      found = asset.get_prop(value)
+      same = expected is found
+    else:
+      expected = linear_search_for_prop(asset, key, value)
+      found = asset.search_for_prop(key, value)
+      same = len(expected) == len(found) and all(a is b for a, b in zip(expected, found))
+    if not same:
+      raise Exception(f"{label}: {kind} lookup of {key}={value} found {found}, expected {expected}")
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time (and check) CsvAsset lookups (Scripts/helpers.py).')
+  parser.add_argument('--rows', type=int, default=5000, help='Rows in the table')
+  parser.add_argument('--lookups', type=int, default=20000, help='Lookups of each kind')
+  parser.add_argument('--areas', type=int, default=100, help='Areas in the made-up export (for the scan_*.py tables)')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  rng = random.Random(5)
+  with tempfile.TemporaryDirectory() as tmpDir:
+    asset = make_table(os.path.join(tmpDir, 'content.csv'), args.rows)
+
+    # Ids (some missing), a unique column, and a column with only a few values
+    ids = [ rng.randrange(1, args.rows + args.rows//10) for _ in range(args.lookups) ]
+    names = [ f"MSG_ITEM_NAME_{rng.randrange(1, args.rows + args.rows//10)}" for _ in range(args.lookups) ]
+    types = [ rng.randrange(1, 7) for _ in range(args.lookups) ]
+    kinds = [
+      ('get_prop(id)', lambda: asset.get_prop(1), lambda: [ asset.get_prop(entryId) for entryId in ids ], lambda: [ linear_get_prop(asset, entryId) for entryId in ids ]),
+      ("search_for_prop('mes_id_name')", lambda: asset.search_for_prop('mes_id_name', 'x'), lambda: [ asset.search_for_prop('mes_id_name', name) for name in names ], lambda: [ linear_search_for_prop(asset, 'mes_id_name', name) for name in names ]),
+      ("search_for_prop('type_id')", lambda: asset.search_for_prop('type_id', 0), lambda: [ asset.search_for_prop('type_id', typeId) for typeId in types ], lambda: [ linear_search_for_prop(asset, 'type_id', typeId) for typeId in types ]),
+    ]
+
+    # Same answers, before and after changes
+    queries = [ ('id', 'id', entryId) for entryId in ids[:200] ] + [ ('search', 'mes_id_name', name) for name in names[:200] ] + \
+              [ ('search', 'type_id', typeId) for typeId in range(0, 8) ] + [ ('search', 'rare', 0), ('search', 'rare', '1') ]
+    check(asset, queries, 'loaded')
+    newRow = { 'id': str(args.rows + 1), 'mes_id_name': 'MSG_ITEM_NAME_NEW', 'type_id': '2', 'type_value': '0', 'icon_type': '0', 'sort_id': '0', 'rare': '1' }
+    asset.add_entry(newRow)
+    check(asset, queries + [ ('id', 'id', args.rows + 1), ('search', 'mes_id_name', 'MSG_ITEM_NAME_NEW') ], 'add_entry()')
+    asset.modify_prop([1, 2, 3], 'type_id', '=', '6')
+    asset.modify_prop('all', 'rare', '+', 1)
+    check(asset, queries, 'modify_prop()')
+    asset.modify_prop(5, 'id', '=', str(args.rows + 50))
+    check(asset, queries + [ ('id', 'id', 5), ('id', 'id', args.rows + 50) ], "modify_prop('id')")
+    asset.data.append(dict(newRow, id=str(args.rows + 2), mes_id_name='MSG_ITEM_NAME_APPENDED'))
+    check(asset, queries + [ ('id', 'id', args.rows + 2), ('search', 'mes_id_name', 'MSG_ITEM_NAME_APPENDED') ], '.data.append()')
+    asset.data[10]['type_id'] = '7'
+    asset.reindex()
+    check(asset, queries, 'reindex()')
+    print(f"{args.rows} rows: every lookup matches the old way (after add_entry(), modify_prop(), .data.append(), and reindex())")
+
+    # Lookups per second
+    asset = make_table(os.path.join(tmpDir, 'content.csv'), args.rows)
+    print(f"\n{'':>32} {'linear (/s)':>12} {'indexed (/s)':>13} {'speedup':>8} {'first lookup (ms)':>18}")
+    for label, firstLookup, indexed, linear in kinds:
+      asset.reindex()
+      start = time.perf_counter()
+      firstLookup()
+      first = time.perf_counter() - start
+      linearTime = best_time(linear, 1)
+      indexedTime = best_time(indexed, args.runs)
+      print(f"{label:>32} {args.lookups/linearTime:>12.0f} {args.lookups/indexedTime:>13.0f} {linearTime/indexedTime:>7.0f}x {1000*first:>18.2f}")
+
+    # The scan_*.py tables (the scan itself is the same both ways)
+    exportPath = os.path.join(tmpDir, 'MagiciteExport')
+    make_export(exportPath, args.areas)
+    visitors = map_scan.get_visitors(scan_all.Scanners)
+    with contextlib.redirect_stdout(io.StringIO()):
+      results = map_scan.MapScanner(exportPath, visitors).scan()
+
+    def write_tables(outPath):
+      os.makedirs(outPath, exist_ok=True)
+      with contextlib.redirect_stdout(io.StringIO()):
+        assets = map_scan.ExportAssets(exportPath)
+        for module in scan_all.Scanners:
+          module.write_csv(assets, results, os.path.join(outPath, module.OutputFile))
+
+    tables = {}
+    times = {}
+    origLookups = (CsvAsset.get_prop, CsvAsset.search_for_prop)
+    for label, lookups in [('linear', (linear_get_prop, linear_search_for_prop)), ('indexed', origLookups)]:
+      CsvAsset.get_prop, CsvAsset.search_for_prop = lookups
+      outPath = os.path.join(tmpDir, f"tables_{label}")
+      times[label] = best_time(lambda: write_tables(outPath), args.runs)
+      tables[label] = read_tables(outPath)
+    CsvAsset.get_prop, CsvAsset.search_for_prop = origLookups
+    if tables['linear'] != tables['indexed']:
+      raise Exception("The scan_*.py tables differ with the indexed lookups")
+    print(f"\nWriting the scan_*.py tables ({args.areas} areas; the scan isn't timed): {times['linear']:.3f} s with linear lookups, " +
+          f"{times['indexed']:.3f} s indexed; the tables are the same.")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,87 @@
+#
+# Benchmark: how fast is the "don't sell Gil in shops" item rule?
+# Every shop Location has this rule, and Archipelago's fill calls it for each candidate item it tries to place there;
+#   with every shop item as a Location, that adds up to hundreds of thousands of calls.
+# We compare the compiled rule (one shared set-membership check; see Rules.py) with the old per-shop closure that
+#   called world.dont_sell_gil(), which checked item.name.endswith(' Gil'):
+#   * Rule throughput: every shop Location's rule against every item in the pool (what a naive fill would try)
+#   * Fill time: the harness's (simple) fill, with each version of the rule
+#
+# Usage:
+#   python bench_fill_item_rules.py [--players 4] [--runs 3]
+#
+
+import time
+import argparse
+
+import harness
+
+
+ShopOptions = {
+  'add_shop_locations': 1,
+  'percent_shop_inventory_as_locations': 100,
+  'percent_shop_inventory_as_locations_min': 100,
+  'percent_shop_inventory_as_locations_max': 100,
+  'split_shared_shops': 1,
+  'sell_blue_magic_in_shops': 1,
+}
+
+
+# The old rule: a closure per shop, calling a World method
+def legacy_rule(world):
+  def dont_sell_gil(item):
+    return not item.name.endswith(' Gil')
+  return lambda item: dont_sell_gil(item)
+
+
+# Make a multiworld that's ready to fill; if 'legacy' is set, swap the old rule into every shop
+def build(numPlayers, legacy):
+  multiworld = harness.build_multiworld(numPlayers, seed=4321, options=ShopOptions)
+  harness.run_stages(multiworld, None, until='create_items')
+  shops = []
+  for player in multiworld.player_ids:
+    world = multiworld.worlds[player]
+    for loc in world.get_locations():
+      if loc.item_rule is world.rules['dont_sell_gil']:
+        if legacy:
+          loc.item_rule = legacy_rule(world)
+        shops.append(loc)
+  return multiworld, shops
+
+
+def time_rule_calls(multiworld, shops):
+  items = multiworld.itempool
+  start = time.perf_counter()
+  allowed = 0
+  for loc in shops:
+    rule = loc.item_rule
+    for item in items:
+      if rule(item):
+        allowed += 1
+  return time.perf_counter() - start, len(shops) * len(items), allowed
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare the dont_sell_gil item rule against the old version.')
+  parser.add_argument('--players', type=int, default=4, help='Number of FF5 players')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  print(f"{'':>9} {'rule calls':>11} {'allowed':>9} {'calls/sec':>12} {'fill (ms)':>10}")
+  for label, legacy in [('legacy', True), ('compiled', False)]:
+    bestCalls = None
+    bestFill = None
+    for _ in range(args.runs):
+      multiworld, shops = build(args.players, legacy)
+      elapsed, calls, allowed = time_rule_calls(multiworld, shops)
+      bestCalls = elapsed if bestCalls is None else min(bestCalls, elapsed)
+
+      start = time.perf_counter()
+      harness.fill(multiworld)
+      elapsed = time.perf_counter() - start
+      bestFill = elapsed if bestFill is None else min(bestFill, elapsed)
+    print(f"{label:>9} {calls:>11} {allowed:>9} {calls/bestCalls:>12.0f} {1000*bestFill:>10.2f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,157 @@
+#
+# Benchmark suite: run every generation stage for N synthetic FF5 players, across a matrix of player options.
+# For each (option preset, player count) we report, per stage:
+#   * wall time (best of --runs)
+#   * memory allocated by the stage (net, and peak above the starting point), measured with tracemalloc in a separate run
+# ...plus the total size of the .apff5pr files written by generate_output.
+#
+# Results are printed as a table, and written as JSON (--json) so that runs can be compared later (--compare).
+#
+# Usage:
+#   python bench_generation.py [--players 1,8,32] [--presets default,shops,split_shops,bosses,everything]
+#                              [--runs 3] [--no-alloc] [--json results.json] [--compare old_results.json]
+#
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import tracemalloc
+
+import harness
+
+
+# Named sets of option overrides; each one stresses a different part of the world
+OptionPresets = {
+  'default': {},
+  'shops': {
+    'add_shop_locations': 1,
+    'percent_shop_inventory_as_locations': 100,
+    'percent_shop_inventory_as_locations_min': 100,
+    'percent_shop_inventory_as_locations_max': 100,
+  },
+  'split_shops': {
+    'add_shop_locations': 1,
+    'split_shared_shops': 1,
+    'sell_blue_magic_in_shops': 1,
+    'shuffle_shops': 1,
+  },
+  'bosses': {
+    'shuffle_bosses': 1,
+    'dynamic_scale_bosses_by_boss_kills': 1,
+  },
+  'everything': {
+    'add_shop_locations': 1,
+    'percent_shop_inventory_as_locations': 100,
+    'percent_shop_inventory_as_locations_min': 100,
+    'percent_shop_inventory_as_locations_max': 100,
+    'split_shared_shops': 1,
+    'sell_blue_magic_in_shops': 1,
+    'shuffle_shops': 1,
+    'shuffle_bosses': 1,
+    'prog_items_in_chests': 1,
+  },
+}
+
+
+def dir_size(path):
+  return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+# Time every stage; returns ({ stage -> seconds }, output_bytes)
+def time_stages(numPlayers, options, seed, outDir):
+  multiworld = harness.build_multiworld(numPlayers, seed=seed, options=options)
+  timings = harness.run_stages(multiworld, outDir)
+  return timings, dir_size(outDir)
+
+
+# Measure allocations for every stage; returns { stage -> { 'net_bytes', 'peak_bytes' } }
+def trace_stages(numPlayers, options, seed, outDir):
+  multiworld = harness.build_multiworld(numPlayers, seed=seed, options=options)
+  res = {}
+  tracemalloc.start()
+  try:
+    for stage in harness.GenerationStages:
+      tracemalloc.reset_peak()
+      before = tracemalloc.get_traced_memory()[0]
+      harness.run_stage(multiworld, stage, outDir)
+      after, peak = tracemalloc.get_traced_memory()
+      res[stage] = { 'net_bytes': after - before, 'peak_bytes': peak - before }
+  finally:
+    tracemalloc.stop()
+  return res
+
+
+def run_case(preset, numPlayers, runs, measureAllocs, seed):
+  options = OptionPresets[preset]
+  best = {}
+  output_bytes = 0
+  for _ in range(runs):
+    with tempfile.TemporaryDirectory() as outDir:
+      timings, output_bytes = time_stages(numPlayers, options, seed, outDir)
+    for stage, seconds in timings.items():
+      best[stage] = min(seconds, best.get(stage, seconds))
+
+  res = { 'preset': preset, 'players': numPlayers, 'output_bytes': output_bytes, 'stages': {} }
+  for stage in harness.GenerationStages:
+    res['stages'][stage] = { 'seconds': best[stage] }
+
+  if measureAllocs:
+    with tempfile.TemporaryDirectory() as outDir:
+      allocs = trace_stages(numPlayers, options, seed, outDir)
+    for stage, entry in allocs.items():
+      res['stages'][stage].update(entry)
+
+  return res
+
+
+def print_case(res, prev=None):
+  print(f"== {res['preset']}, {res['players']} players: output {res['output_bytes']/1024:.1f} KiB")
+  for stage in harness.GenerationStages:
+    entry = res['stages'][stage]
+    line = f"  {stage:>16}: {1000*entry['seconds']:10.2f} ms"
+    if 'net_bytes' in entry:
+      line += f"  net {entry['net_bytes']/1024:10.1f} KiB  peak {entry['peak_bytes']/1024:10.1f} KiB"
+    if prev is not None and stage in prev['stages'] and prev['stages'][stage]['seconds'] > 0:
+      line += f"  ({entry['seconds']/prev['stages'][stage]['seconds']:5.2f}x previous)"
+    print(line)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time each generation stage across player counts and option presets.')
+  parser.add_argument('--players', default='1,8,32', help='Comma-separated list of player counts')
+  parser.add_argument('--presets', default=','.join(OptionPresets.keys()), help=f"Comma-separated list of option presets ({', '.join(OptionPresets.keys())})")
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  parser.add_argument('--seed', type=int, default=1234, help='Multiworld seed')
+  parser.add_argument('--no-alloc', action='store_true', help='Skip the (slower) tracemalloc pass')
+  parser.add_argument('--json', help='Write the results to this file')
+  parser.add_argument('--compare', help='Compare timings against a previous --json file')
+  args = parser.parse_args()
+
+  presets = args.presets.split(',')
+  for preset in presets:
+    if preset not in OptionPresets:
+      print(f"Unknown preset: {preset}")
+      sys.exit(1)
+
+  previous = {}
+  if args.compare:
+    with open(args.compare, encoding='utf-8') as f:
+      for entry in json.load(f)['results']:
+        previous[(entry['preset'], entry['players'])] = entry
+
+  results = []
+  for preset in presets:
+    for numPlayers in [ int(x) for x in args.players.split(',') ]:
+      res = run_case(preset, numPlayers, args.runs, not args.no_alloc, args.seed)
+      print_case(res, previous.get((preset, numPlayers)))
+      results.append(res)
+
+  if args.json:
+    with open(args.json, 'w', encoding='utf-8') as f:
+      json.dump({ 'python': sys.version, 'seed': args.seed, 'runs': args.runs, 'results': results }, f, indent=2)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,101 @@
+#
+# Benchmark: how long does it take to import the FF5 world?
+# Archipelago imports every apworld when it starts (Launcher, WebHost, clients...), so this cost is paid
+#   even by people who aren't playing FF5. Each run uses a fresh interpreter with "-X importtime", and
+#   we report the cumulative time of 'worlds.ff5pr' and of every module it imports directly.
+# The stand-in's own modules are imported first, so they aren't counted.
+# By default, we pack the world into a temporary .apworld and import it from there, like Archipelago does.
+#   Since zipimport can't write .pyc files, this compiles every module in the world from source, every time.
+#
+# Usage:
+#   python bench_import_time.py [--runs 10] [--budget-ms 100] [--from-source]
+#
+# --from-source imports custom_world/ff5pr directly instead (so normal .pyc caching applies).
+#
+# Exits with an error if the median import time is over budget.
+#
+
+import os
+import re
+import sys
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import harness
+
+
+# Import everything the stand-in provides first, so that it isn't counted against the world.
+# 'worldPath' is either a directory or an .apworld (zip) file that contains the 'ff5pr' package.
+def make_import_script(worldPath):
+  return f"""
+import sys
+sys.path.insert(0, {harness.StandInPath!r})
+import worlds
+worlds.__path__.append({worldPath!r})
+import BaseClasses, Options, Utils, settings, worlds.AutoWorld, worlds.generic.Rules, worlds.Files
+import worlds.ff5pr
+"""
+
+# Lines look like: "import time:       123 |       4567 |   worlds.ff5pr.Pristine"
+ImportTimeLine = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+# Run one cold import, returning { moduleName -> cumulative microseconds } for our world and its direct imports
+def import_once(worldPath):
+  proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', make_import_script(worldPath)], capture_output=True, text=True)
+  if proc.returncode != 0:
+    raise Exception(f"Import failed:\n{proc.stderr}")
+
+  # Children are listed (more deeply indented) before their parent
+  entries = []  # [ (depth, moduleName, cumulative), ... ]
+  for line in proc.stderr.splitlines():
+    match = ImportTimeLine.match(line)
+    if match:
+      entries.append((len(match.group(3)), match.group(4), int(match.group(2))))
+
+  res = {}
+  for i, (depth, name, cumulative) in enumerate(entries):
+    if name == 'worlds.ff5pr':
+      res[name] = cumulative
+      for childDepth, childName, childCumulative in reversed(entries[:i]):
+        if childDepth <= depth:
+          break
+        if childDepth == depth + 2:
+          res[childName] = childCumulative
+  return res
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Measure cold import time of the FF5 world.')
+  parser.add_argument('--runs', type=int, default=10, help='Number of fresh interpreters to run')
+  parser.add_argument('--budget-ms', type=float, default=100.0, help='Maximum allowed median import time')
+  parser.add_argument('--from-source', action='store_true', help='Import from custom_world/ instead of a packed .apworld')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as tmpDir:
+    worldPath = harness.CustomWorldPath
+    if not args.from_source:
+      # Same as Scripts/pack_release.py (minus any cached bytecode)
+      worldPath = shutil.make_archive(os.path.join(tmpDir, 'ff5pr'), 'zip', root_dir=harness.CustomWorldPath)
+      os.rename(worldPath, os.path.join(tmpDir, 'ff5pr.apworld'))
+      worldPath = os.path.join(tmpDir, 'ff5pr.apworld')
+    runs = [ import_once(worldPath) for _ in range(args.runs) ]
+  modules = sorted(set(name for run in runs for name in run.keys()))
+
+  print(f"{'module':>32} {'median cumulative (ms)':>24}")
+  for name in sorted(modules, key=lambda name: (name != 'worlds.ff5pr', name)):
+    median = statistics.median(run.get(name, 0) for run in runs) / 1000
+    print(f"{name:>32} {median:>24.2f}")
+
+  total = statistics.median(run['worlds.ff5pr'] for run in runs) / 1000
+  print(f"Median import time of worlds.ff5pr: {total:.2f} ms (budget: {args.budget_ms:.2f} ms)")
+  if total > args.budget_ms:
+    print("ERROR: Import time is over budget.")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,168 @@
+#
+# Microbenchmark (and check): resolving json_xpaths with Scripts/json_path.py.
+# We build a map-like asset (--layers layers of --objects objects, each with a handful of properties), and a path to
+#   every object's properties (by "{id=...}", as treasure_mod.csv does) and to one of its properties (by "{name=...}", as
+#   the shop patches do). Then we time resolving all of them (best of N):
+#   * legacy:    re-splitting each path, and scanning each array for every search (the old traverse_xpath())
+#   * cold:      compiled paths, but a new XPathResolver for every path (so every search builds its index)
+#   * resolver:  compiled paths, and one XPathResolver for the asset
+# ...and check that all three find the same nodes, and raise the same errors for bad paths (including the game's rule
+#   that the *last* match of a search wins, and that a changed array is re-indexed after invalidate()).
+#
+# Usage:
+#   python bench_json_path.py [--layers 4] [--objects 500] [--runs 20]
+#
+
+import os
+import sys
+import time
+import argparse
+
+import harness
+
+ScriptsPath = os.path.join(os.path.dirname(harness.BenchmarksPath), 'Scripts')
+if ScriptsPath not in sys.path:
+  sys.path.insert(0, ScriptsPath)
+import json_path
+from json_path import XPathError, XPathResolver, compile_xpath
+
+
+# The old way: split the path each time, and scan each array we search
+def legacy_traverse(root, xpath):
+  parent = None
+  node = root
+  for part in json_path.split_xpath(xpath):
+    parent = node
+    if part.startswith('[') and part.endswith(']'):
+      if not isinstance(node, list):
+        raise XPathError(f"Expected Array, not: {type(node).__name__} at: {part}")
+      if not part[1:-1].lstrip('-').isdigit():
+        raise XPathError(f"Invalid array index: {part}")
+      index = int(part[1:-1])
+      if index < 0 or index >= len(node):
+        raise XPathError(f"Array element out of bounds: {part}")
+      node = node[index]
+    elif part.startswith('{') and part.endswith('}'):
+      if '=' not in part:
+        raise XPathError(f"Invalid search (expected {{key=value}}): {part}")
+      key, value = part[1:-1].split('=')[:2]
+      if not isinstance(node, list):
+        raise XPathError(f"Expected Array (for id search), not: {type(node).__name__} at: {part}")
+      found = None
+      for candidate in node:
+        if not isinstance(candidate, dict):
+          raise XPathError(f"Expected Object (for id search), not: {type(candidate).__name__} at: {part}")
+        if key in candidate and json_path.json_value_str(candidate[key]) == value:
+          found = candidate
+      if found is None:
+        raise XPathError(f"Could not find {key},{value} at: {part}")
+      node = found
+    else:
+      if not isinstance(node, dict):
+        raise XPathError(f"Expected Object, not: {type(node).__name__} at: {part}")
+      if part not in node:
+        raise XPathError(f"Cannot find part: {part}")
+      node = node[part]
+  return parent, node
+
+
+PropertyNames = ['action_id', 'script_id', 'point_id', 'content_id', 'content_num', 'message_key', 'product_group_id', 'flag_id']
+
+# A map-like asset; the last object in each layer re-uses the first one's id (so its search has two matches)
+def make_asset(numLayers, numObjects):
+  layers = []
+  for layerId in range(numLayers):
+    objects = []
+    for objId in range(numObjects):
+      props = [ { 'name': name, 'type': 'int', 'value': 1000*layerId + objId } for name in PropertyNames ]
+      objects.append({ 'id': 1 + objId, 'name': f"obj_{objId}", 'type': 'event', 'properties': props })
+    objects[-1]['id'] = objects[0]['id']
+    layers.append({ 'name': f"layer_{layerId}", 'objects': objects })
+  return { 'layers': layers }
+
+
+def make_paths(asset):
+  res = []
+  for layerId, layer in enumerate(asset['layers']):
+    for obj in layer['objects']:
+      res.append(f"/layers/[{layerId}]/objects/{{id={obj['id']}}}/properties")
+      res.append(f"/layers/[{layerId}]/objects/{{name={obj['name']}}}/properties/{{name=product_group_id}}")
+  return res
+
+
+BadPaths = [
+  '/layers/[99]/objects',
+  '/layers/[x]/objects',
+  '/layers/[0]/objects/{id=0}',
+  '/layers/[0]/objects/{id}',
+  '/layers/[0]/nope',
+  '/layers/[0]/name/[0]',
+  '/layers/{name=layer_0}/objects/[0]/properties/[0]/value/[1]',
+]
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+def error_of(fn):
+  try:
+    fn()
+  except XPathError as ex:
+    return str(ex)
+  return None
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time and check json_xpath resolution (Scripts/json_path.py).')
+  parser.add_argument('--layers', type=int, default=4, help='Layers in the asset')
+  parser.add_argument('--objects', type=int, default=500, help='Objects in each layer')
+  parser.add_argument('--runs', type=int, default=20, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  asset = make_asset(args.layers, args.objects)
+  paths = make_paths(asset)
+
+  # Same answers (and the same errors)
+  resolver = XPathResolver(asset)
+  for xpath in paths:
+    expected = legacy_traverse(asset, xpath)
+    parent, node, step = resolver.resolve(xpath)
+    if (parent, node) != expected or parent[step] is not node or node is not expected[1]:
+      raise Exception(f"{xpath}: resolved to a different node")
+  for xpath in BadPaths:
+    expected = error_of(lambda: legacy_traverse(asset, xpath))
+    if expected is None or error_of(lambda: resolver.resolve(xpath)) != expected:
+      raise Exception(f"{xpath}: expected the error: {expected}")
+  firstObjects = asset['layers'][0]['objects']
+  if resolver.resolve('/layers/[0]/objects/{id=1}')[1] is not firstObjects[-1]:
+    raise Exception("The last match of a search didn't win")
+  firstObjects[1]['id'] = 'moved'
+  resolver.invalidate(firstObjects)
+  if resolver.resolve('/layers/[0]/objects/{id=moved}')[1] is not firstObjects[1] or error_of(lambda: resolver.resolve('/layers/[0]/objects/{id=2}')) is None:
+    raise Exception("invalidate() didn't re-index the array")
+  firstObjects[1]['id'] = 2
+
+  compiled = [ compile_xpath(xpath) for xpath in paths ]
+  timings = [
+    ('legacy', lambda: [ legacy_traverse(asset, xpath) for xpath in paths ]),
+    ('cold', lambda: [ XPathResolver(asset).resolve(path) for path in compiled ]),
+    ('resolver', lambda: (lambda resolver: [ resolver.resolve(path) for path in compiled ])(XPathResolver(asset))),
+    ('resolver (text)', lambda: (lambda resolver: [ resolver.resolve(xpath) for xpath in paths ])(XPathResolver(asset))),
+  ]
+  print(f"{len(paths)} paths into {args.layers} layers of {args.objects} objects; all resolve the same, {len(BadPaths)} bad paths raise the same errors")
+  print(f"{'':>16} {'time (ms)':>10} {'per path (us)':>14}")
+  for label, fn in timings:
+    elapsed = best_time(fn, args.runs)
+    print(f"{label:>16} {1000*elapsed:>10.3f} {1000000*elapsed/len(paths):>14.2f}")
+  print(f"compile_xpath() cache: {compile_xpath.cache_info()}")
+
+
+if __name__ == "__main__":
+  main()
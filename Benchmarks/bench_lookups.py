@@ -0,0 +1,84 @@
+#
+# Benchmark: computing the item/location lookup tables on import vs. loading the pre-built FrozenLookups.py
+#   that Scripts/pack_release.py writes into the .apworld.
+# This also checks that the frozen tables match the live ones exactly, and that the hash stamped into the packed
+#   Pristine.py is the one they were built from.
+#
+# Usage:
+#   python bench_lookups.py [--repeat 20]
+#
+
+import os
+import ast
+import time
+import shutil
+import marshal
+import argparse
+import tempfile
+
+import harness
+
+
+def best_of(repeat, fn):
+  best = None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    res = fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best, res
+
+
+# Run the generated module from its marshalled bytecode; this is what importing it costs once Python has a cached .pyc
+def exec_frozen(bytecode):
+  frozen = {}
+  exec(marshal.loads(bytecode), frozen)
+  return frozen
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare computing vs. loading the frozen name/id lookups.')
+  parser.add_argument('--repeat', type=int, default=20, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  lookups = harness.get_world_module().Lookups
+  pristinePath = os.path.join(os.path.dirname(lookups.__file__), 'Pristine.py')
+
+  # Do what pack_release.py does, but to a copy of Pristine.py
+  with tempfile.TemporaryDirectory() as tmpDir:
+    currHash = lookups.compute_pristine_hash(pristinePath)
+    frozenPath = os.path.join(tmpDir, 'FrozenLookups.py')
+    lookups.write_frozen_lookups(frozenPath, currHash)
+    with open(frozenPath, encoding='utf-8') as f:
+      source = f.read()
+    stampedPath = os.path.join(tmpDir, 'Pristine.py')
+    shutil.copyfile(pristinePath, stampedPath)
+    lookups.stamp_pristine_hash(stampedPath, currHash)
+    with open(pristinePath, 'rb') as f1, open(stampedPath, 'rb') as f2:
+      original, stamped = f1.read(), f2.read()
+
+  # The stamped copy should only differ by its PristineHash
+  stampedHash = [ node.value.value for node in ast.parse(stamped).body if isinstance(node, ast.Assign) and [ t.id for t in node.targets if isinstance(t, ast.Name) ] == ['PristineHash'] ]
+  assert stampedHash == [currHash]
+  assert stamped.replace(repr(currHash).encode('ascii'), b'None') == original
+
+  compute_time, live = best_of(args.repeat, lookups.compute_lookups)
+  bytecode = marshal.dumps(compile(source, 'FrozenLookups.py', 'exec'))
+  frozen_time, frozen = best_of(args.repeat, lambda: exec_frozen(bytecode))
+
+  # Make sure we'd get the same tables either way
+  product_to_shop_lookup, item_name_to_id, item_name_groups, location_name_to_id, location_name_groups = live
+  assert frozen['pristine_hash'] == currHash
+  assert frozen['product_to_shop_lookup'] == product_to_shop_lookup
+  assert frozen['item_name_to_id'] == item_name_to_id
+  assert { name: set(items) for name, items in frozen['item_name_groups'].items() } == item_name_groups
+  assert frozen['location_name_to_id'] == location_name_to_id
+  assert { name: set(locs) for name, locs in frozen['location_name_groups'].items() } == location_name_groups
+
+  print(f"Frozen module size: {len(source)/1024:.1f} KiB")
+  print(f"{'compute_lookups()':>28}: {1000*compute_time:8.3f} ms")
+  print(f"{'frozen (.pyc) + hash check':>28}: {1000*frozen_time:8.3f} ms   (the check just compares two constants)")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,114 @@
+#
+# Benchmark: size and encode time of multiworld_data.json, in each output format.
+# We generate a "maximal" seed (the 'everything' preset) and capture the document that serialize_multiworl_data() builds,
+#   then encode it (best of N) with:
+#   * legacy  -- the old way: json.dumps() each special entry, json.dumps(indent=2) the whole document, then str.replace()
+#                the special entries in
+#   * debug   -- encode_json() in the readable format (this must match legacy exactly)
+#   * compact -- encode_json() in the compact format (this must parse to the same data, once the dense runs are unpacked)
+# ...and report the size of each (and its size once deflated, as it is in the .apff5pr).
+#
+# Usage:
+#   python bench_multiworld_data.py [--runs 50]
+#
+
+import json
+import time
+import zlib
+import argparse
+import tempfile
+
+import harness
+from bench_generation import OptionPresets
+
+
+LineKeys = ['item_cid_to_action', 'shop_item_to_location_revlookup']
+
+
+# Generate a maximal seed and capture what serialize_multiworl_data() passed to encode_json()
+# Returns: (doc, kwargs)
+def capture_document():
+  Output = harness.get_world_submodule('Output')   # (The world imports these from Output when it writes its output)
+  captured = []
+  origEncodeJson = Output.encode_json
+  def capture(doc, outputFormat, **kwargs):
+    captured.append((doc, kwargs))
+    return origEncodeJson(doc, outputFormat, **kwargs)
+  Output.encode_json = capture
+  try:
+    multiworld = harness.build_multiworld(1, options=OptionPresets['everything'])
+    with tempfile.TemporaryDirectory() as outDir:
+      harness.run_stages(multiworld, outDir)
+  finally:
+    Output.encode_json = origEncodeJson
+  return captured[0]
+
+
+# The old encoder
+def legacy_encode(doc):
+  res = dict(doc)
+  special = {}
+  for key in LineKeys:
+    lines = [ f'    "{entryKey}": {json.dumps(entry, indent=None)}' for entryKey, entry in res[key].items() ]
+    special[key] = ',\n'.join(lines)
+    res[key] = f"@@{key}@@"
+  res = json.dumps(res, sort_keys=True, indent=2)
+  for key in LineKeys:
+    res = res.replace(f'"@@{key}@@"', "{\n" + special[key] + "\n  }", 1)
+  return res
+
+
+# Unpack the compact format's dense runs, so that it can be compared with the others
+def unpack_compact(text):
+  res = json.loads(text)
+  base = res.pop('location_cid_base')
+  lookup = {}
+  for offset, values in res['location_cid_to_item_cid']:
+    for i, value in enumerate(values):
+      if value != 0:
+        lookup[str(base + offset + i)] = value
+  res['location_cid_to_item_cid'] = lookup
+  return res
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare multiworld_data.json size and encode time for each output format.')
+  parser.add_argument('--runs', type=int, default=50, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  Output = harness.get_world_submodule('Output')
+  doc, kwargs = capture_document()
+
+  encoders = [
+    ('legacy', lambda: legacy_encode(doc)),
+    ('debug', lambda: ''.join(Output.encode_json(doc, 'debug', **kwargs))),
+    ('compact', lambda: ''.join(Output.encode_json(doc, 'compact', **kwargs))),
+  ]
+  texts = { label: encode() for label, encode in encoders }
+
+  # Make sure they all agree
+  if texts['debug'] != texts['legacy']:
+    raise Exception("The debug format doesn't match the legacy encoder")
+  if unpack_compact(texts['compact']) != json.loads(texts['legacy']):
+    raise Exception("The compact format doesn't parse to the same data as the legacy encoder")
+
+  print(f"{len(doc['location_cid_to_item_cid'])} Locations, {len(doc['item_cid_to_action'])} special items, {len(doc['shop_item_to_location_revlookup'])} shop entries")
+  print(f"{'':>8} {'encode (ms)':>12} {'size (KiB)':>11} {'deflated (KiB)':>15}")
+  for label, encode in encoders:
+    elapsed = best_time(encode, args.runs)
+    data = texts[label].encode('utf-8')
+    print(f"{label:>8} {1000*elapsed:>12.3f} {len(data)/1024:>11.1f} {len(zlib.compress(data, 3))/1024:>15.1f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,135 @@
+#
+# Benchmark: generate_output() before vs. after a change.
+# The "before" world is taken from a git revision (default: HEAD) and the "after" world is the working tree.
+# Each one runs in its own process (since both are 'worlds.ff5pr'), with the same seed and options, and we compare:
+#   * wall time of generate_output() (best of N)
+#   * peak RSS growth during generate_output()
+#   * total size of the output files
+#   * the contents of every file in every .apff5pr (these must be identical; the zip metadata may differ)
+#
+# Usage:
+#   python bench_output.py [--baseline-rev HEAD] [--players 4] [--runs 3]
+#
+# Exits with an error if any output differs.
+#
+
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+import resource
+import tempfile
+import subprocess
+
+BenchmarksPath = os.path.dirname(os.path.abspath(__file__))
+RepoPath = os.path.dirname(BenchmarksPath)
+
+# The largest outputs we can make: every shop item is a Location, and every optional shop is in play.
+BigSeedOptions = {
+  'add_shop_locations': 1,
+  'percent_shop_inventory_as_locations': 100,
+  'percent_shop_inventory_as_locations_min': 100,
+  'percent_shop_inventory_as_locations_max': 100,
+  'split_shared_shops': 1,
+  'sell_blue_magic_in_shops': 1,
+  'shuffle_shops': 1,
+  'shuffle_bosses': 1,
+}
+
+
+# Runs in a child process (with FF5PR_CUSTOM_WORLD set), and prints its results as JSON.
+def worker(outDir, numPlayers, runs):
+  import harness
+  multiworld = harness.build_multiworld(numPlayers, seed=5150, options=BigSeedOptions)
+  harness.run_stages(multiworld, outDir, until='fill')
+
+  best = None
+  rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  for i in range(runs):
+    start = time.perf_counter()
+    harness.run_stage(multiworld, 'generate_output', outDir)
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+    if i == 0:
+      rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+  print(json.dumps({ 'seconds': best, 'rss_growth_kib': rss_growth }))
+
+
+# Run 'worker' for the world in 'worldDir'
+def run_worker(worldDir, outDir, numPlayers, runs):
+  env = dict(os.environ)
+  env['FF5PR_CUSTOM_WORLD'] = worldDir
+  env['PYTHONHASHSEED'] = '0'
+  proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', outDir, str(numPlayers), str(runs)], cwd=BenchmarksPath, env=env, capture_output=True, text=True)
+  if proc.returncode != 0:
+    raise Exception(f"Worker failed for {worldDir}:\n{proc.stderr}")
+  return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# Compare the contents of every .apff5pr in two directories; returns a list of differences
+def compare_outputs(dirA, dirB):
+  diffs = []
+  names = sorted(set(os.listdir(dirA)) | set(os.listdir(dirB)))
+  for name in names:
+    if not (os.path.exists(os.path.join(dirA, name)) and os.path.exists(os.path.join(dirB, name))):
+      diffs.append(f"{name}: only in one output")
+      continue
+    with zipfile.ZipFile(os.path.join(dirA, name)) as zfA, zipfile.ZipFile(os.path.join(dirB, name)) as zfB:
+      if zfA.namelist() != zfB.namelist():
+        diffs.append(f"{name}: different files ({zfA.namelist()} vs. {zfB.namelist()})")
+        continue
+      for member in zfA.namelist():
+        if zfA.read(member) != zfB.read(member):
+          diffs.append(f"{name}: {member} differs")
+  return diffs
+
+
+def dir_size(path):
+  return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main():
+  if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+    worker(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    return
+
+  parser = argparse.ArgumentParser(description='Compare generate_output() between a git revision and the working tree.')
+  parser.add_argument('--baseline-rev', default='HEAD', help='Git revision to compare against')
+  parser.add_argument('--players', type=int, default=4, help='Number of FF5 players')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as tmpDir:
+    # Extract the baseline world
+    beforeWorld = os.path.join(tmpDir, 'before_world')
+    os.makedirs(beforeWorld)
+    archive = subprocess.run(['git', 'archive', args.baseline_rev, 'custom_world'], cwd=RepoPath, capture_output=True, check=True).stdout
+    subprocess.run(['tar', '-x', '-C', beforeWorld], input=archive, check=True)
+    beforeWorld = os.path.join(beforeWorld, 'custom_world')
+
+    results = {}
+    for label, worldDir in [('before', beforeWorld), ('after', os.path.join(RepoPath, 'custom_world'))]:
+      outDir = os.path.join(tmpDir, f"out_{label}")
+      os.makedirs(outDir)
+      results[label] = run_worker(worldDir, outDir, args.players, args.runs)
+      results[label]['output_bytes'] = dir_size(outDir)
+
+    print(f"{'':>8} {'generate_output (ms)':>21} {'peak RSS growth (KiB)':>22} {'output size (KiB)':>18}")
+    for label in ['before', 'after']:
+      res = results[label]
+      print(f"{label:>8} {1000*res['seconds']:>21.2f} {res['rss_growth_kib']:>22} {res['output_bytes']/1024:>18.1f}")
+
+    diffs = compare_outputs(os.path.join(tmpDir, 'out_before'), os.path.join(tmpDir, 'out_after'))
+    if len(diffs) > 0:
+      print("ERROR: Outputs differ:")
+      for diff in diffs:
+        print(f"  {diff}")
+      sys.exit(1)
+    print(f"Outputs are identical (baseline: {args.baseline_rev}).")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,105 @@
+#
+# Benchmark (and determinism check): writing the .apff5pr files in worker processes.
+# With output workers on (see custom_world/ff5pr/Snapshot.py), each World pickles a snapshot of what generate_output()
+#   needs and a ProcessPoolExecutor writes the files. We run generate_output() for the same filled multiworld twice:
+#   * serial  -- every file written in this process, one player at a time (the default)
+#   * workers -- the same, with N output workers (stage_generate_output() hands every World to the pool first)
+# ...and check that every member of every .apff5pr is byte-for-byte the same both ways (the zip timestamps aren't
+#   compared). Any difference is an error, since it means the snapshot is missing something.
+# Players cycle through several option presets (split/shuffled shops, boss shuffle, etc.), so each part of the snapshot is used.
+#
+# Usage:
+#   python bench_parallel_output.py [--players 16] [--workers 4] [--runs 3]
+#
+
+import os
+import time
+import zipfile
+import argparse
+import tempfile
+
+import harness
+from bench_generation import OptionPresets
+
+
+# The presets that players cycle through
+# (Not 'shops': mixed with 'everything', there are too many shop Locations for the harness's simple fill to place all the Gil.)
+MixedPresets = ['default', 'split_shops', 'bosses', 'everything']
+
+
+# Run generate_output() for every player (as Main.py would), with 'workers' output workers (0 for serial)
+def write_outputs(multiworld, outDir, workers):
+  for world in multiworld.worlds.values():
+    world.output_workers = workers
+    world.output_future = None
+  start = time.perf_counter()
+  harness.run_stage(multiworld, 'generate_output', outDir)
+  return time.perf_counter() - start
+
+
+# Read every .apff5pr in 'outDir': { fileName -> { memberName -> bytes } }
+def read_outputs(outDir):
+  res = {}
+  for fileName in sorted(os.listdir(outDir)):
+    if not fileName.endswith('.apff5pr'):
+      continue
+    with zipfile.ZipFile(os.path.join(outDir, fileName)) as zf:
+      res[fileName] = { name: zf.read(name) for name in zf.namelist() }
+  return res
+
+
+# Returns a list of differences (empty if the outputs match)
+# (If FF5PR_METRICS=embed is set, the embedded metrics are timings, which will always differ; we only check that they're there.)
+def compare_outputs(serial, parallel):
+  metricsName = harness.get_world_submodule('Instrumentation').EmbeddedMetricsName
+  diffs = []
+  if sorted(serial.keys()) != sorted(parallel.keys()):
+    diffs.append(f"Different files: {sorted(serial.keys())} vs. {sorted(parallel.keys())}")
+  for fileName in sorted(set(serial.keys()) & set(parallel.keys())):
+    a = serial[fileName]
+    b = parallel[fileName]
+    if list(a.keys()) != list(b.keys()):
+      diffs.append(f"{fileName}: different members: {list(a.keys())} vs. {list(b.keys())}")
+    for name in a.keys():
+      if name in b and a[name] != b[name] and name != metricsName:
+        diffs.append(f"{fileName}: {name} differs")
+  return diffs
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Check that output workers write the same .apff5pr files, and time them.')
+  parser.add_argument('--players', type=int, default=16, help='Number of FF5 players')
+  parser.add_argument('--workers', type=int, default=4, help='Number of output workers')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  presets = [ OptionPresets[name] for name in MixedPresets ]
+  options = [ presets[i % len(presets)] for i in range(args.players) ]
+  multiworld = harness.build_multiworld(args.players, options=options)
+  harness.run_stages(multiworld, None, until='fill')
+
+  results = {}
+  with tempfile.TemporaryDirectory() as serialDir, tempfile.TemporaryDirectory() as parallelDir:
+    # The first run with workers also pays for starting the pool; that happens once per process, so we report it separately.
+    startup = write_outputs(multiworld, parallelDir, args.workers)
+    for _ in range(args.runs):
+      for label, outDir, workers in [('serial', serialDir, 0), ('workers', parallelDir, args.workers)]:
+        elapsed = write_outputs(multiworld, outDir, workers)
+        results[label] = min(elapsed, results.get(label, elapsed))
+
+    diffs = compare_outputs(read_outputs(serialDir), read_outputs(parallelDir))
+
+  print(f"{args.players} players, {args.workers} workers ({os.cpu_count()} CPUs); first run with workers: {1000*startup:.1f} ms")
+  print(f"{'':>8} {'total (ms)':>12} {'per player (ms)':>16}")
+  for label in ['serial', 'workers']:
+    print(f"{label:>8} {1000*results[label]:>12.2f} {1000*results[label]/args.players:>16.3f}")
+
+  if len(diffs) > 0:
+    for diff in diffs:
+      print(f"ERROR: {diff}")
+    raise SystemExit(1)
+  print("Output is identical")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,70 @@
+#
+# Benchmark (and determinism check): scanning the maps in worker processes (Scripts/map_scan.py, --jobs).
+# We build a made-up MagiciteExport (see bench_scan_maps.py), and write every table with scan_all.py's scanners and
+#   1, 2, ... N jobs. For each one we report the time to scan the maps (best of N), the time to write the tables, and the
+#   speedup over 1 job; and check that every table is byte-for-byte the same as with 1 job.
+# The speedup is capped by the number of CPUs (which we print), and by merging the results, which is serial.
+#
+# Usage:
+#   python bench_parallel_scan.py [--jobs 1,2,4] [--areas 100] [--runs 3]
+#
+
+import io
+import os
+import time
+import argparse
+import tempfile
+import contextlib
+
+from bench_scan_maps import make_export, json_size, read_tables   # (This also puts Scripts/ on sys.path)
+
+import map_scan
+import scan_all
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time the map scanners (Scripts/map_scan.py) with more and more worker processes.')
+  parser.add_argument('--jobs', default=f"1,2,{os.cpu_count() or 1}", help='Comma-separated numbers of worker processes')
+  parser.add_argument('--areas', type=int, default=100, help='Areas (map_XXXXX directories) in the export')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  visitors = map_scan.get_visitors(scan_all.Scanners)
+  with tempfile.TemporaryDirectory() as tmpDir:
+    exportPath = os.path.join(tmpDir, 'MagiciteExport')
+    make_export(exportPath, args.areas)
+    numFiles, numBytes = json_size(exportPath)
+    print(f"Export: {args.areas} areas, {numFiles} json files ({numBytes/1024/1024:.1f} MiB); {os.cpu_count()} CPUs")
+
+    tables = {}
+    serial = None
+    print(f"{'jobs':>6} {'scan (s)':>9} {'speedup':>8} {'tables (s)':>11}")
+    for jobs in sorted(set(int(x) for x in args.jobs.split(','))):
+      outPath = os.path.join(tmpDir, f"out_{jobs}")
+      os.makedirs(outPath)
+      with contextlib.redirect_stdout(io.StringIO()):
+        scanTime = best_time(lambda: map_scan.MapScanner(exportPath, visitors, jobs).scan(), args.runs)
+        tablesTime = best_time(lambda: map_scan.write_tables(scan_all.Scanners, exportPath, outPath, jobs), 1)
+      tables[jobs] = read_tables(outPath)
+      serial = scanTime if serial is None else serial
+      print(f"{jobs:>6} {scanTime:>9.3f} {serial/scanTime:>7.2f}x {tablesTime:>11.3f}")
+
+    first = min(tables.keys())
+    for jobs, data in tables.items():
+      if data != tables[first]:
+        raise Exception(f"The tables from {jobs} jobs differ from {first} job(s)")
+    print(f"All {len(tables[first])} tables are identical for {', '.join(str(jobs) for jobs in sorted(tables.keys()))} jobs.")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,131 @@
+#
+# Benchmark (and check): finding overlapping patches (see custom_world/ff5pr/Conflicts.py).
+# We generate a "maximal" seed (the 'everything' preset, plus players with each of the starting-party options) in
+#   'strict' mode, so it fails if any of our patches overlap, and report how many writes each player's output made, and how
+#   long write_output() takes with the check 'off' and on (best of N).
+# We also list the overlaps *within* each patch set in Patches.py (these aren't reported while generating), and check that
+#   a handful of made-up overlaps are found (and that duplicates and hand-offs aren't).
+# Finally, we time find_overlaps() against comparing every pair of writes in a target, for more and more writes.
+#
+# Usage:
+#   python bench_patch_conflicts.py [--runs 3]
+#
+
+import time
+import random
+import argparse
+import tempfile
+
+import harness
+from bench_script_patches import PlayerOptions
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+# Every pair of overlapping writes (that aren't duplicates or hand-offs), the slow way; for checking find_overlaps()
+def naive_overlaps(writes):
+  res = set()
+  for i, a in enumerate(writes.writes):
+    for b in writes.writes[i+1:]:
+      if (a.asset_path, a.target) == (b.asset_path, b.target) and a.start < b.end and b.start < a.end:
+        if (a.start, a.end, a.value) != (b.start, b.end, b.value) and not a.hands_off_to(b):
+          res.add((a.order, b.order))
+  return res
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time and check the patch overlap detector.')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  ff5pr = harness.get_world_module()
+  Conflicts = harness.get_world_submodule('Conflicts')   # (The world imports this when it writes its output)
+  Mnemonics = ff5pr.Mnemonics
+  from worlds.ff5pr.Patches import all_patch_contents
+
+  # Keep each player's writes, as they're checked
+  checked = {}
+  origCheck = Conflicts.PatchWrites.check
+  def check(self, mode, name):
+    checked[name] = self
+    return origCheck(self, mode, name)
+  Conflicts.PatchWrites.check = check
+
+  multiworld = harness.build_multiworld(len(PlayerOptions), options=PlayerOptions)
+  harness.run_stages(multiworld, None, until='fill')
+  timings = {}
+  with tempfile.TemporaryDirectory() as outDir:
+    for mode in ['off', 'strict']:
+      for world in multiworld.worlds.values():
+        world.patch_conflicts = mode
+      timings[mode] = best_time(lambda: harness.run_stage(multiworld, 'generate_output', outDir), args.runs)
+
+  print(f"{len(PlayerOptions)} players generate in 'strict' mode (no overlaps)")
+  for name, writes in sorted(checked.items()):
+    print(f"  {name}: {len(writes.writes)} writes; find_overlaps() takes {1000*best_time(writes.find_overlaps, 20):.3f} ms")
+  print(f"generate_output (ms): {1000*timings['off']:.1f} with the check off, {1000*timings['strict']:.1f} with it on")
+
+  # Overlaps within each patch set (the same for every seed)
+  print(f"\nOverlaps within each patch set:")
+  for name in all_patch_contents.keys():
+    overlaps = Conflicts.find_patch_set_overlaps(name)
+    print(f"  {name}: {len(overlaps)}")
+    for earlier, later in overlaps:
+      print(f"    {earlier.asset_path}: {earlier.describe()} is overwritten by {later.describe()}")
+
+  # Made-up overlaps
+  asset = "Assets/GameAssets/Serial/Res/Map/Map_20250/Map_20250/sc_e_0001"
+  getItem = [Mnemonics.GetItem(1234, 1)]
+  writes = Conflicts.PatchWrites()
+  writes.add_script(f"{asset},/Mnemonics/[2],Nop,Overwrite,0", [Mnemonics.Nop(), Mnemonics.Nop('Chest'), Mnemonics.Nop()], 'placeholder')
+  writes.add_script(f"{asset},/Mnemonics/[3],Nop:Chest,Overwrite,0", getItem, 'hand-off')                      # Fine
+  writes.add_script(f"{asset},/Mnemonics/[3],Nop:Chest,Overwrite,0", getItem, 'same again')                    # Fine (duplicate)
+  writes.add_script(f"{asset},/Mnemonics/[0],Nop:Main,Overwrite,1", getItem * 3, 'runs into the placeholder')  # [1:4]
+  writes.add_script(f"{asset},/Mnemonics/[10],Msg,SetSVal[1],X", None, 'set an sValue')
+  writes.add_script(f"{asset},/Mnemonics/[9],Nop,Overwrite,1", getItem, 'overwrites the sValue')               # [10]
+  writes.add_script(f"{asset},/Mnemonics/[20],Nop,Overwrite,0", getItem, 'party', overrides=True)              # Fine
+  writes.add_properties(asset, '/layers/[0]/objects/{id=5}/properties', { 'product_group_id': 7 }, 'shop')
+  writes.add_properties(asset, '/layers/[0]/objects/{id=5}/properties', { 'product_group_id': 7 }, 'same shop')  # Fine
+  writes.add_properties(asset, '/layers/[0]/objects/{id=5}/properties', { 'product_group_id': 8 }, 'other shop')
+  found = sorted((earlier.source, later.source) for earlier, later in writes.find_overlaps())
+  expected = [('placeholder', 'runs into the placeholder'), ('set an sValue', 'overwrites the sValue'), ('shop', 'other shop')]
+  if found != expected:
+    raise Exception(f"Expected overlaps: {expected} ; found: {found}")
+  try:
+    writes.check('strict', 'test')
+    raise Exception("'strict' mode didn't fail")
+  except Exception as ex:
+    if '3 patches for test overlap' not in str(ex):
+      raise
+  print(f"\n{len(expected)} made-up overlaps were found (and the duplicates and hand-offs weren't)")
+
+  # Scaling: random Overwrites (mostly short, a few long) into a few scripts
+  rng = random.Random(5)
+  print(f"\n{'writes':>8} {'overlaps':>9} {'sweep (ms)':>11} {'pairwise (ms)':>14}")
+  for numWrites in [1000, 4000, 16000]:
+    writes = Conflicts.PatchWrites()
+    for i in range(numWrites):
+      start = rng.randrange(numWrites * 4)
+      length = rng.choice([1, 1, 1, 2, 4, 12])
+      writes.add(f"asset_{i % 8}", '/Mnemonics', start, start + length, i, f"write {i}")
+    sweep = best_time(writes.find_overlaps, args.runs)
+    pairwise = best_time(lambda: naive_overlaps(writes), 1) if numWrites <= 4000 else None
+    if pairwise is not None:
+      found = set((earlier.order, later.order) for earlier, later in writes.find_overlaps())
+      if not found <= naive_overlaps(writes):
+        raise Exception("find_overlaps() reported something that isn't an overlap")
+    print(f"{numWrites:>8} {len(writes.find_overlaps()):>9} {1000*sweep:>11.2f} {(f'{1000*pairwise:.2f}' if pairwise else '-'):>14}")
+
+  Conflicts.PatchWrites.check = origCheck
+
+
+if __name__ == "__main__":
+  main()
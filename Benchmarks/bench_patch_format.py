@@ -0,0 +1,101 @@
+#
+# Benchmark (and check): parsing the patch sets in Patches.py (see custom_world/ff5pr/PatchFormat.py).
+# For every patch set, we:
+#   * time parse_patch_text() (best of N); get_patch_set() only does this once per process
+#   * check that it parses to the same headers and json as the game's reader would see (parse_patch_file(), from
+#     bench_script_patches.py), and that its compact text parses back to the same patches
+# We also check that a handful of broken patches are rejected, with the patch set and line in the error.
+#
+# Usage:
+#   python bench_patch_format.py [--runs 50]
+#
+
+import time
+import argparse
+
+import harness
+from bench_script_patches import parse_patch_file
+
+
+# Broken patches, and (part of) the error each should raise
+GoodHeader = "Assets/GameAssets/Serial/Res/Map/Map_20250/Map_20250/sc_e_0001,/Mnemonics/[3],SysCall,Overwrite,0"
+NopJson = '[{"label": "","mnemonic": "Nop","operands": {"iValues": [0,0,0,0,0,0,0,0],"rValues": [0,0,0,0,0,0,0,0],"sValues": ["","","","","","","",""]},"type": 2,"comment": ""}]'
+BrokenPatches = [
+  ('bad json',          GoodHeader + "\n" + NopJson[:-1] + "\n",                                   'invalid json'),
+  ('stray line',        "Asets/oops,/Mnemonics/[0],Nop,Overwrite,0\n" + NopJson + "\n",            "doesn't start with 'Assets'"),
+  ('short header',      "Assets/GameAssets/foo,/Mnemonics/[0],Overwrite\n" + NopJson + "\n",       'expected at least'),
+  ('unknown command',   GoodHeader.replace('Overwrite', 'Overwrote') + "\n" + NopJson + "\n",      'unknown command'),
+  ('missing offset',    GoodHeader[:-2] + "\n" + NopJson + "\n",                                   'needs a (non-negative) offset'),
+  ('no mnemonics',      GoodHeader + "\n[]\n",                                                     'needs a list of Mnemonics'),
+  ('no json',           GoodHeader + "\n\n",                                                       'needs a list of Mnemonics'),
+  ('short operands',    GoodHeader + "\n" + NopJson.replace('[0,0,0,0,0,0,0,0]', '[0,0,0]', 1) + "\n", 'invalid iValues'),
+  ('missing key',       GoodHeader + "\n" + NopJson.replace(',"comment": ""', '') + "\n",          'must have exactly these keys'),
+  ('bad inline xpath',  GoodHeader.replace('/Mnemonics/[3]', '/Mnemonics/[3]:/Mnemonics/[0]') + "\n" + NopJson + "\n", 'only InlinePatch'),
+  ('bad SpotIArray',    "Assets/GameAssets/foo,/layers/[0]/data,,SpotIArray,\n{\"12\": \"x\"}\n",  'SpotIArray needs'),
+  ('bad SetSVal',       "Assets/GameAssets/foo,/Mnemonics/[0],Msg,SetSVal(1),X\n\n",               'invalid SetSVal'),
+]
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+# The game's view of a patch set: [ (header, json or None), ... ]
+def game_view(patchSet):
+  res = []
+  for patch in patchSet.patches:
+    payload = patch.payload
+    if isinstance(payload, list):
+      payload = [ mnemonic.to_json() for mnemonic in payload ]
+    res.append((patch.header, payload))
+  return res
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time and check parsing of the patch sets in Patches.py.')
+  parser.add_argument('--runs', type=int, default=50, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  PatchFormat = harness.get_world_module().PatchFormat
+  from worlds.ff5pr.Patches import all_patch_contents
+
+  print(f"{'patch set':>36} {'patches':>8} {'mnemonics':>10} {'parse (ms)':>11}")
+  total = 0
+  for name, text in all_patch_contents.items():
+    patchSet = PatchFormat.get_patch_set(name)
+    if PatchFormat.get_patch_set(name) is not patchSet:
+      raise Exception(f"{name}: get_patch_set() parsed it twice")
+    if game_view(patchSet) != parse_patch_file(text):
+      raise Exception(f"{name}: doesn't parse to what the game would see")
+    if PatchFormat.parse_patch_text(name, patchSet.encode('compact')).patches != patchSet.patches:
+      raise Exception(f"{name}: the compact text doesn't parse back to the same patches")
+    if patchSet.encode('debug') != text:
+      raise Exception(f"{name}: the debug text isn't the same as Patches.py")
+
+    elapsed = best_time(lambda: PatchFormat.parse_patch_text(name, text), args.runs)
+    total += elapsed
+    mnemonics = sum(len(patch.payload) for patch in patchSet.patches if isinstance(patch.payload, list))
+    print(f"{name:>36} {len(patchSet.patches):>8} {mnemonics:>10} {1000*elapsed:>11.3f}")
+  print(f"{'total':>36} {'':>8} {'':>10} {1000*total:>11.3f}")
+
+  # Broken patches must be rejected
+  for label, text, expected in BrokenPatches:
+    try:
+      PatchFormat.parse_patch_text(label, "# A comment\n\n" + text)
+    except Exception as ex:
+      if expected not in str(ex) or "(line 3)" not in str(ex):
+        raise Exception(f"'{label}' raised the wrong error: {ex}")
+      continue
+    raise Exception(f"'{label}' wasn't rejected")
+  PatchFormat.validate_patches()
+  print(f"\nEvery patch set parses the same as the game would see it; {len(BrokenPatches)} broken patches were rejected")
+
+
+if __name__ == "__main__":
+  main()
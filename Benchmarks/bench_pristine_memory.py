@@ -0,0 +1,169 @@
+#
+# Benchmark: per-World cost of taking a private copy of the pristine data.
+# Compares the copy-on-write views returned by clone_pristine_obs() against the old approach of deep-copying
+#   every pristine dictionary, measuring both the memory that stays allocated per World (tracemalloc) and the time taken.
+# It also checks that changes made through one World's views are not seen by any other World.
+# Reading through the views isn't free, so we also time generate_output() (best of N) for a few Worlds, once through
+#   their views and once with plain copies of what those views show (i.e., what the old deep copies held, with the same
+#   changes made), and check that both write the same output.
+#
+# Usage:
+#   python bench_pristine_memory.py [--worlds 50] [--output-worlds 4] [--runs 5]
+#
+
+import os
+import copy
+import time
+import zipfile
+import argparse
+import tempfile
+import tracemalloc
+
+import harness
+
+
+# The original clone_pristine_obs(), which deep-copied everything
+def legacy_clone_pristine_obs(pristine):
+  res_items = copy.deepcopy(pristine.pristine_items)
+  res_regions = copy.deepcopy(pristine.pristine_regions)
+  res_locations = pristine.make_pristine_locations(res_regions)
+  res_connections = copy.deepcopy(pristine.pristine_connections)
+  res_shops = copy.deepcopy(pristine.pristine_shops)
+  res_optional_shops = copy.deepcopy(pristine.optional_split_shops)
+  res_optional_blue_magic_shops = copy.deepcopy(pristine.optional_blue_magic_shops)
+  res_game_patches = copy.deepcopy(pristine.pristine_game_patches)
+  return res_items, res_locations, res_regions, res_connections, res_shops, res_optional_shops, res_optional_blue_magic_shops, res_game_patches
+
+
+# Make 'num_worlds' copies with 'clone_fn', returning (bytes per world, seconds per world)
+def measure(clone_fn, num_worlds):
+  tracemalloc.start()
+  start_mem = tracemalloc.get_traced_memory()[0]
+  start = time.perf_counter()
+  clones = [ clone_fn() for _ in range(num_worlds) ]
+  elapsed = time.perf_counter() - start
+  end_mem = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  del clones
+  return (end_mem - start_mem) / num_worlds, elapsed / num_worlds
+
+
+# Shuffle a shop in one World and make sure no other World (or the shared data) sees it
+def check_isolation(pristine):
+  views_a = pristine.clone_pristine_obs()
+  views_b = pristine.clone_pristine_obs()
+  shops_a, shops_b = views_a[4], views_b[4]
+
+  origItem = pristine.pristine_shops['Tule Weapon Shop'].products['Tule Weapon Shop Item A'].orig_item
+  shops_a['Tule Weapon Shop'].products['Tule Weapon Shop Item A'].orig_item = 'Elixir'
+  assert shops_a['Tule Weapon Shop'].products['Tule Weapon Shop Item A'].orig_item == 'Elixir'
+  assert shops_b['Tule Weapon Shop'].products['Tule Weapon Shop Item A'].orig_item == origItem
+  assert pristine.pristine_shops['Tule Weapon Shop'].products['Tule Weapon Shop Item A'].orig_item == origItem
+
+  # Folding in an optional shop only affects that World's shop list
+  shopName, shop = next(iter(views_a[5].items()))
+  shops_a[shopName] = shop
+  assert shopName in shops_a and shopName not in shops_b and shopName not in pristine.pristine_shops
+
+  # Locations are shared between the region and location views
+  regionName = next(name for name, region in pristine.pristine_regions.items() if len(region.locations) > 0)
+  locName = next(iter(pristine.pristine_regions[regionName].locations))
+  views_a[2][regionName].locations[locName].orig_item = 'Elixir'
+  assert views_a[1][locName].orig_item == 'Elixir'
+  assert views_b[1][locName].orig_item != 'Elixir'
+
+  # Masking a field doesn't leak either
+  views_a[8].mask_field('orig_item', None)
+  assert views_a[1][locName].orig_item is None
+  assert views_b[1][locName].orig_item is not None
+
+
+# A plain copy of what a World sees through one of its views (with its changes made), like the old deep copies held.
+# 'memo' is { id(pristineObject) -> copy }, so that objects shared between views (e.g., a region's locations) stay shared.
+def resolve(value, Overlay, memo):
+  if isinstance(value, Overlay.PristineView):
+    base = value._base
+    res = memo.get(id(base))
+    if res is None:
+      res = memo[id(base)] = copy.copy(base)
+      for name in set(vars(base)) | set(value._overlay.changes.get(base, {})):
+        setattr(res, name, resolve(getattr(value, name), Overlay, memo))
+    return res
+  if isinstance(value, (dict, Overlay.PristineDictView, Overlay.MappingProxyType)):
+    return { key: resolve(entry, Overlay, memo) for key, entry in value.items() }
+  if isinstance(value, (list, tuple)):
+    return [ resolve(entry, Overlay, memo) for entry in value ]
+  return value
+
+
+# { fileName -> { memberName -> bytes } } for every .apff5pr in 'outDir'
+def read_outputs(outDir):
+  res = {}
+  for fileName in sorted(os.listdir(outDir)):
+    with zipfile.ZipFile(os.path.join(outDir, fileName)) as zin:
+      res[fileName] = { name: zin.read(name) for name in zin.namelist() }
+  return res
+
+
+# Time generate_output() for 'num_worlds' Worlds through their views, and then with plain copies of the same data.
+# Archipelago only calls it once per World, so each run gets fresh Worlds (or else the views would already be warm).
+# Returns (views seconds per world, plain seconds per world)
+def measure_output(num_worlds, runs):
+  Overlay = harness.get_world_submodule('Overlay')
+  fields = ['pristine_items', 'pristine_locations', 'pristine_regions', 'pristine_connections', 'pristine_shops', 'pristine_game_patches']
+  timings = []
+  outputs = []
+  with tempfile.TemporaryDirectory() as tmpDir:
+    for label in ['views', 'plain']:
+      best = None
+      for run in range(runs):
+        multiworld = harness.build_multiworld(num_worlds, options={ 'add_shop_locations': 1, 'shuffle_shops': 1 })
+        harness.run_stages(multiworld, None, until='fill')
+        if label == 'plain':
+          for world in multiworld.worlds.values():
+            memo = {}
+            for field in fields:
+              setattr(world, field, resolve(getattr(world, field), Overlay, memo))
+        outDir = os.path.join(tmpDir, f"{label}_{run}")
+        os.mkdir(outDir)
+        start = time.perf_counter()
+        harness.run_stage(multiworld, 'generate_output', outDir)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+      timings.append(best / num_worlds)
+      outputs.append(read_outputs(outDir))
+  if outputs[0] != outputs[1]:
+    raise Exception("generate_output() wrote something different through the views than with plain copies")
+  return timings
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare per-World pristine data cost: overlay views vs. deepcopy.')
+  parser.add_argument('--worlds', type=int, default=50, help='Number of Worlds to create for each approach')
+  parser.add_argument('--output-worlds', type=int, default=4, help='Number of Worlds to write output for')
+  parser.add_argument('--runs', type=int, default=5, help='Best-of-N timing for generate_output()')
+  args = parser.parse_args()
+
+  pristine = harness.get_world_module().Pristine
+  check_isolation(pristine)
+
+  legacy_mem, legacy_time = measure(lambda: legacy_clone_pristine_obs(pristine), args.worlds)
+  new_mem, new_time = measure(pristine.clone_pristine_obs, args.worlds)
+
+  views_output, plain_output = measure_output(args.output_worlds, args.runs)
+
+  print(f"{'approach':>10} {'KiB per world':>14} {'ms per world':>13} {'generate_output (ms per world)':>31}")
+  print(f"{'deepcopy':>10} {legacy_mem/1024:>14.1f} {1000*legacy_time:>13.3f} {1000*plain_output:>31.3f}")
+  print(f"{'overlay':>10} {new_mem/1024:>14.1f} {1000*new_time:>13.3f} {1000*views_output:>31.3f}")
+  print(f"(generate_output() is for {args.output_worlds} Worlds, best of {args.runs}; both write the same output)")
+
+  # Also measure a whole World (through create_items) so that the views' own overhead is included
+  multiworld = harness.build_multiworld(args.worlds, options={ 'add_shop_locations': 1, 'shuffle_shops': 1 })
+  for stage in ['generate_early', 'create_regions', 'create_items']:
+    harness.run_stage(multiworld, stage)
+  changes = [ world.pristine_overlay.num_changes() for world in multiworld.worlds.values() ]
+  print(f"Recorded field changes per world after create_items: avg {sum(changes)/len(changes):.1f}, max {max(changes)}")
+
+
+if __name__ == "__main__":
+  main()
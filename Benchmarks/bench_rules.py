@@ -0,0 +1,97 @@
+#
+# Benchmark: how fast can fill evaluate our access rules?
+# Archipelago's fill (and the spoiler log's sphere sweeps) call every Location and Entrance access rule over and over,
+#   with a growing CollectionState. We simulate that: collect the item pool one item at a time, in random order, and after
+#   each batch, evaluate every rule our World attached to a Location or Entrance.
+# We do this with the compiled rules (Rules.py), and with the old per-Location closures (which called a World method
+#   that re-read the Options and used has_group()), and compare evaluations per second.
+#
+# Usage:
+#   python bench_rules.py [--players 4] [--batch 10]
+#
+
+import time
+import random
+import argparse
+
+import harness
+from BaseClasses import CollectionState
+
+
+# The old rules: a fresh closure per use, calling a World method
+def legacy_rule(world, ruleName):
+  def require_world_1_teleport(state):
+    return state.has("W1Teleport", world.player)
+  def require_X_jobs(state):
+    num_jobs_needed = int(world.options.jobs_for_world1_completion)
+    return state.has_group("Job", world.player, num_jobs_needed)
+  def require_adamant(state):
+    return state.has("Adamantite", world.player)
+  def require_fire_be_gone(state):
+    return state.has("FireBeGone", world.player)
+  method = locals()[ruleName]
+  return lambda state: method(state)
+
+
+# Returns { ruleName -> [ rule, ... ] } for every rule-carrying Location/Entrance in the multiworld, and the same using legacy rules
+def collect_rules(multiworld):
+  rules = {}
+  legacyRules = {}
+  for player in multiworld.player_ids:
+    world = multiworld.worlds[player]
+    ruleNames = { id(rule): name for name, rule in world.rules.items() }
+    for region in world.region_lookup.values():
+      spots = list(region.locations) + region.exits
+      for spot in spots:
+        name = ruleNames.get(id(spot.access_rule))
+        if name is not None:
+          rules.setdefault(name, []).append(spot.access_rule)
+          legacyRules.setdefault(name, []).append(legacy_rule(world, name))
+  return rules, legacyRules
+
+
+# Collect the item pool in batches, evaluating every rule after each batch; returns (seconds, evaluations)
+def simulate_fill(multiworld, rules, batch, seed):
+  items = [ item for item in multiworld.itempool if item.advancement ]
+  random.Random(seed).shuffle(items)
+  state = CollectionState(multiworld)
+  evaluations = 0
+  start = time.perf_counter()
+  for i in range(0, len(items), batch):
+    for item in items[i:i+batch]:
+      state.collect(item)
+    for rule in rules:
+      rule(state)
+    evaluations += len(rules)
+  return time.perf_counter() - start, evaluations
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Measure access rule evaluations per second during a simulated fill.')
+  parser.add_argument('--players', type=int, default=4, help='Number of FF5 players')
+  parser.add_argument('--batch', type=int, default=1, help='Number of items to collect between sweeps')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  options = { 'add_shop_locations': 1, 'split_shared_shops': 1, 'sell_blue_magic_in_shops': 1 }
+  multiworld = harness.build_multiworld(args.players, options=options)
+  harness.run_stages(multiworld, None, until='create_items')
+  rules, legacyRules = collect_rules(multiworld)
+  rules['(all)'] = [ rule for ruleList in rules.values() for rule in ruleList ]
+  legacyRules['(all)'] = [ rule for ruleList in legacyRules.values() for rule in ruleList ]
+
+  print(f"{sum(1 for item in multiworld.itempool if item.advancement)} progression items")
+  print(f"{'rule':>26} {'count':>6} {'legacy evals/sec':>17} {'compiled evals/sec':>19}")
+  for name in sorted(rules.keys()):
+    res = []
+    for ruleList in [legacyRules[name], rules[name]]:
+      best = None
+      for _ in range(args.runs):
+        elapsed, evaluations = simulate_fill(multiworld, ruleList, args.batch, 1234)
+        best = elapsed if best is None else min(best, elapsed)
+      res.append(evaluations/best)
+    print(f"{name:>26} {len(rules[name]):>6} {res[0]:>17.0f} {res[1]:>19.0f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,197 @@
+#
+# Benchmark (and invalidation check): re-scanning the maps with a scan cache (see ScanCache in Scripts/map_scan.py).
+# We build a made-up MagiciteExport (see bench_scan_maps.py), and write every table with scan_all.py's scanners:
+#   * cold:       no cache yet (every file is parsed)
+#   * unchanged:  the same export again (nothing should be read)
+# ...and then change the export in a few ways, and check that each re-scan parses only the files it has to, and writes
+#   exactly the same tables as a scan without any cache:
+#   * edit a treasure, touch a file (same contents), add a script, delete a script, delete a map directory
+#   * share a cache between scan_treasure.py and scan_all.py, re-scan with a corrupt cache, and with --full
+# The times are for the map scan alone (reading the cache included), and for writing all of the tables.
+#
+# Usage:
+#   python bench_scan_cache.py [--areas 100] [--runs 3]
+#
+
+import io
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+from bench_scan_maps import make_export, json_size, read_tables   # (This also puts Scripts/ on sys.path)
+
+import map_scan
+import scan_all
+import scan_treasure
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+# Write every table (quietly), with the cache at 'cachePath' (or None); returns (the MapScanner, the tables, seconds)
+def write_all(exportPath, outPath, cachePath, scanners=scan_all.Scanners, full=False):
+  os.makedirs(outPath, exist_ok=True)
+  start = time.perf_counter()
+  with contextlib.redirect_stdout(io.StringIO()):
+    scanner = map_scan.write_tables(scanners, exportPath, outPath, 1, cachePath, full)
+  elapsed = time.perf_counter() - start
+  return scanner, read_tables(outPath) if scanners == scan_all.Scanners else None, elapsed
+
+
+# Just the map scan (reading the cache, and saving it if anything changed)
+def scan_only(exportPath, cachePath):
+  visitors = map_scan.get_visitors(scan_all.Scanners)
+  with contextlib.redirect_stdout(io.StringIO()):
+    map_scan.MapScanner(exportPath, visitors).scan(map_scan.ScanCache(cachePath, visitors))
+
+
+# Some files in the export
+def find_files(exportPath, prefix):
+  res = []
+  for dirPath, _, fileNames in os.walk(exportPath):
+    for fileName in fileNames:
+      if fileName.startswith(prefix) and fileName.endswith('.json'):
+        res.append(os.path.join(dirPath, fileName))
+  return sorted(res)
+
+
+# Make sure the mtime changes, even on a coarse file system
+def bump_mtime(path):
+  stat = os.stat(path)
+  os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2000000000))
+
+
+def edit_treasure(exportPath):
+  path = find_files(exportPath, 'entity_default')[0]
+  with open(path, encoding='utf-8') as f:
+    root = json.load(f)
+  for layer in root['layers']:
+    for obj in layer['objects']:
+      for prop in obj.get('properties', []):
+        if prop['name'] == 'content_id':
+          prop['value'] = 1 if prop['value'] != 1 else 2
+  with open(path, 'w', encoding='utf-8') as f:
+    json.dump(root, f, indent=2)
+  bump_mtime(path)
+
+
+def touch_script(exportPath):
+  bump_mtime(find_files(exportPath, 'sc_e_')[5])
+
+
+def add_script(exportPath):
+  path = find_files(exportPath, 'sc_e_')[10]
+  mnemonic = { 'label': '', 'mnemonic': 'SetFlag', 'operands': { 'iValues': [299] + [0]*7, 'rValues': [0.0]*8, 'sValues': ['ScenarioFlag9'] + ['']*7 }, 'type': 1 }
+  with open(os.path.join(os.path.dirname(path), 'sc_e_new.json'), 'w', encoding='utf-8') as f:
+    json.dump({ 'Mnemonics': [mnemonic] }, f, indent=2)
+
+
+def delete_script(exportPath):
+  os.remove(find_files(exportPath, 'sc_e_')[20])
+
+
+def delete_map_dir(exportPath):
+  mapDirs = sorted(name for name in os.listdir(exportPath) if name.startswith('map_') and name[4].isdigit())
+  shutil.rmtree(os.path.join(exportPath, mapDirs[-1]))
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time (and check) re-scanning the maps with a scan cache (Scripts/map_scan.py).')
+  parser.add_argument('--areas', type=int, default=100, help='Areas (map_XXXXX directories) in the export')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as tmpDir:
+    exportPath = os.path.join(tmpDir, 'MagiciteExport')
+    make_export(exportPath, args.areas)
+    numFiles, numBytes = json_size(exportPath)
+    print(f"Export: {args.areas} areas, {numFiles} json files ({numBytes/1024/1024:.1f} MiB)")
+
+    outPath = os.path.join(tmpDir, 'out')
+    cachePath = os.path.join(outPath, map_scan.CacheFile)
+    os.makedirs(outPath)
+    print(f"{'':>24} {'scan (s)':>9} {'tables (s)':>11} {'files read':>11} {'parsed':>7}")
+    def report(label, scanner, tablesTime, scanTime=None):
+      scanTime = f"{scanTime:.3f}" if scanTime is not None else '-'
+      print(f"{label:>24} {scanTime:>9} {tablesTime:>11.3f} {scanner.files_read:>11} {scanner.files_parsed:>7}")
+
+    # Cold, then unchanged
+    _, expected, _ = write_all(exportPath, os.path.join(tmpDir, 'nocache'), None)
+    coldScan = best_time(lambda: (os.path.exists(cachePath) and os.remove(cachePath), scan_only(exportPath, cachePath)), args.runs)
+    os.remove(cachePath)
+    scanner, tables, elapsed = write_all(exportPath, outPath, cachePath)
+    report('cold', scanner, elapsed, coldScan)
+    if tables != expected or scanner.files_parsed != scanner.files_read or scanner.files_read == 0:
+      raise Exception("The cold scan didn't match the scan without a cache")
+
+    warmScan = best_time(lambda: scan_only(exportPath, cachePath), args.runs)
+    scanner, tables, elapsed = write_all(exportPath, outPath, cachePath)
+    report('unchanged', scanner, elapsed, warmScan)
+    if tables != expected or scanner.files_read != 0:
+      raise Exception("The unchanged scan didn't match, or read something")
+
+    # Change things, and check each re-scan against a scan without any cache
+    checks = [
+      ('edit a treasure', edit_treasure, 1, 1),
+      ('touch a script', touch_script, 1, 0),
+      ('add a script', add_script, 1, 1),
+      ('delete a script', delete_script, 0, 0),
+      ('delete a map directory', delete_map_dir, 0, 0),
+    ]
+    for label, change, numRead, numParsed in checks:
+      change(exportPath)
+      _, expected, _ = write_all(exportPath, os.path.join(tmpDir, 'nocache'), None)
+      scanner, tables, elapsed = write_all(exportPath, outPath, cachePath)
+      report(label, scanner, elapsed)
+      if tables != expected:
+        raise Exception(f"{label}: the tables don't match a scan without a cache")
+      if (scanner.files_read, scanner.files_parsed) != (numRead, numParsed):
+        raise Exception(f"{label}: expected {numRead} files read and {numParsed} parsed")
+
+    # The scripts can share a cache: scan_all.py re-parses what scan_treasure.py's cache doesn't have, and then neither
+    #   one has to read anything
+    treasurePath = os.path.join(tmpDir, 'treasure')
+    treasureCache = os.path.join(treasurePath, map_scan.CacheFile)
+    scanner, _, _ = write_all(exportPath, treasurePath, treasureCache, [scan_treasure])
+    if scanner.files_parsed != len(find_files(exportPath, 'entity_default')):
+      raise Exception("scan_treasure.py should only parse the entity_defaults")
+    scanner, tables, elapsed = write_all(exportPath, treasurePath, treasureCache)
+    report("after scan_treasure", scanner, elapsed)
+    if tables != expected or scanner.files_parsed != scanner.files_read:
+      raise Exception("After scan_treasure.py: the tables don't match a scan without a cache")
+    for scanners in [[scan_treasure], scan_all.Scanners]:
+      scanner, _, _ = write_all(exportPath, treasurePath, treasureCache, scanners)
+      if scanner.files_read != 0:
+        raise Exception("The scripts don't share a cache")
+
+    # A corrupt cache (a warning, and a full scan), and --full
+    with open(cachePath, 'wb') as f:
+      f.write(b'not a pickle')
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+      start = time.perf_counter()
+      scanner = map_scan.write_tables(scan_all.Scanners, exportPath, outPath, 1, cachePath)
+      elapsed = time.perf_counter() - start
+    report('corrupt cache', scanner, elapsed)
+    if 'WARNING' not in output.getvalue() or read_tables(outPath) != expected or scanner.files_parsed != scanner.files_read:
+      raise Exception("A corrupt cache wasn't re-built")
+    scanner, tables, elapsed = write_all(exportPath, outPath, cachePath, full=True)
+    report('--full', scanner, elapsed)
+    if tables != expected or scanner.files_parsed != scanner.files_read or scanner.files_read == 0:
+      raise Exception("--full didn't re-parse everything")
+
+    print(f"Cache: {os.path.getsize(cachePath)/1024:.0f} KiB; every re-scan wrote the same tables as a scan without a cache.")
+
+
+if __name__ == "__main__":
+  main()
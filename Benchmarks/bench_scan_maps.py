@@ -0,0 +1,307 @@
+#
+# Benchmark (and check): the Scripts/scan_*.py tables, with one walk over the maps (Scripts/map_scan.py).
+# We don't ship the game's assets, so we build a made-up MagiciteExport (make_export()) that's shaped like the real one:
+#   map_XXXXX directories with an entity_default.json (treasure, shops, title overrides, and lots of other objects) and
+#   some event scripts (sc_*.json, with SetFlag/Branch and lots of other Mnemonics) for each map, plus the master .csv files
+#   and system strings the scanners look things up in.
+# Then we time writing all four tables (best of N, each in a new process, with a warm disk cache):
+#   * baseline:  the scan_*.py scripts from a git revision (--baseline-rev), one after another
+#   * separate:  today's scan_*.py scripts, one after another (each one walks the maps)
+#   * scan_all:  scan_all.py (one walk for all of them)
+# (Today's scripts run without a scan cache, so that each run scans everything.)
+# ...and check that every table is byte-for-byte the same. We also count how many json files each one reads.
+# Use a revision from before map_scan.py (e.g., 45eda95) as the baseline to compare against the old scripts.
+#
+# Usage:
+#   python bench_scan_maps.py [--baseline-rev HEAD] [--areas 100] [--runs 3]
+#
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+import subprocess
+
+import harness
+
+ScriptsPath = os.path.join(os.path.dirname(harness.BenchmarksPath), 'Scripts')
+if ScriptsPath not in sys.path:
+  sys.path.insert(0, ScriptsPath)
+import map_scan
+import scan_all
+
+
+# Each map's entity_default and event scripts get padded out with this many (uninteresting) objects/Mnemonics
+PadObjects = 60
+PadMnemonics = 120
+
+NumContent = 400
+NumProductGroups = 40
+NumMonsters = 300
+
+
+def write_json(path, root):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'w', encoding='utf-8') as f:
+    json.dump(root, f, indent=2)
+
+
+def write_csv(path, headers, rows):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'w', encoding='utf-8') as f:
+    f.write(','.join(headers) + '\n')
+    for row in rows:
+      f.write(','.join(str(val) for val in row) + '\n')
+
+
+def prop(name, value, type='int'):
+  return { 'name': name, 'type': type, 'value': value }
+
+
+def mnemonic(name, sValues=(), iValues=(), label=''):
+  sValues = list(sValues) + [''] * (8 - len(sValues))
+  iValues = list(iValues) + [0] * (8 - len(iValues))
+  return { 'label': label, 'mnemonic': name, 'operands': { 'iValues': iValues, 'rValues': [0.0] * 8, 'sValues': sValues }, 'type': 1 }
+
+
+# One map's entity_default: some treasure, maybe a shop or a title override, and a lot of NPCs, doors, etc.
+def make_entity_default(rng, strings, titles):
+  objects = []
+  gid = 1
+  for _ in range(PadObjects):
+    props = [ prop('action_id', rng.randrange(100)), prop('script_id', rng.randrange(5000)), prop('direction', rng.randrange(4)),
+              prop('flag_id', rng.randrange(256)), prop('animation_id', rng.randrange(50)), prop('move_type', rng.randrange(3)) ]
+    objects.append({ 'gid': gid, 'id': len(objects) + 1, 'name': 'npc', 'type': 'event', 'x': rng.randrange(2000), 'y': rng.randrange(2000),
+                     'width': 16, 'height': 16, 'visible': True, 'properties': props })
+    gid += 1
+  for _ in range(rng.randrange(4)):
+    objects.insert(rng.randrange(len(objects)), { 'gid': gid, 'id': len(objects) + 1, 'name': 'treasure', 'type': 'treasure', 'properties': [
+      prop('content_id', rng.randrange(1, NumContent + 1)), prop('content_num', rng.choice([1, 1, 2, 500])),
+      prop('message_key', 'MSG_TRE_GET', 'string'), prop('script_id', rng.randrange(1, 900)) ] })
+    gid += 1
+  if rng.random() < 0.15:
+    objects.insert(rng.randrange(len(objects)), { 'gid': gid, 'id': len(objects) + 1, 'name': 'shop', 'type': 'event',
+                                                  'properties': [ prop('product_group_id', rng.randrange(1, NumProductGroups + 3)) ] })
+  for title in titles:
+    objects.insert(rng.randrange(len(objects)), { 'id': len(objects) + 1, 'name': 'title', 'type': 'area', 'properties': [ prop('title_id', title, 'string') ] })
+  layers = [ { 'name': 'collision', 'objects': [] }, { 'name': 'events', 'objects': objects[:len(objects)//2] },
+             { 'name': 'treasure', 'objects': objects[len(objects)//2:] } ]
+  return { 'layers': layers, 'height': 64, 'width': 64, 'tilewidth': 16, 'tileheight': 16 }
+
+
+# One event script: some flags set and checked, and a lot of other things
+def make_script(rng):
+  res = []
+  for _ in range(PadMnemonics):
+    roll = rng.random()
+    if roll < 0.03:
+      res.append(mnemonic('SetFlag', [rng.choice(['ScenarioFlag1', 'ScenarioFlag2', 'TreasureFlag1'])], [rng.randrange(300)]))
+    elif roll < 0.06:
+      res.append(mnemonic('Branch', ['ScenarioFlag1', 'ScenarioFlag2', 'Gil'], [rng.randrange(300), rng.randrange(300), 1], label=f"L{len(res)}"))
+    elif roll < 0.5:
+      res.append(mnemonic('Msg', [f"STORY_MES_{rng.randrange(5000)}"], [rng.randrange(8)]))
+    else:
+      res.append(mnemonic(rng.choice(['Wait', 'Move', 'Turn', 'SetEntities', 'Nop', 'Exit']), [], [rng.randrange(100), rng.randrange(100)]))
+  return { 'Mnemonics': res }
+
+
+# Write a made-up MagiciteExport to 'exportPath', with 'numAreas' areas (map_XXXXX directories) of a few maps each
+def make_export(exportPath, numAreas, seed=1):
+  rng = random.Random(seed)
+  strings = {}  # key -> string (system_en.txt)
+
+  for contentId in range(1, NumContent + 1):
+    strings[f"MSG_ITEM_{contentId}"] = f"Item {contentId}"
+  write_csv(f"{exportPath}/{map_scan.MasterPath}/content.csv", ['id', 'mes_id_name', 'type_id'],
+            [ (contentId, f"MSG_ITEM_{contentId}", 1) for contentId in range(1, NumContent + 1) ])
+
+  mapRows = []
+  areaRows = []
+  for areaNum in range(numAreas):
+    areaId = 1 + areaNum
+    areaName = f"Map_{20000 + 10*areaNum}"
+    strings[f"MSG_AREA_{areaId}"] = f"Area {areaId}"
+    areaRows.append((areaId, f"MSG_AREA_{areaId}"))
+
+    mapPath = f"{exportPath}/{areaName.lower()}/Assets/GameAssets/Serial/Res/Map/{areaName}"
+    for mapNum in range(1, 2 + rng.randrange(4)):
+      mapName = f"{areaName}_{mapNum}"
+      mapTitle = f"MSG_MAP_{areaId}_{mapNum}" if mapNum > 1 else 'None'
+      if mapTitle != 'None':
+        strings[mapTitle] = f"Room {mapNum}"
+      # Some areas have maps in more than one area.csv entry (like Castle Walse)
+      mapRows.append((len(mapRows) + 1, mapName, mapTitle, areaId if areaNum % 23 != 7 or mapNum == 1 else 1, areaName.lower()))
+
+      # Some maps have title overrides (and a few have more than one, for the same string)
+      titles = []
+      if rng.random() < 0.2:
+        titles = [f"MSG_ARA_NAME_{areaId}_{mapNum}"]
+        strings[titles[0]] = f"Room {mapNum} (later)"
+        if rng.random() < 0.3:
+          titles.append(f"MSG_ARA_NAME_{areaId}_{mapNum}_b")
+          strings[titles[1]] = strings[titles[0]]
+      elif areaNum == 3 and mapNum == 1:
+        titles = ['MSG_ARA_NAME_113']   # This one isn't in the strings
+      write_json(f"{mapPath}/{mapName}/entity_default.json", make_entity_default(rng, strings, titles))
+
+      for scriptNum in range(3 + rng.randrange(6)):
+        write_json(f"{mapPath}/{mapName}/sc_e_{100*areaNum + 10*mapNum + scriptNum:04}.json", make_script(rng))
+
+    # A cutscene version of the first map (only scripts)
+    if areaNum % 9 == 0:
+      nightPath = f"{exportPath}/{areaName.lower()}_nighteffect/Assets/GameAssets/Serial/Res/Map/{areaName}/{areaName}_1"
+      write_json(f"{nightPath}/sc_night_{areaNum}.json", make_script(rng))
+
+  # Not maps
+  write_json(f"{exportPath}/map_script/Assets/GameAssets/Serial/Res/Map/sc_global.json", make_script(rng))
+  write_json(f"{exportPath}/map_ui/ui.json", {})
+
+  write_csv(f"{exportPath}/{map_scan.MasterPath}/map.csv", ['id', 'map_name', 'map_title', 'area_id', 'asset_name'], mapRows)
+  write_csv(f"{exportPath}/{map_scan.MasterPath}/area.csv", ['id', 'area_name'], areaRows + [(numAreas + 1, 'None')])
+
+  # Shops: a few products in each group (some groups and items are missing)
+  for groupId in range(1, NumProductGroups + 1):
+    strings[f"MSG_SHOP_{groupId}"] = f"Shop {groupId}"
+  write_csv(f"{exportPath}/{map_scan.MasterPath}/product_group.csv", ['id', 'mes_id_name'],
+            [ (groupId, f"MSG_SHOP_{groupId}") for groupId in range(1, NumProductGroups + 1) ])
+  write_csv(f"{exportPath}/{map_scan.MasterPath}/product.csv", ['id', 'content_id', 'group_id', 'coefficient', 'purchase_limit'],
+            [ (productId, rng.randrange(1, NumContent + 20), rng.randrange(1, NumProductGroups + 4), 1, 0) for productId in range(1, 8 * NumProductGroups) ])
+
+  # Monsters (some are bosses) and their parties
+  monsterRows = []
+  for monsterId in range(1, NumMonsters + 1):
+    strings[f"MSG_MON_{monsterId}"] = f"Monster {monsterId}"
+    drops = [ rng.choice([0, 0, rng.randrange(1, NumContent + 1)]) for _ in range(8) ]
+    values = [ rng.choice([0, 1, 5]) for _ in range(8) ]
+    monsterRows.append([monsterId, f"MSG_MON_{monsterId}", 1 if rng.random() < 0.2 else 0, rng.randrange(5000), rng.randrange(5000)] + drops + values)
+  write_csv(f"{exportPath}/{map_scan.MasterPath}/monster.csv",
+            ['id', 'mes_id_name', 'boss', 'exp', 'gill'] + [ f"drop_content_id{i}" for i in range(1, 9) ] + [ f"drop_content_id{i}_value" for i in range(1, 9) ],
+            monsterRows)
+  write_csv(f"{exportPath}/{map_scan.MasterPath}/monster_party.csv", ['id', 'get_ap'] + [ f"monster{i}" for i in range(1, 10) ],
+            [ [partyId, rng.randrange(10)] + [ rng.choice([0, 0, 0, rng.randrange(1, NumMonsters + 1)]) for _ in range(9) ] for partyId in range(1, 600) ])
+
+  os.makedirs(f"{exportPath}/{map_scan.MessagePath}", exist_ok=True)
+  with open(f"{exportPath}/{map_scan.MessagePath}/{map_scan.StringFiles['system']}", 'w', encoding='utf-8') as f:
+    for key, value in strings.items():
+      f.write(f"{key}\t{value}\n")
+  with open(f"{exportPath}/{map_scan.MessagePath}/{map_scan.StringFiles['story_mes']}", 'w', encoding='utf-8') as f:
+    for mesId in range(5000):
+      f.write(f"STORY_MES_{mesId}\tSomething happens ({mesId}).\n")
+
+
+# Total size of the json files under 'path'
+def json_size(path):
+  count = 0
+  size = 0
+  for dirPath, _, fileNames in os.walk(path):
+    for fileName in fileNames:
+      if fileName.endswith('.json'):
+        count += 1
+        size += os.path.getsize(os.path.join(dirPath, fileName))
+  return count, size
+
+
+# Extract the Scripts from 'rev', pointed at 'exportPath'
+def extract_scripts(rev, exportPath, destPath):
+  archive = subprocess.run(['git', 'archive', rev, 'Scripts'], cwd=os.path.dirname(harness.BenchmarksPath), capture_output=True, check=True).stdout
+  subprocess.run(['tar', '-x', '-C', destPath], input=archive, check=True)
+  scriptsPath = os.path.join(destPath, 'Scripts')
+  for fileName in os.listdir(scriptsPath):
+    if fileName.endswith('.py'):
+      with open(os.path.join(scriptsPath, fileName), encoding='utf-8') as f:
+        text = f.read()
+      text = re.sub(r"^GamePath = .*$", f"GamePath = {os.path.dirname(exportPath)!r}", text, flags=re.MULTILINE)
+      text = re.sub(r"^DataExportPath = .*$", f"DataExportPath = {os.path.basename(exportPath)!r}", text, flags=re.MULTILINE)
+      with open(os.path.join(scriptsPath, fileName), 'w', encoding='utf-8') as f:
+        f.write(text)
+  return scriptsPath
+
+
+# Run each of 'commands' (in a new process, in 'outPath'); returns the total time
+def run_commands(commands, outPath):
+  start = time.perf_counter()
+  for command in commands:
+    res = subprocess.run([sys.executable] + command, cwd=outPath, capture_output=True, text=True)
+    if res.returncode != 0:
+      raise Exception(f"{' '.join(command)} failed:\n{res.stderr}")
+  return time.perf_counter() - start
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+def read_tables(outPath):
+  res = {}
+  for module in scan_all.Scanners:
+    with open(os.path.join(outPath, module.OutputFile), 'rb') as f:
+      res[module.OutputFile] = f.read()
+  return res
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time and check the map scanners (Scripts/scan_*.py) on a made-up export.')
+  parser.add_argument('--baseline-rev', default='HEAD', help='Git revision to compare against')
+  parser.add_argument('--areas', type=int, default=100, help='Areas (map_XXXXX directories) in the export')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as tmpDir:
+    exportPath = os.path.join(tmpDir, 'MagiciteExport')
+    make_export(exportPath, args.areas)
+    numFiles, numBytes = json_size(exportPath)
+    print(f"Export: {args.areas} areas, {numFiles} json files ({numBytes/1024/1024:.1f} MiB)")
+
+    baselineScripts = extract_scripts(args.baseline_rev, exportPath, tmpDir)
+    modes = [
+      ('baseline', [ [os.path.join(baselineScripts, f"{module.__name__}.py")] for module in scan_all.Scanners ]),
+      ('separate', [ [os.path.join(ScriptsPath, f"{module.__name__}.py"), '--export', exportPath, '--cache', ''] for module in scan_all.Scanners ]),
+      ('scan_all', [ [os.path.join(ScriptsPath, 'scan_all.py'), '--export', exportPath, '--cache', ''] ]),
+    ]
+
+    tables = {}
+    print(f"{'':>10} {'time (s)':>9} {'json files read':>16} {'MiB read':>9}")
+    for label, commands in modes:
+      outPath = os.path.join(tmpDir, f"out_{label}")
+      os.makedirs(outPath)
+      elapsed = best_time(lambda: run_commands(commands, outPath), args.runs)
+      tables[label] = read_tables(outPath)
+
+      # How much each one reads (we can only count this for today's scripts)
+      filesRead = '-'
+      bytesRead = '-'
+      if label != 'baseline':
+        filesRead = 0
+        bytesRead = 0
+        groups = [ [module] for module in scan_all.Scanners ] if label == 'separate' else [ scan_all.Scanners ]
+        with tempfile.TemporaryDirectory() as countPath, contextlib.redirect_stdout(io.StringIO()):
+          for scanners in groups:
+            scanner = map_scan.write_tables(scanners, exportPath, countPath)
+            if scanner is not None:
+              filesRead += scanner.files_read
+              bytesRead += scanner.bytes_read
+        bytesRead = f"{bytesRead/1024/1024:.1f}"
+      print(f"{label:>10} {elapsed:>9.3f} {filesRead:>16} {bytesRead:>9}")
+
+    for label in ['separate', 'scan_all']:
+      for name, data in tables['baseline'].items():
+        if tables[label][name] != data:
+          raise Exception(f"{name} from {label} differs from the baseline ({args.baseline_rev})")
+    print(f"All {len(tables['baseline'])} tables are identical (baseline: {args.baseline_rev}): " +
+          ', '.join(f"{name} ({data.count(b'\n') - 1} rows)" for name, data in tables['baseline'].items()))
+
+
+if __name__ == "__main__":
+  main()
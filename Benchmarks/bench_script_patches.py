@@ -0,0 +1,134 @@
+#
+# Benchmark (and check): script_patch.csv in each output format.
+# Script patches are built from Mnemonic objects (see custom_world/ff5pr/Mnemonics.py); in the 'compact' format, the patch
+#   sets in Patches.py are also re-encoded through them. We generate a "maximal" seed (the 'everything' preset, plus
+#   players with each of the starting-party options) and write the output once in each format, then:
+#   * check that both formats parse to the same patches (header lines and json), using the same rules as the game's
+#     reader (EventPatcher.readInData())
+#   * report the size of script_patch.csv in each format (and its size once deflated, as it is in the .apff5pr)
+#   * time building the patches (best of N): the patch sets from Patches.py (parsed and encoded once per process), and one GetItem
+#     patch for every Location (done for every player), with the old string templates and with Mnemonics (which only encode
+#     each content_id once per process; see encode_get_item())
+#
+# Usage:
+#   python bench_script_patches.py [--runs 50]
+#
+
+import os
+import json
+import time
+import zlib
+import zipfile
+import argparse
+import tempfile
+
+import harness
+from bench_generation import OptionPresets
+
+
+# One player of each kind (the starting-party options each add their own patch)
+PlayerOptions = [
+  OptionPresets['everything'],
+  { 'solo_character_challenge': 1 },
+  { 'bring_your_granddaughter_to_work_day': 1 },
+]
+
+
+# Parse a script patch file the way the game does: [ (header, json or None), ... ]
+def parse_patch_file(text):
+  patches = []
+  jsonLines = None
+  for line in text.split('\n'):
+    line = line.strip()
+    if jsonLines is not None:
+      if line != '':
+        jsonLines.append(line)
+      else:
+        patches[-1] = (patches[-1][0], json.loads(' '.join(jsonLines)) if len(jsonLines) > 0 else None)
+        jsonLines = None
+      continue
+    if line == '' or line.startswith('#'):
+      continue
+    if not line.startswith('Assets'):
+      raise Exception(f"Stray line in patch file: {line}")
+    patches.append((line, None))
+    jsonLines = []
+  if jsonLines is not None and len(jsonLines) > 0:
+    patches[-1] = (patches[-1][0], json.loads(' '.join(jsonLines)))
+  return patches
+
+
+# Write every player's output in 'outputFormat'; returns { fileName -> script_patch.csv text }
+def write_script_patches(multiworld, outputFormat):
+  res = {}
+  for world in multiworld.worlds.values():
+    world.output_format = outputFormat
+  with tempfile.TemporaryDirectory() as outDir:
+    harness.run_stage(multiworld, 'generate_output', outDir)
+    for fileName in sorted(os.listdir(outDir)):
+      if fileName.endswith('.apff5pr'):
+        with zipfile.ZipFile(os.path.join(outDir, fileName)) as zf:
+          res[fileName] = zf.read('script_patch.csv').decode('utf-8')
+  return res
+
+
+# The old way of writing a GetItem patch
+def legacy_get_item(content_id, content_num):
+  return "[" + '{"label": "","mnemonic": "GetItem","operands": {"iValues": [' + f"{content_id},{content_num}" + ',0,0,0,0,0,0],"rValues": [0,0,0,0,0,0,0,0],"sValues": ["","","","","","","",""]},"type": 1,"comment": ""}' + "]\n\n"
+
+
+def best_time(fn, runs):
+  best = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare script_patch.csv size and build time for each output format.')
+  parser.add_argument('--runs', type=int, default=50, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  ff5pr = harness.get_world_module()
+  Mnemonics = ff5pr.Mnemonics
+  PatchFormat = ff5pr.PatchFormat
+  from worlds.ff5pr.Patches import all_patch_contents
+
+  multiworld = harness.build_multiworld(len(PlayerOptions), options=PlayerOptions)
+  harness.run_stages(multiworld, None, until='fill')
+
+  # Make sure both formats say the same thing
+  texts = { outputFormat: write_script_patches(multiworld, outputFormat) for outputFormat in ['debug', 'compact'] }
+  for fileName, debugText in texts['debug'].items():
+    if parse_patch_file(texts['compact'][fileName]) != parse_patch_file(debugText):
+      raise Exception(f"{fileName}: the compact script_patch.csv doesn't parse to the same patches as the debug one")
+
+  print(f"{len(PlayerOptions)} players; every script_patch.csv parses the same in both formats")
+  print(f"{'':>8} {'size (KiB)':>11} {'deflated (KiB)':>15}")
+  for outputFormat, files in texts.items():
+    data = [ text.encode('utf-8') for text in files.values() ]
+    print(f"{outputFormat:>8} {sum(map(len, data))/1024/len(data):>11.1f} {sum(len(zlib.compress(d, 3)) for d in data)/1024/len(data):>15.1f}   (per player)")
+
+  # Build times
+  patchNames = tuple(all_patch_contents.keys())
+  contentIds = [ loc.item.code for world in multiworld.worlds.values() for loc in world.get_locations() if loc.item is not None and loc.item.code is not None ]
+  for cid in contentIds:
+    if Mnemonics.encode_get_item(cid, 1, 'debug') + "\n\n" != legacy_get_item(cid, 1):
+      raise Exception(f"GetItem({cid}) isn't encoded the way the old template wrote it")
+  timings = [
+    ('patch sets (compact)', lambda: [ PatchFormat.parse_patch_text(name, all_patch_contents[name]).encode('compact') for name in patchNames ]),
+    ('GetItem (legacy)', lambda: [ legacy_get_item(cid, 1) for cid in contentIds ]),
+    ('GetItem (debug)', lambda: [ Mnemonics.encode_get_item(cid, 1, 'debug') + "\n\n" for cid in contentIds ]),
+    ('GetItem (compact)', lambda: [ Mnemonics.encode_get_item(cid, 1, 'compact') + "\n\n" for cid in contentIds ]),
+  ]
+  print(f"\n{len(contentIds)} GetItem patches")
+  print(f"{'':>22} {'time (ms)':>10}")
+  for label, fn in timings:
+    print(f"{label:>22} {1000*best_time(fn, args.runs):>10.3f}")
+
+
+if __name__ == "__main__":
+  main()
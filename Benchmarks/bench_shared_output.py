@@ -0,0 +1,55 @@
+#
+# Benchmark: how much does sharing the player-independent output blocks save?
+# Parts of every .apff5pr are identical for every FF5 player (the game patches, default shop costs, boss EXP/AP, etc.);
+#   generate_output() builds these once per process and re-uses them (see get_shared_block() in Output.py).
+# We run generate_output() for N players twice: once normally, and once with the shared blocks cleared before each
+#   player (which is what it costs when every player builds them from scratch).
+#
+# Usage:
+#   python bench_shared_output.py [--players 50] [--runs 3]
+#
+
+import time
+import argparse
+import tempfile
+
+import harness
+
+
+def time_outputs(multiworld, outDir, shared):
+  Output = harness.get_world_submodule('Output')
+  start = time.perf_counter()
+  for player in multiworld.player_ids:
+    if not shared:
+      Output.shared_blocks.clear()
+    multiworld.worlds[player].generate_output(outDir)
+  return time.perf_counter() - start
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time generate_output() with and without shared output blocks.')
+  parser.add_argument('--players', type=int, default=50, help='Number of FF5 players')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  multiworld = harness.build_multiworld(args.players)
+  harness.run_stages(multiworld, None, until='fill')
+  Output = harness.get_world_submodule('Output')
+
+  results = {}
+  with tempfile.TemporaryDirectory() as outDir:
+    for _ in range(args.runs):
+      for label, shared in [('rebuilt', False), ('shared', True)]:
+        Output.shared_blocks.clear()
+        elapsed = time_outputs(multiworld, outDir, shared)
+        results[label] = min(elapsed, results.get(label, elapsed))
+
+  sharedBytes = sum(len(block) for block in Output.shared_blocks.values())
+  print(f"{len(Output.shared_blocks)} shared blocks, {sharedBytes/1024:.1f} KiB per player")
+  print(f"{'':>8} {'total (ms)':>12} {'per player (ms)':>16}")
+  for label in ['rebuilt', 'shared']:
+    print(f"{label:>8} {1000*results[label]:>12.2f} {1000*results[label]/args.players:>16.3f}")
+
+
+if __name__ == "__main__":
+  main()
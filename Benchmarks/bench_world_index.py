@@ -0,0 +1,120 @@
+#
+# Benchmark: does each FF5 player's cost stay flat as the rest of the multiworld grows?
+# multiworld.regions and multiworld.itempool hold *every* player's regions and items, so a World that scans them
+#   to find its own does more work the bigger the multiworld is (and with many FF5 players, the total is quadratic).
+# We make a multiworld with some FF5 players plus a number of "other game" players (simple filler regions/items),
+#   and time the two stages that used to scan those lists: create_items() and gen_pre_process_locations() (along with
+#   add_final_pool_items(), which sorts the final pool by player once for all FF5 players).
+# We also check that Items which Archipelago adds to a player's pool itself (with create_filler(), as item links do) get
+#   their Actions, just like the ones create_items() made.
+#
+# Usage:
+#   python bench_world_index.py [--ff5-players 1,8,32] [--other-players 0,100,500] [--runs 3]
+#
+# Set FF5PR_CUSTOM_WORLD to time an older copy of the world (see harness.py).
+#
+
+import time
+import argparse
+
+import harness
+from BaseClasses import Region, Location, Item, ItemClassification
+
+
+# Roughly the size of a small game
+OtherRegionsPerPlayer = 20
+OtherLocationsPerRegion = 10
+
+
+# Add 'numOther' players' worth of regions+locations, and the same number of items, to the multiworld.
+# These players don't have Worlds; the FF5 worlds just need to step around their data.
+def add_other_players(multiworld, numOther):
+  nextAddress = 1
+  for player in range(multiworld.players + 1, multiworld.players + numOther + 1):
+    multiworld.player_name[player] = f"Other{player}"
+    for r in range(OtherRegionsPerPlayer):
+      region = Region(f"Other Region {r}", player, multiworld)
+      for l in range(OtherLocationsPerRegion):
+        region.locations.append(Location(player, f"Other Location {r}-{l}", nextAddress, region))
+        multiworld.itempool.append(Item(f"Other Item {r}-{l}", ItemClassification.filler, nextAddress, player))
+        nextAddress += 1
+      multiworld.regions.append(region)
+
+
+# Returns (create_items seconds, gen_pre_process_locations seconds), summed over all FF5 players
+def time_once(numFF5, numOther, seed):
+  multiworld = harness.build_multiworld(numFF5, seed=seed)
+  harness.run_stage(multiworld, 'generate_early')
+  harness.run_stage(multiworld, 'create_regions')
+  add_other_players(multiworld, numOther)
+
+  start = time.perf_counter()
+  harness.run_stage(multiworld, 'create_items')
+  createItems = time.perf_counter() - start
+
+  harness.fill(multiworld)
+
+  start = time.perf_counter()
+  harness.get_world_module().FF5PRWorld.add_final_pool_items(multiworld)
+  for player in multiworld.player_ids:
+    multiworld.worlds[player].gen_pre_process_locations({}, {}, {})
+  preProcess = time.perf_counter() - start
+
+  return createItems, preProcess
+
+
+# Replace some of each FF5 player's items with create_filler() items (as an item link would), and make sure that every
+#   Job/Jumbo item they end up with has an Action. Returns the number of filler items that needed one.
+# Any item can be filler, but most of them are already in the pool; so, to make sure we see the ones that aren't, filler
+#   here is the items that create_items() didn't make (once each, Jobs/Jumbo items first, and at most half the pool).
+def check_filler_items(numFF5, seed):
+  multiworld = harness.build_multiworld(numFF5, seed=seed)
+  for stage in ['generate_early', 'create_regions', 'create_items']:
+    harness.run_stage(multiworld, stage)
+  fillers = []
+  for player in multiworld.player_ids:
+    world = multiworld.worlds[player]
+    poolNames = { item.name for item in multiworld.itempool if item.player == player }
+    fillerNames = sorted([ name for name in world.item_name_to_id if name not in poolNames ], key=lambda name: world.item_table.get(name).action is None)
+    ours = [ i for i, item in enumerate(multiworld.itempool) if item.player == player ]
+    fillerNames = fillerNames[:len(ours)//2]
+    world.get_filler_item_name = iter(fillerNames).__next__
+    for i in world.random.sample(ours, len(fillerNames)):
+      multiworld.itempool[i] = world.create_filler()
+      fillers.append(multiworld.itempool[i])
+  harness.fill(multiworld)
+  harness.get_world_module().FF5PRWorld.add_final_pool_items(multiworld)
+
+  for player in multiworld.player_ids:
+    world = multiworld.worlds[player]
+    item_cid_to_action = {}
+    world.gen_pre_process_locations({}, item_cid_to_action, {})
+    for item in multiworld.itempool:
+      if item.player == player and world.item_table.get(item.name).action is not None:
+        if item_cid_to_action.get(item.code - harness.get_world_module().PristineMultiworldItemStart) is None:
+          raise Exception(f"No Action for {item.name} (Player {player})")
+  return sum(1 for item in fillers if multiworld.worlds[item.player].item_table.get(item.name).action is not None)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time per-FF5-player work as the rest of the multiworld grows.')
+  parser.add_argument('--ff5-players', default='1,8,32', help='Comma-separated list of FF5 player counts')
+  parser.add_argument('--other-players', default='0,100,500', help='Comma-separated list of other-game player counts')
+  parser.add_argument('--runs', type=int, default=3, help='Best-of-N timing')
+  args = parser.parse_args()
+
+  numSpecial = check_filler_items(2, 1234)
+  print(f"Every Job/Jumbo item added with create_filler() has an Action ({numSpecial} of them)\n")
+
+  print(f"{'FF5':>6} {'others':>8} {'other items':>12} {'create_items/player (ms)':>25} {'pre_process/player (ms)':>24}")
+  for numFF5 in [ int(x) for x in args.ff5_players.split(',') ]:
+    for numOther in [ int(x) for x in args.other_players.split(',') ]:
+      runs = [ time_once(numFF5, numOther, 1234) for _ in range(args.runs) ]
+      createItems = min(run[0] for run in runs)
+      preProcess = min(run[1] for run in runs)
+      totalItems = numOther * OtherRegionsPerPlayer * OtherLocationsPerRegion
+      print(f"{numFF5:>6} {numOther:>8} {totalItems:>12} {1000*createItems/numFF5:>25.3f} {1000*preProcess/numFF5:>24.3f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,148 @@
+#
+# Headless generation harness for the FF5 world.
+# This builds a multiworld out of N FF5 players using the local Archipelago stand-in (see standin/),
+#   and then runs the same World stages that Archipelago's Main.py would, in the same order.
+# The fill step is a simple random placement; it ignores access rules, since we only care about
+#   timing the world's own code (and about producing a valid set of output files).
+#
+# Usage (from any directory):
+#   import harness
+#   multiworld = harness.build_multiworld(4, seed=1234)
+#   harness.run_stages(multiworld, output_directory)
+#
+
+import os
+import sys
+import time
+import random
+import importlib
+import dataclasses
+
+BenchmarksPath = os.path.dirname(os.path.abspath(__file__))
+StandInPath = os.path.join(BenchmarksPath, 'standin')
+# Set FF5PR_CUSTOM_WORLD to load the world from somewhere else (e.g., an older checkout, for comparison)
+CustomWorldPath = os.environ.get('FF5PR_CUSTOM_WORLD', os.path.join(os.path.dirname(BenchmarksPath), 'custom_world'))
+
+# Make sure our stand-in shadows anything else named "BaseClasses", "worlds", etc.
+if StandInPath not in sys.path:
+  sys.path.insert(0, StandInPath)
+
+import worlds
+if CustomWorldPath not in worlds.__path__:
+  worlds.__path__.append(CustomWorldPath)
+
+from BaseClasses import MultiWorld, Location
+
+
+# The order that Archipelago calls each World stage in (the subset the FF5 world implements)
+GenerationStages = ['generate_early', 'create_regions', 'create_items', 'fill', 'generate_output']
+
+
+# Import (and return) the FF5 world module.
+def get_world_module():
+  import worlds.ff5pr
+  return worlds.ff5pr
+
+# Import (and return) one of the FF5 world's modules (e.g., 'Output'); some of them aren't imported until they're needed
+def get_world_submodule(name):
+  return importlib.import_module(f"{get_world_module().__name__}.{name}")
+
+
+# Make an options object for FF5, with every option at its default unless it's in 'overrides'
+def make_options(overrides=None):
+  ff5pr = get_world_module()
+  overrides = overrides if overrides is not None else {}
+  values = {}
+  for field in dataclasses.fields(ff5pr.FF5PROptions):
+    optType = field.type
+    values[field.name] = optType(overrides.get(field.name, optType.default))
+  unknown = set(overrides.keys()) - set(values.keys())
+  if len(unknown) > 0:
+    raise Exception(f"Unknown FF5 options: {sorted(unknown)}")
+  return ff5pr.FF5PROptions(**values)
+
+
+# Create a multiworld with 'num_players' FF5 worlds in it (but don't run any stages yet)
+# 'options' is either one dict of option overrides (shared) or a list of them (one per player)
+def build_multiworld(num_players, seed=1234, options=None):
+  ff5pr = get_world_module()
+  multiworld = MultiWorld(num_players)
+  multiworld.set_seed(seed)
+  for player in multiworld.player_ids:
+    playerOpts = options[player-1] if isinstance(options, list) else options
+    multiworld.game[player] = ff5pr.FF5PRWorld.game
+    world = ff5pr.FF5PRWorld(multiworld, player)
+    world.options = make_options(playerOpts)
+    multiworld.worlds[player] = world
+  return multiworld
+
+
+# Call one World stage on every player
+def call_all(multiworld, stage, *args):
+  for player in multiworld.player_ids:
+    getattr(multiworld.worlds[player], stage)(*args)
+
+
+# Call a World class's stage_<stage>() hook (once, for all of its Worlds), if it has one
+def call_stage(multiworld, stage, *args):
+  stageFn = getattr(get_world_module().FF5PRWorld, f"stage_{stage}", None)
+  if stageFn is not None:
+    stageFn(multiworld, *args)
+
+
+# Very simple fill: put the item pool into all empty locations at random, respecting item rules only.
+# Locations with an item rule (e.g., shops, which reject Gil) are filled first, while there are still plenty of items
+#   to choose from; the rest will take anything. If we still get stuck, we reshuffle and try again (a few times).
+FillAttempts = 10
+
+def fill(multiworld):
+  rng = random.Random(multiworld.seed)
+  locations = [ loc for loc in multiworld.get_locations() if loc.item is None ]
+  if len(multiworld.itempool) != len(locations):
+    raise Exception(f"Item pool size ({len(multiworld.itempool)}) does not match the number of empty locations ({len(locations)})")
+  for attempt in range(FillAttempts):
+    items = list(multiworld.itempool)
+    rng.shuffle(items)
+    rng.shuffle(locations)
+    locations.sort(key=lambda loc: loc.item_rule is Location.item_rule)   # Stable, so still shuffled
+    for loc in locations:
+      for i in range(len(items)-1, -1, -1):
+        if loc.item_rule is Location.item_rule or loc.item_rule(items[i]):
+          loc.item = items.pop(i)
+          loc.item.location = loc
+          break
+      else:
+        # Undo this attempt
+        for placed in locations:
+          if placed.item is not None:
+            placed.item.location = None
+            placed.item = None
+        break
+    else:
+      return
+  raise Exception(f"Could not place every item after {FillAttempts} attempts")
+
+
+# Run one stage on the whole multiworld
+def run_stage(multiworld, stage, output_directory=None):
+  if stage == 'fill':
+    fill(multiworld)
+  elif stage == 'generate_output':
+    # Main.py starts the stage hook first, and then each player's generate_output() (all in a thread pool)
+    call_stage(multiworld, stage, output_directory)
+    call_all(multiworld, stage, output_directory)
+  else:
+    call_all(multiworld, stage)
+
+
+# Run all generation stages, returning { stage -> seconds }
+# If 'until' is set, we stop after that stage.
+def run_stages(multiworld, output_directory, until=None):
+  timings = {}
+  for stage in GenerationStages:
+    start = time.perf_counter()
+    run_stage(multiworld, stage, output_directory)
+    timings[stage] = time.perf_counter() - start
+    if stage == until:
+      break
+  return timings
@@ -0,0 +1,270 @@
+#
+# Stand-in for Archipelago's BaseClasses module.
+# Only the parts that the FF5 world (and our benchmark harness) actually touch are implemented.
+# Behavior follows Archipelago 0.6.x as closely as is practical; performance characteristics matter
+#   more than completeness here, since this only exists to time the world's own code.
+#
+
+import random
+from collections import Counter
+from enum import IntEnum, IntFlag
+
+
+class ItemClassification(IntFlag):
+  filler = 0b0000
+  progression = 0b0001
+  useful = 0b0010
+  trap = 0b0100
+  skip_balancing = 0b1000
+  deprioritized = 0b10000
+  progression_skip_balancing = 0b1001
+  progression_deprioritized = 0b10001
+  progression_deprioritized_skip_balancing = 0b11001
+
+
+class LocationProgressType(IntEnum):
+  DEFAULT = 1
+  PRIORITY = 2
+  EXCLUDED = 3
+
+
+class Tutorial:
+  def __init__(self, tutorial_name, description, language, file_name, link, authors):
+    self.tutorial_name = tutorial_name
+    self.description = description
+    self.language = language
+    self.file_name = file_name
+    self.link = link
+    self.authors = authors
+
+
+class Item:
+  game: str = "Generic"
+
+  def __init__(self, name, classification, code, player):
+    self.name = name
+    self.classification = classification
+    self.code = code
+    self.player = player
+    self.location = None
+
+  @property
+  def advancement(self):
+    return bool(self.classification & ItemClassification.progression)
+
+  def __repr__(self):
+    return self.__str__()
+
+  def __str__(self):
+    if self.location and self.location.parent_region and self.location.parent_region.multiworld:
+      return self.location.parent_region.multiworld.get_name_string_for_object(self)
+    return f"{self.name} (Player {self.player})"
+
+
+class Location:
+  game: str = "Generic"
+
+  def __init__(self, player, name='', address=None, parent=None):
+    self.player = player
+    self.name = name
+    self.address = address
+    self.parent_region = parent
+    self.item = None
+    self.locked = False
+    self.progress_type = LocationProgressType.DEFAULT
+    self.access_rule = Location.access_rule
+    self.item_rule = Location.item_rule
+
+  @staticmethod
+  def access_rule(state):
+    return True
+
+  @staticmethod
+  def item_rule(item):
+    return True
+
+  def can_fill(self, state, item, check_access=True):
+    return self.item_rule(item) and (not check_access or self.can_reach(state))
+
+  def can_reach(self, state):
+    return self.parent_region.can_reach(state) and self.access_rule(state)
+
+  def place_locked_item(self, item):
+    self.item = item
+    item.location = self
+    self.locked = True
+
+  def __repr__(self):
+    return f"{self.name} (Player {self.player})"
+
+
+class Entrance:
+  def __init__(self, player, name='', parent=None):
+    self.player = player
+    self.name = name
+    self.parent_region = parent
+    self.connected_region = None
+    self.access_rule = lambda state: True
+
+  def can_reach(self, state):
+    return self.parent_region.can_reach(state) and self.access_rule(state)
+
+
+class Region:
+  def __init__(self, name, player, multiworld, hint=None):
+    self.name = name
+    self.player = player
+    self.multiworld = multiworld
+    self.locations = []
+    self.entrances = []
+    self.exits = []
+
+  def can_reach(self, state):
+    return state.can_reach_region(self)
+
+  def connect(self, connecting_region, name=None, rule=None):
+    exit_ = Entrance(self.player, name if name else f"{self.name} -> {connecting_region.name}", self)
+    if rule:
+      exit_.access_rule = rule
+    exit_.connected_region = connecting_region
+    self.exits.append(exit_)
+    connecting_region.entrances.append(exit_)
+    return exit_
+
+  def __repr__(self):
+    return f"{self.name} (Player {self.player})"
+
+
+# Archipelago keeps regions in per-player dicts, but iterating it still visits every player's regions.
+class RegionManager(list):
+  def __init__(self):
+    super().__init__()
+    self.location_cache = {}  # player -> { name -> Location }
+    self.player_regions = {}  # player -> [ Region, ... ]
+
+  def append(self, region):
+    super().append(region)
+    self.player_regions.setdefault(region.player, []).append(region)
+
+  def extend(self, regions):
+    for region in regions:
+      self.append(region)
+
+  def __iadd__(self, regions):
+    self.extend(regions)
+    return self
+
+  def get_location(self, name, player):
+    cache = self.location_cache.get(player)
+    if cache is None or name not in cache:
+      cache = { loc.name: loc for region in self if region.player == player for loc in region.locations }
+      self.location_cache[player] = cache
+    return cache[name]
+
+
+class CollectionState:
+  def __init__(self, multiworld):
+    self.multiworld = multiworld
+    self.prog_items = { player: Counter() for player in multiworld.player_ids }
+    self.reachable_regions = { player: set() for player in multiworld.player_ids }
+    self.stale = { player: True for player in multiworld.player_ids }
+
+  def collect(self, item):
+    if item.advancement:
+      self.prog_items[item.player][item.name] += 1
+      self.stale[item.player] = True
+
+  def has(self, item, player, count=1):
+    return self.prog_items[player][item] >= count
+
+  def has_from_list(self, items, player, count):
+    found = 0
+    player_prog_items = self.prog_items[player]
+    for item_name in items:
+      found += player_prog_items[item_name]
+      if found >= count:
+        return True
+    return False
+
+  def has_group(self, item_name_group, player, count=1):
+    found = 0
+    player_prog_items = self.prog_items[player]
+    for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
+      found += player_prog_items[item_name]
+      if found >= count:
+        return True
+    return False
+
+  def update_reachable_regions(self, player):
+    self.stale[player] = False
+    reachable = self.reachable_regions[player]
+    reachable.clear()
+    start = self.multiworld.get_region('Menu', player)
+    reachable.add(start)
+    queue = list(start.exits)
+    while queue:
+      connection = queue.pop()
+      target = connection.connected_region
+      if target in reachable:
+        continue
+      if connection.access_rule(self):
+        reachable.add(target)
+        queue.extend(target.exits)
+
+  def can_reach_region(self, region):
+    if self.stale[region.player]:
+      self.update_reachable_regions(region.player)
+    return region in self.reachable_regions[region.player]
+
+
+class MultiWorld:
+  def __init__(self, players):
+    self.players = players
+    self.player_ids = tuple(range(1, players + 1))
+    self.player_name = { player: f"Player{player}" for player in self.player_ids }
+    self.game = {}
+    self.worlds = {}
+    self.regions = RegionManager()
+    self.itempool = []
+    self.precollected_items = { player: [] for player in self.player_ids }
+    self.completion_condition = {}
+    self.seed = None
+    self.seed_name = None
+    self.random = random.Random()
+
+  def set_seed(self, seed, seed_name=None):
+    self.seed = seed
+    self.seed_name = seed_name if seed_name else str(seed)
+    self.random.seed(seed)
+
+  def get_player_name(self, player):
+    return self.player_name[player]
+
+  def get_name_string_for_object(self, obj):
+    return obj.name if self.players == 1 else f"{obj.name} ({self.get_player_name(obj.player)})"
+
+  def get_out_file_name_base(self, player):
+    return f"AP_{self.seed_name}_P{player}_{self.get_player_name(player)}"
+
+  def get_game_players(self, game_name):
+    return tuple(player for player in self.player_ids if self.game[player] == game_name)
+
+  def get_game_worlds(self, game_name):
+    return tuple(self.worlds[player] for player in self.get_game_players(game_name))
+
+  def get_region(self, name, player):
+    for region in self.regions.player_regions.get(player, []):
+      if region.name == name:
+        return region
+    raise KeyError(f"No such region: {name} for player: {player}")
+
+  def get_location(self, name, player):
+    return self.regions.get_location(name, player)
+
+  # Like Archipelago, this only visits the given player's regions (if there is one)
+  def get_locations(self, player=None):
+    for region in (self.regions if player is None else self.regions.player_regions.get(player, [])):
+      yield from region.locations
+
+  def push_precollected(self, item):
+    self.precollected_items[item.player].append(item)
@@ -0,0 +1,73 @@
+#
+# Stand-in for Archipelago's Options module; just enough for FF5PROptions to be declared and instantiated.
+#
+
+import typing
+from dataclasses import dataclass
+from enum import IntEnum
+
+
+class Visibility(IntEnum):
+  none = 0b0000
+  all = 0b1111
+
+
+class Option:
+  default = 0
+  visibility = Visibility.all
+
+  def __init__(self, value):
+    self.value = value
+
+  def __int__(self):
+    return int(self.value)
+
+  def __bool__(self):
+    return bool(self.value)
+
+  def __eq__(self, other):
+    if isinstance(other, Option):
+      return self.value == other.value
+    return self.value == other
+
+  def __hash__(self):
+    return hash(self.value)
+
+  def __repr__(self):
+    return f"{self.__class__.__name__}({self.value})"
+
+
+class Toggle(Option):
+  default = 0
+
+
+class DefaultOnToggle(Toggle):
+  default = 1
+
+
+class DeathLink(Toggle):
+  display_name = "Death Link"
+
+
+class Range(Option):
+  range_start = 0
+  range_end = 1
+
+
+class Choice(Option):
+  pass
+
+
+class OptionSet(Option):
+  default = frozenset()
+
+
+class OptionGroup(typing.NamedTuple):
+  name: str
+  options: typing.List[typing.Type[Option]]
+  start_collapsed: bool = False
+
+
+@dataclass
+class PerGameCommonOptions:
+  pass
@@ -0,0 +1,3 @@
+#
+# Stand-in for Archipelago's Utils module. The FF5 world imports it, but doesn't use anything from it yet.
+#
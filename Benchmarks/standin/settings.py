@@ -0,0 +1,17 @@
+#
+# Stand-in for Archipelago's settings module (host.yaml).
+# There's no host.yaml here; every World gets the defaults from its settings class, unless a benchmark
+#   puts something else in get_settings().
+#
+
+
+# Base class for a World's host settings; the defaults are just class attributes.
+class Group:
+  pass
+
+
+# { settings_key -> Group }
+host_settings = {}
+
+def get_settings():
+  return host_settings
@@ -0,0 +1,61 @@
+#
+# Stand-in for Archipelago's worlds.AutoWorld module.
+#
+
+import random
+import typing
+
+import settings
+
+
+class WebWorld:
+  tutorials = []
+  game_info_languages = ['en']
+
+
+class World:
+  game = None
+  options_dataclass = None
+  item_name_to_id = {}
+  location_name_to_id = {}
+  item_name_groups = {}
+  location_name_groups = {}
+  topology_present = False
+
+  def __init_subclass__(cls, **kwargs):
+    super().__init_subclass__(**kwargs)
+    if 'settings_key' not in cls.__dict__:
+      cls.settings_key = f"{cls.__module__.split('.')[-1]}_options"
+
+  # Archipelago loads 'settings' from host.yaml, based on the type of the 'settings' annotation
+  def __getattr__(self, item):
+    if item == 'settings':
+      hostSettings = settings.get_settings()
+      if self.settings_key not in hostSettings:
+        settingsType = typing.get_type_hints(type(self)).get('settings')
+        hostSettings[self.settings_key] = typing.get_args(settingsType)[0]() if settingsType is not None else None
+      return hostSettings[self.settings_key]
+    raise AttributeError(item)
+
+  def __init__(self, multiworld, player):
+    self.multiworld = multiworld
+    self.player = player
+    self.random = random.Random(multiworld.random.getrandbits(64))
+    self.options = None
+
+  def get_location(self, location_name):
+    return self.multiworld.get_location(location_name, self.player)
+
+  def get_locations(self):
+    return self.multiworld.get_locations(self.player)
+
+  def get_region(self, region_name):
+    return self.multiworld.get_region(region_name, self.player)
+
+  # Like Archipelago, this picks any item at all unless the World overrides it
+  def get_filler_item_name(self):
+    return self.random.choice(tuple(self.item_name_to_id.keys()))
+
+  # Archipelago calls this to make extra items for a player (e.g., to replace items taken by an item link)
+  def create_filler(self):
+    return self.create_item(self.get_filler_item_name())
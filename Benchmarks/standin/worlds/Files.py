@@ -0,0 +1,34 @@
+#
+# Stand-in for Archipelago's worlds.Files module.
+#
+
+import json
+
+
+class APContainer:
+  game = None
+  patch_file_ending = ""
+
+  def __init__(self, path=None, player=None, player_name="", server=""):
+    self.path = path
+    self.player = player
+    self.player_name = player_name
+    self.server = server
+
+  def get_manifest(self):
+    return {
+      "server": self.server,
+      "player": self.player,
+      "player_name": self.player_name,
+      "game": self.game,
+      "compatible_version": 5,
+      "version": 6,
+    }
+
+  def write_contents(self, opened_zipfile):
+    manifest = self.get_manifest()
+    opened_zipfile.writestr("archipelago.json", json.dumps(manifest, separators=(",", ":")))
+
+
+class APPatch(APContainer):
+  pass
@@ -0,0 +1,4 @@
+#
+# Stand-in for Archipelago's worlds package. The benchmark harness appends our custom_world directory
+#   to __path__, so that the FF5 world can be imported as 'worlds.ff5pr' (just like in a real install).
+#
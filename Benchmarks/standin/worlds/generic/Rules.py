@@ -0,0 +1,25 @@
+#
+# Stand-in for Archipelago's worlds.generic.Rules module.
+#
+
+from BaseClasses import Location
+
+
+def add_rule(spot, rule, combine="and"):
+  old_rule = spot.access_rule
+  if old_rule is Location.access_rule:
+    spot.access_rule = rule if combine == "and" else old_rule
+  elif combine == "and":
+    spot.access_rule = lambda state: rule(state) and old_rule(state)
+  else:
+    spot.access_rule = lambda state: rule(state) or old_rule(state)
+
+
+def add_item_rule(location, rule, combine="and"):
+  old_rule = location.item_rule
+  if old_rule is Location.item_rule:
+    location.item_rule = rule if combine == "and" else old_rule
+  elif combine == "and":
+    location.item_rule = lambda item: rule(item) and old_rule(item)
+  else:
+    location.item_rule = lambda item: rule(item) or old_rule(item)
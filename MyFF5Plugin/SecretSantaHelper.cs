@@ -183,12 +183,35 @@ namespace MyFF5Plugin
             }
 
             // Parse our Location -> Content lookup
-            JsonObject locationCidToItemCid = root["location_cid_to_item_cid"].AsObject();
-            foreach (var entry in locationCidToItemCid)
+            // In "compact" format, this is a list of dense runs: [ [offset, [itemCid, itemCid, ...]], ... ], where the Nth
+            //   itemCid is for Location (location_cid_base + offset + N); 0 means there's no Location with that ID.
+            // In "debug" format, it's just { locationCid -> itemCid }
+            JsonNode locationCidToItemCid = root["location_cid_to_item_cid"];
+            if (locationCidToItemCid is JsonArray)
+            {
+                int locationCidBase = root["location_cid_base"].GetValue<int>();
+                foreach (var run in locationCidToItemCid.AsArray())
+                {
+                    int firstKey = locationCidBase + run[0].GetValue<int>();
+                    JsonArray vals = run[1].AsArray();
+                    for (int i = 0; i < vals.Count; i++)
+                    {
+                        int val = vals[i].GetValue<int>();
+                        if (val != 0)
+                        {
+                            location_cid_to_item_cid[firstKey + i] = val;
+                        }
+                    }
+                }
+            }
+            else
             {
-                int key = Int32.Parse(entry.Key);
-                int val = entry.Value.GetValue<int>();
-                location_cid_to_item_cid[key] = val;
+                foreach (var entry in locationCidToItemCid.AsObject())
+                {
+                    int key = Int32.Parse(entry.Key);
+                    int val = entry.Value.GetValue<int>();
+                    location_cid_to_item_cid[key] = val;
+                }
             }
 
             // Dictionaries of Lists are kind of a pain...
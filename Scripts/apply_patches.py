@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+
+
+import os
+import os.path
+import sys
+import json
+import base64
+import shutil
+import zipfile
+import argparse
+import functools
+import concurrent.futures
+
+from helpers import CsvAsset
+from json_path import XPathError, XPathResolver, compile_xpath, json_value_str
+
+
+#
+# Apply the patches in an .apff5pr to the exported game assets (MagiciteExport), the same way our game client does, so that
+#   a seed can be checked without starting the game. This follows the C# code in MyFF5Plugin:
+#   * script_patch.csv  -- EventPatcher.cs (Overwrite, InlinePatch, SpotIArray, SetSVal[n])
+#   * treasure_mod.csv  -- TreasurePatcher.cs
+#   * master_csvs.json  -- CsvDataPatcher.cs (applied to the exported master .csv files)
+# ...and checks the same things it does (expected mnemonic/label, no Overwrite past the end of a script, no overwriting
+#   a labelled Nop, every treasure property found, etc.). Where the game would log an error and skip a patch, we report it.
+#
+# Each asset is read and parsed once, with all of its patches applied in the order the game applies them (treasures, then
+#   events); paths are resolved with json_path.py, so each array that's searched (e.g., "{id=259}") is only scanned once.
+#   Assets don't depend on each other, so they're patched in a pool of worker processes (see --jobs).
+#
+# Usage:
+#   python apply_patches.py <seed.apff5pr> [--export <MagiciteExport>] [--jobs N] [--out <dir>]
+# --out writes every patched asset there (in the same layout as MagiciteExport); otherwise we only check them.
+# Exits with 1 if any patch failed to apply.
+#
+
+
+# This can be in different places
+GamePath = '/mnt/d/Programs/Steam/steamapps/common/FINAL FANTASY V PR'
+DataExportPath = 'FINAL FANTASY V_Data/StreamingAssets/MagiciteExport'
+
+# Master (csv) assets that the game knows how to patch (see CsvDataPatcher.assetModifiers)
+MasterAssetPath = 'Assets/GameAssets/Serial/Data/Master'
+PatchableMasterAssets = [ f"{MasterAssetPath}/{name}" for name in ['item', 'content', 'monster', 'monster_party', 'product', 'product_group', 'icon', 'ability', 'initialize_data', 'character_status'] ]
+
+
+
+# Raised (and reported) when a single patch can't be applied
+class PatchError(Exception):
+  pass
+
+
+# C#'s ReadLine() + Trim(), over a whole file
+def read_lines(text):
+  return [ line.strip() for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n') ]
+
+
+#
+# script_patch.csv (see EventPatcher.cs)
+#
+
+class EventPatch:
+  def __init__(self, line, json_xpath, inline_xpath, expected_name, command, args):
+    self.line = line                    # Line number in script_patch.csv, for errors
+    self.json_xpath = json_xpath        # E.g., '/Mnemonics/[0]' (see json_path.py)
+    self.inline_xpath = inline_xpath    # For InlinePatch only
+    self.expected_name = expected_name  # [mnemonic, label]; either may be missing or empty
+    self.command = command              # Overwrite, InlinePatch, SpotIArray, SetSVal
+    self.args = args
+    self.snippet = None                 # Parsed json (if any)
+
+
+# Returns: ({ asset_path -> [EventPatch, ...] }, [ errors ])
+# Like the game, we stop reading at the first bad line.
+def read_script_patches(text, fileName='script_patch.csv'):
+  res = {}
+  currEvent = None
+  jsonLines = None   # If not None, we're collecting json for currEvent
+  for lineNum, line in enumerate(read_lines(text), start=1):
+    if jsonLines is not None:
+      if line != '':
+        jsonLines.append(line)
+      else:
+        if len(jsonLines) > 0:
+          try:
+            currEvent.snippet = json.loads(' '.join(jsonLines))
+          except json.JSONDecodeError as ex:
+            return res, [ f"{fileName}:{currEvent.line}: Invalid json: {ex}" ]
+        currEvent = None
+        jsonLines = None
+      continue
+
+    if line == '' or line.startswith('#'):
+      continue
+    if not line.startswith('Assets'):
+      return res, [ f"{fileName}:{lineNum}: Invalid Assets path in Event patch; check for stray newlines!" ]
+
+    parts = line.split(',')
+    if len(parts) < 4:
+      return res, [ f"{fileName}:{lineNum}: Invalid line in Event patch: {line}" ]
+
+    xpaths = parts[1].split(':', 1)
+    command = parts[3]
+    inline_xpath = None
+    if len(xpaths) > 1:
+      if command != 'InlinePatch':
+        return res, [ f"{fileName}:{lineNum}: Invalid inline_xpath in Command: {command}" ]
+      inline_xpath = xpaths[1]
+
+    if command in ['Overwrite', 'InlinePatch']:
+      if len(parts) < 5 or not parts[4].isdigit():
+        return res, [ f"{fileName}:{lineNum}: Missing (or invalid) offset for {command}: {line}" ]
+      args = [ int(parts[4]) ]
+    elif command.startswith('SpotIArray'):
+      command = 'SpotIArray'
+      args = []
+    elif command.startswith('SetSVal'):
+      index = command[len('SetSVal'):]
+      if not (index.startswith('[') and index.endswith(']') and index[1:-1].isdigit()) or len(parts) < 5:
+        return res, [ f"{fileName}:{lineNum}: Invalid SetSVal command+index: {command}" ]
+      command = 'SetSVal'
+      args = [ int(index[1:-1]), parts[4] ]
+    else:
+      return res, [ f"{fileName}:{lineNum}: Unknown Command in Event patch: {command}" ]
+
+    currEvent = EventPatch(lineNum, xpaths[0], inline_xpath, parts[2].split(':', 1), command, args)
+    res.setdefault(parts[0], []).append(currEvent)
+    jsonLines = []
+
+  if jsonLines is not None and len(jsonLines) > 0:
+    try:
+      currEvent.snippet = json.loads(' '.join(jsonLines))
+    except json.JSONDecodeError as ex:
+      return res, [ f"{fileName}:{currEvent.line}: Invalid json: {ex}" ]
+  return res, []
+
+
+# Apply one EventPatch to the asset that 'resolver' is for (EventPatcher.PatchEventJsonPath())
+def apply_event_patch(resolver, patch):
+  parent, node, index = resolver.resolve(patch.json_xpath)
+
+  inlineParent = None
+  inlineKey = None
+  if patch.command in ['Overwrite', 'SetSVal']:
+    if not isinstance(node, dict):
+      raise PatchError(f"Expected Object, not: {type(node).__name__} at path.")
+  elif patch.command == 'InlinePatch':
+    if not isinstance(parent, dict):
+      raise PatchError(f"Expected Parent Object, not: {type(parent).__name__} at outer path.")
+    inlineParent = parent
+    inlineKey = index   # (The key of the inline script in its parent)
+    inlineResolver = XPathResolver(json.loads(base64.b64decode(json_value_str(node)).decode('utf-8')))
+    parent, node, index = inlineResolver.resolve(patch.inline_xpath)
+    if not isinstance(node, dict):
+      raise PatchError(f"Expected Object, not: {type(node).__name__} at *inline* path.")
+  elif patch.command == 'SpotIArray':
+    if not isinstance(node, list):
+      raise PatchError(f"Expected Array, not: {type(node).__name__} at path.")
+
+  # Double-check our mnemonic and label
+  for key, expected in zip(['mnemonic', 'label'], patch.expected_name):
+    if expected != '':
+      actual = node.get(key, '<Missing>') if isinstance(node, dict) else '<Missing>'
+      if actual != expected:
+        raise PatchError(f"Expected {key} was \"{expected}\", but actual one was \"{actual}\"")
+
+  if patch.command in ['Overwrite', 'InlinePatch']:
+    if not isinstance(patch.snippet, list):
+      raise PatchError(f"Expected Array, not: {type(patch.snippet).__name__} for patch element.")
+    if not isinstance(parent, list):
+      raise PatchError(f"Expected the Mnemonic to be in an Array, not: {type(parent).__name__}")
+    overwrite_mnemonics(parent, index, patch.args[0], patch.snippet)
+    resolver.invalidate(parent)
+
+  elif patch.command == 'SpotIArray':
+    if not isinstance(patch.snippet, dict):
+      raise PatchError(f"Expected Object, not: {type(patch.snippet).__name__} for patch element.")
+    errors = []
+    for key, value in patch.snippet.items():
+      index = int(key)
+      if index >= 0 and index < len(node):
+        node[index] = value
+      else:
+        errors.append(f"Could not patch element at index: {index} ; out of range of array: {len(node)}")
+    resolver.invalidate(node)
+    if len(errors) > 0:
+      raise PatchError('; '.join(errors))
+
+  elif patch.command == 'SetSVal':
+    sValues = node.get('operands', {}).get('sValues') if isinstance(node.get('operands'), dict) else None
+    if not isinstance(sValues, list):
+      raise PatchError("No 'operands/sValues' array in json object")
+    if patch.args[0] >= len(sValues):
+      raise PatchError(f"Cannot set index: {patch.args[0]} for sValues array of size: {len(sValues)}")
+    sValues[patch.args[0]] = patch.args[1]
+
+  # Re-encode our inline script
+  if patch.command == 'InlinePatch':
+    innerText = json.dumps(inlineResolver.root, separators=(',', ':'), ensure_ascii=False)
+    inlineParent[inlineKey] = base64.b64encode(innerText.encode('utf-8')).decode('ascii')
+
+
+# EventPatcher.PatchEventOverwrite(): the script can't get any longer, and we can't overwrite a label (a Nop with a label)
+#   unless it's the Mnemonic we matched on (with an offset of 0).
+def overwrite_mnemonics(origMnemonics, startIndex, startOffset, newMnemonics):
+  if startIndex + startOffset + len(newMnemonics) > len(origMnemonics):
+    raise PatchError(f"Mnemonic Buffer Overflow: {len(newMnemonics)} Mnemonics at index {startIndex}+{startOffset}, but the script only has {len(origMnemonics)}")
+
+  destIndex = startIndex + startOffset
+  for newMnemonic in newMnemonics:
+    skipSanityCheck = (destIndex == startIndex) and (startOffset == 0)
+    orig = origMnemonics[destIndex]
+    if not skipSanityCheck and isinstance(orig, dict) and orig.get('mnemonic') == 'Nop' and orig.get('label', '') != '':
+      raise PatchError(f"Trying to overwrite label: {orig['label']}")
+    origMnemonics[destIndex] = json.loads(json.dumps(newMnemonic))   # A copy, as the game makes
+    destIndex += 1
+
+
+
+#
+# treasure_mod.csv (see TreasurePatcher.cs)
+#
+
+class TreasurePatch:
+  def __init__(self, line, json_xpath, patches):
+    self.line = line
+    self.json_xpath = json_xpath
+    self.patches = patches   # { property_name -> value (string) }
+
+
+# Returns: ({ asset_path -> [TreasurePatch, ...] }, [ errors ])
+def read_treasure_patches(text, fileName='treasure_mod.csv'):
+  res = {}
+  columnNames = None
+  lines = read_lines(text)
+  if len(lines) > 0 and lines[-1] == '':
+    lines.pop()   # ReadLine() doesn't see the final newline
+  for lineNum, line in enumerate(lines, start=1):
+    if columnNames is None:
+      columnNames = line.split(',')
+      if columnNames[:2] != ['entity_default', 'json_xpath']:
+        return res, [ f"{fileName}:{lineNum}: Invalid Treasure columns: {columnNames}" ]
+      continue
+
+    row = line.split(',')
+    if len(row) != len(columnNames):
+      return res, [ f"{fileName}:{lineNum}: Bad line: {line}" ]
+
+    # Generic properties: <name>,<type>,<value>
+    if len(row) >= 5 and row[3] in ['string', 'int', 'float']:
+      patches = { row[2]: row[4] }
+    else:
+      patches = { columnNames[i]: row[i] for i in range(2, len(columnNames)) }
+    res.setdefault(row[0], []).append(TreasurePatch(lineNum, row[1], patches))
+  return res, []
+
+
+# Apply one TreasurePatch to the asset that 'resolver' is for (TreasurePatcher.PatchTreasureJsonPath())
+def apply_treasure_patch(resolver, patch):
+  _, node, _ = resolver.resolve(patch.json_xpath)
+  if not isinstance(node, list):
+    raise PatchError(f"Expected Array, not: {type(node).__name__} at: <properties>")
+
+  numModified = 0
+  for i, prop in enumerate(node):
+    if not isinstance(prop, dict):
+      raise PatchError(f"Expected Object, not: {type(prop).__name__} at: <properties[{i}]>")
+    if not ('name' in prop and 'type' in prop and 'value' in prop):
+      raise PatchError(f"Node at: <properties[{i}]> is missing name/type/value: {prop}")
+    value = patch.patches.get(prop['name'])
+    if value is None:
+      continue
+
+    try:
+      if prop['type'] == 'bool':
+        if value.strip().lower() not in ['true', 'false']:
+          raise ValueError(value)
+        prop['value'] = value.strip().lower() == 'true'
+      elif prop['type'] == 'int':
+        prop['value'] = int(value)
+      elif prop['type'] == 'float':
+        prop['value'] = float(value)
+      else:
+        prop['value'] = value
+    except ValueError:
+      raise PatchError(f"Invalid {prop['type']} for property {prop['name']}: {value}")
+    numModified += 1
+
+  resolver.invalidate(node)
+  if numModified != len(patch.patches):
+    raise PatchError(f"Expected to patch {len(patch.patches)} properties; but we only patched {numModified}")
+
+
+
+#
+# master_csvs.json (see CsvDataPatcher.cs)
+#
+
+class CsvPartialPatch:
+  def __init__(self, line):
+    self.line = line
+    self.header = None   # [ column, ... ] ; or [ "id,col,col,..." ] for new entries
+    self.rows = []       # [ [ value, ... ] ] ; or [ [ "id,val,val,..." ] ] for new entries
+
+
+# Returns: ({ asset_path -> [CsvPartialPatch, ...] }, [ errors ])
+def read_csv_patches(text, fileName='master_csvs.json'):
+  res = {}
+  currEntry = None
+  for lineNum, line in enumerate(read_lines(text), start=1):
+    if currEntry is not None:
+      if line == '':
+        currEntry = None
+        continue
+
+      if currEntry.header is None:
+        currEntry.header = [ line[1:] ] if line.startswith('+') else line.split(',')
+        if currEntry.header[0] != 'id' and not currEntry.header[0].startswith('id,'):
+          return res, [ f"{fileName}:{lineNum}: Invalid .csv header line; 'id' must be first: {line}" ]
+        if currEntry.header == ['id']:
+          return res, [ f"{fileName}:{lineNum}: Invalid .csv header line; must have at least 2 columns: {line}" ]
+        continue
+
+      row = [ line ] if len(currEntry.header) == 1 else line.split(',')
+      expected = len(currEntry.header[0].split(',')) if len(currEntry.header) == 1 else len(currEntry.header)
+      actual = len(row[0].split(',')) if len(currEntry.header) == 1 else len(row)
+      if actual != expected:
+        return res, [ f"{fileName}:{lineNum}: Invalid .csv row line; expected {expected} entries, but got {actual} in: {line}" ]
+      currEntry.rows.append(row)
+      continue
+
+    if line == '' or line.startswith('#'):
+      continue
+    if not line.startswith('Assets'):
+      return res, [ f"{fileName}:{lineNum}: Invalid Assets path in Csv patch; check for stray newlines!" ]
+    currEntry = CsvPartialPatch(lineNum)
+    res.setdefault(line, []).append(currEntry)
+  return res, []
+
+
+# Apply one CsvPartialPatch to 'asset' (a CsvAsset; see AssetPatcher.applyCsvPatch())
+# New entries must have every column of the asset (in order), and mustn't already exist; anything else must exist.
+def apply_csv_patch(asset, patch, rowsById):
+  isNew = len(patch.header) == 1
+  if isNew:
+    header = patch.header[0].split(',')
+    if header != asset.headers:
+      raise PatchError(f"New entries must list every column of the asset, in order: {asset.headers} ; not: {header}")
+  else:
+    unknown = [ col for col in patch.header if col not in asset.headers ]
+    if len(unknown) > 0:
+      raise PatchError(f"Unknown columns: {unknown}")
+
+  for row in patch.rows:
+    values = row[0].split(',') if isNew else row
+    entryId = int(values[0])
+    if isNew:
+      if entryId in rowsById:
+        raise PatchError(f"New entry already exists: {entryId}")
+      entry = dict(zip(asset.headers, values))
+      asset.data.append(entry)
+      rowsById[entryId] = entry
+    else:
+      entry = rowsById.get(entryId)
+      if entry is None:
+        raise PatchError(f"Could not retrieve an existing asset with id: {entryId}")
+      for col, value in zip(patch.header[1:], values[1:]):
+        entry[col] = value
+
+
+
+#
+# Finding, patching, and (optionally) writing the assets
+#
+
+# The top-level directories in MagiciteExport (map_10010, master, etc.)
+@functools.cache
+def get_export_groups(exportPath):
+  return sorted(name for name in os.listdir(exportPath) if os.path.isdir(os.path.join(exportPath, name)))
+
+# Find the exported file for an asset path (e.g., Assets/GameAssets/Serial/Res/Map/Map_20250/Map_20250/sc_e_0001),
+#   which will be at <exportPath>/<group>/<assetPath>.<ext>
+# Returns: the group + asset path + extension, relative to exportPath
+def find_asset_file(exportPath, assetPath, ext):
+  parts = assetPath.split('/')
+  guess = None
+  if assetPath.startswith(MasterAssetPath):
+    guess = 'master'
+  elif len(parts) > 4 and parts[3] == 'Map':
+    guess = parts[4].lower()   # Map_20250 -> map_20250
+
+  relPath = f"{assetPath}.{ext}"
+  if guess is not None and os.path.isfile(os.path.join(exportPath, guess, relPath)):
+    return f"{guess}/{relPath}"
+  for group in get_export_groups(exportPath):
+    if os.path.isfile(os.path.join(exportPath, group, relPath)):
+      return f"{group}/{relPath}"
+  raise PatchError(f"Could not find asset in {exportPath}: {relPath}")
+
+
+# Patch one json asset with all of its treasure + event patches (in the order the game does).
+# Runs in a worker; returns (assetPath, numPatches, [ errors ])
+def patch_json_asset(exportPath, assetPath, treasurePatches, eventPatches, outPath):
+  try:
+    relPath = find_asset_file(exportPath, assetPath, 'json')
+  except PatchError as ex:
+    return assetPath, len(treasurePatches) + len(eventPatches), [ str(ex) ]
+  try:
+    with open(os.path.join(exportPath, relPath), encoding='utf-8') as f:
+      root = json.load(f)
+  except (OSError, ValueError) as ex:
+    return assetPath, len(treasurePatches) + len(eventPatches), [ f"Could not read {relPath}: {ex}" ]
+
+  errors = []
+  resolver = XPathResolver(root)
+  for fileName, patches, apply in [('treasure_mod.csv', treasurePatches, apply_treasure_patch), ('script_patch.csv', eventPatches, apply_event_patch)]:
+    for patch in patches:
+      try:
+        apply(resolver, patch)
+      except Exception as ex:   # Anything else (bad base64, etc.) is an exception in the game, too
+        errors.append(f"{fileName}:{patch.line}: {ex if isinstance(ex, (PatchError, XPathError)) else repr(ex)}")
+
+  if outPath is not None:
+    dstPath = os.path.join(outPath, relPath)
+    os.makedirs(os.path.dirname(dstPath), exist_ok=True)
+    with open(dstPath, 'w', encoding='utf-8') as f:
+      json.dump(root, f, ensure_ascii=False)
+  return assetPath, len(treasurePatches) + len(eventPatches), errors
+
+
+# Patch one master csv asset. Runs in a worker; returns (assetPath, numPatches, [ errors ])
+def patch_csv_asset(exportPath, assetPath, patches, outPath):
+  if assetPath not in PatchableMasterAssets:
+    return assetPath, len(patches), [ f"Don't know how to patch 'master' (csv) asset of type: {assetPath}" ]
+  try:
+    relPath = find_asset_file(exportPath, assetPath, 'csv')
+  except PatchError as ex:
+    return assetPath, len(patches), [ str(ex) ]
+  try:
+    asset = CsvAsset.ReadFile(os.path.join(exportPath, relPath))
+  except Exception as ex:   # ReadFile() raises a plain Exception for a bad header/line
+    return assetPath, len(patches), [ f"Could not read {relPath}: {ex}" ]
+
+  errors = []
+  rowsById = { int(entry['id']): entry for entry in asset.data }
+  for patch in patches:
+    try:
+      apply_csv_patch(asset, patch, rowsById)
+    except Exception as ex:
+      errors.append(f"master_csvs.json:{patch.line}: {ex if isinstance(ex, PatchError) else repr(ex)}")
+
+  if outPath is not None:
+    dstPath = os.path.join(outPath, relPath)
+    os.makedirs(os.path.dirname(dstPath), exist_ok=True)
+    shutil.copyfile(os.path.join(exportPath, relPath), dstPath)   # CsvAsset.write() only overwrites existing files
+    asset.write(dstPath)
+  return assetPath, len(patches), errors
+
+
+
+# Read the patches in an .apff5pr, and make one task per asset: [ (function, args...), ... ]
+# Returns: (tasks, [ errors from reading the patch files ])
+def plan_tasks(seedPath, exportPath, outPath):
+  with zipfile.ZipFile(seedPath) as zf:
+    texts = { name: zf.read(name).decode('utf-8') for name in ['script_patch.csv', 'treasure_mod.csv', 'master_csvs.json'] if name in zf.namelist() }
+
+  eventPatches, eventErrors = read_script_patches(texts.get('script_patch.csv', ''))
+  treasurePatches, treasureErrors = read_treasure_patches(texts.get('treasure_mod.csv', ''))
+  csvPatches, csvErrors = read_csv_patches(texts.get('master_csvs.json', ''))
+
+  tasks = []
+  for assetPath in sorted(set(eventPatches.keys()) | set(treasurePatches.keys())):
+    tasks.append((patch_json_asset, exportPath, assetPath, treasurePatches.get(assetPath, []), eventPatches.get(assetPath, []), outPath))
+  for assetPath in sorted(csvPatches.keys()):
+    tasks.append((patch_csv_asset, exportPath, assetPath, csvPatches[assetPath], outPath))
+  return tasks, eventErrors + treasureErrors + csvErrors
+
+
+# Patch every asset; 'jobs' worker processes (1 patches them all in this process)
+# Returns: [ (assetPath, numPatches, [ errors ]) ], sorted by asset path
+def run_tasks(tasks, jobs):
+  if jobs <= 1 or len(tasks) <= 1:
+    results = [ task[0](*task[1:]) for task in tasks ]
+  else:
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+      futures = [ pool.submit(*task) for task in tasks ]
+      results = [ future.result() for future in futures ]
+  return sorted(results, key=lambda result: result[0])
+
+
+# Apply (and check) every patch in 'seedPath'
+# Returns: (results, [ errors from reading the patch files ]); see run_tasks()
+def apply_seed(seedPath, exportPath, jobs=1, outPath=None):
+  tasks, readErrors = plan_tasks(seedPath, exportPath, outPath)
+  return run_tasks(tasks, jobs), readErrors
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Apply (and check) the patches in an .apff5pr against the exported game assets.')
+  parser.add_argument('seed', help='The .apff5pr file to apply')
+  parser.add_argument('--export', default=f"{GamePath}/{DataExportPath}", help='The MagiciteExport directory (or a fixture in the same layout)')
+  parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Number of worker processes')
+  parser.add_argument('--out', default=None, help='Write the patched assets here')
+  args = parser.parse_args()
+
+  results, readErrors = apply_seed(args.seed, args.export, args.jobs, args.out)
+
+  numErrors = len(readErrors)
+  for error in readErrors:
+    print(f"ERROR: {error}")
+  for assetPath, numPatches, errors in results:
+    for error in errors:
+      print(f"ERROR: {assetPath}: {error}")
+    numErrors += len(errors)
+
+  numPatches = sum(result[1] for result in results)
+  print(f"Applied {numPatches} patches to {len(results)} assets; {numErrors} errors")
+  if args.out is not None:
+    print(f"Wrote patched assets to: {args.out}")
+  if numErrors > 0:
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
 
 
+import os
+import sys
+from array import array
+from collections.abc import MutableMapping, Sequence
+
+
 # Stores a tab-separated string asset
 class StringsAsset:
   @staticmethod
@@ -82,11 +88,110 @@ class StringsAsset:
 
 
 
+# 'value' as an int that fits in an array('q') (an int, or a string that writes back the same way; so not '007' or '+1'),
+#   or None
+def as_int(value):
+  if isinstance(value, str):
+    try:
+      intVal = int(value)
+    except ValueError:
+      return None
+    if str(intVal) != value:
+      return None
+  elif type(value) is int:
+    intVal = value
+  else:
+    return None
+  return intVal if -2**63 <= intVal < 2**63 else None
+
+# Would these ints (that int() accepts) write back the same way? Not if they have spaces, '+', '_', leading zeros, or '-0'
+def plain_ints(values):
+  joined = f",{',,'.join(values)},"   # (So that each value has its own commas)
+  if joined.encode().translate(None, b'0123456789,-') != b'':
+    return False
+  return joined.count(',0') == joined.count(',0,') and ',-0' not in joined
+
+# One column of a columnar CsvAsset: an array('q') if every value is an int, else a list of (interned) strings
+def make_column(values):
+  try:
+    column = array('q', map(int, values))
+  except (ValueError, OverflowError):
+    column = None
+  if column is None or not plain_ints(values):
+    return list(map(sys.intern, values))
+  return column
+
+
+# One row of a columnar CsvAsset; it reads from (and writes to) the asset's columns, so it acts like an entry in a
+#   regular CsvAsset, except that integer columns hold ints
+class CsvRow(MutableMapping):
+  __slots__ = ('asset', 'columns', 'index')
+
+  def __init__(self, asset, index):
+    self.asset = asset
+    self.columns = asset.columns   # (The same dict, even if a column is replaced)
+    self.index = index
+
+  def __getitem__(self, key):
+    return self.columns[key][self.index]
+
+  def __setitem__(self, key, value):
+    if key not in self.columns:
+      raise KeyError(key)
+    value = self.asset.column_value(key, value)
+    self.columns[key][self.index] = value
+
+  def __delitem__(self, key):
+    raise Exception(f"Can't remove a column from a csv row: {key}")
+
+  def __iter__(self):
+    return iter(self.asset.headers)
+
+  def __len__(self):
+    return len(self.asset.headers)
+
+  def __repr__(self):
+    return repr(dict(self))
+
+
+# The rows of a columnar CsvAsset (its .data); a CsvRow is made for each row as it's asked for
+class CsvRows(Sequence):
+  def __init__(self, asset):
+    self.asset = asset
+
+  def __len__(self):
+    return len(self.asset.columns[self.asset.headers[0]])
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [ CsvRow(self.asset, i) for i in range(*index.indices(len(self))) ]
+    if index < 0:
+      index += len(self)
+    if index < 0 or index >= len(self):
+      raise IndexError(index)
+    return CsvRow(self.asset, index)
+
+  def __iter__(self):
+    for i in range(len(self)):
+      yield CsvRow(self.asset, i)
+
+  # Add a row (any mapping with exactly one entry per header)
+  def append(self, entry):
+    for col in self.asset.headers:
+      value = self.asset.column_value(col, entry[col])
+      self.asset.columns[col].append(value)
+
+
+
 # Stores a CSV-type asset
+# With columnar=True, each column is stored on its own (see make_column()), and self.data is a CsvRows; this uses far
+#   less memory for the big master tables (monster.csv, etc.), and integer columns don't have to be parsed again (their
+#   values are ints, not strings). write() makes the same file either way.
 class CsvAsset:
   @staticmethod
-  def ReadFile(path):
+  def ReadFile(path, columnar=False):
     res = CsvAsset()
+    rows = []   # (columnar)
 
     lineNum = -1
     with open(path) as f:
@@ -103,11 +208,19 @@ class CsvAsset:
           if len(parts) != len(res.headers):
             raise Exception(f"Invalid line: {len(parts)}, for headers: {len(res.headers)}")
 
+          if columnar:
+            rows.append(parts)
+            continue
           entry = {}
           for i in range(len(parts)):
             entry[res.headers[i]] = parts[i]
           res.data.append(entry)
 
+    if columnar:
+      columns = list(zip(*rows)) if len(rows) > 0 else [ () for _ in res.headers ]
+      res.columns = { header: make_column(values) for header, values in zip(res.headers, columns) }
+      res.data = CsvRows(res)
+
     print(f"Read: {path}")
     return res
 
@@ -120,6 +233,41 @@ class CsvAsset:
     # rows of { k:v } entries; guaranteed to have exactly 1 entry per header
     self.data = []
 
+    # (columnar) header_name -> array('q') or list of values; self.data is then a CsvRows
+    self.columns = None
+
+    # Lookups, built the first time they're needed (see get_prop() and search_for_prop())
+    #   byId: { int(id) -> entry } (the first entry with that id)
+    #   byValue: { column -> { str(value) -> [ entries, in order ] } }
+    # add_entry() and modify_prop() keep these up to date, and we re-build them if rows are appended to self.data
+    #   directly; if you change an entry in some other way, call reindex().
+    self.byId = None
+    self.byValue = {}
+    self.indexedRows = 0
+
+
+  # Forget our lookups (they'll be re-built when they're next needed)
+  def reindex(self):
+    self.byId = None
+    self.byValue = {}
+    self.indexedRows = len(self.data)
+
+  # Make sure our lookups cover every row
+  def check_indexes(self):
+    if self.indexedRows != len(self.data):
+      self.reindex()
+
+
+  # (columnar) 'value', ready to store in column 'key'; if it isn't an int, an array('q') column becomes a list
+  def column_value(self, key, value):
+    column = self.columns[key]
+    if isinstance(column, array):
+      intVal = as_int(value)
+      if intVal is not None:
+        return intVal
+      self.columns[key] = list(column)
+    return sys.intern(value) if isinstance(value, str) else value
+
 
   # Do we have every column accounted for?
   def same_fields(self, entry):
@@ -144,7 +292,14 @@ class CsvAsset:
       raise Exception(f"Invalid id for: {entry}; previous id is: {self.data[-1]['id']}")
 
     # Now just add it
+    self.check_indexes()
     self.data.append(entry)
+    entry = self.data[-1]   # (columnar: our CsvRow)
+    self.indexedRows += 1
+    if self.byId is not None:
+      self.byId.setdefault(int(entry['id']), entry)
+    for key, lookup in self.byValue.items():
+      lookup.setdefault(str(entry[key]), []).append(entry)
 
 
   # Get all entries
@@ -154,18 +309,24 @@ class CsvAsset:
 
   # Retrieve an entry with the following id
   def get_prop(self, entryId):
-    for entry in self.data:
-      if int(entry['id']) == entryId:
-        return entry
+    self.check_indexes()
+    if self.byId is None:
+      self.byId = {}
+      for entry in self.data:
+        self.byId.setdefault(int(entry['id']), entry)
+    return self.byId.get(entryId)
 
   # Retrieve an entry by looking for a specific key/value (return all entries with that k/v)
   # We do string matching, since type isn't preserved within self.data
   def search_for_prop(self, key, value):
-    res = []
-    for entry in self.data:
-      if str(entry[key]) == str(value):
-        res.append(entry)
-    return res
+    self.check_indexes()
+    lookup = self.byValue.get(key)
+    if lookup is None:
+      lookup = {}
+      for entry in self.data:
+        lookup.setdefault(str(entry[key]), []).append(entry)
+      self.byValue[key] = lookup
+    return list(lookup.get(str(value), []))
 
 
   # Modify an entry
@@ -178,6 +339,11 @@ class CsvAsset:
     if isinstance(entryId, int):
       entryId = [entryId]
 
+    # Our lookups for this column will be out of date
+    self.byValue.pop(key, None)
+    if key == 'id':
+      self.byId = None
+
     modified = 0
     for entry in self.data:
       if entryId == 'all' or int(entry['id']) in entryId:
@@ -222,11 +388,15 @@ class CsvAsset:
       f.write(f"{','.join(self.headers)}\r\n")
 
       # Data
-      for entry in self.data:
-        line = ''
-        for col in self.headers:
-          line += f"{'' if len(line)==0 else ','}{entry[col]}"
-        f.write(f"{line}\r\n")
+      if self.columns is not None:
+        for values in zip(*[ self.columns[col] for col in self.headers ]):
+          f.write(f"{','.join(map(str, values))}\r\n")
+      else:
+        for entry in self.data:
+          line = ''
+          for col in self.headers:
+            line += f"{'' if len(line)==0 else ','}{entry[col]}"
+          f.write(f"{line}\r\n")
 
       # For some reason, these files all end with an empty line... or not?
       #f.write("\r\n")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+
+import json
+import functools
+
+
+#
+# Resolving the "json_xpath"s that our patches use, e.g.:
+#   /layers/[0]/objects/[5]/properties
+#   /layers/[1]/objects/{id=259}/properties
+#   /map/{name=Map_10010}/script/{name=sc_map_10010}/inline     (followed by ":/Mnemonics/[22]" for an InlinePatch)
+# ...with the same rules as the game's JsonHelper.TraverseXPathWithParent() (in MyFF5Plugin):
+#   * "[n]" is an array index
+#   * "{key=value}" searches an array of objects for the one whose 'key' is 'value' (compared as text); the *last* match wins
+#   * anything else is an object key
+#
+# Each path is compiled once (compile_xpath() is LRU-cached), and an XPathResolver keeps an index for every
+#   (array, search key) it's asked about, built on first use; so resolving many paths against one asset doesn't re-split
+#   the paths or re-scan its arrays. If you change an array that's been searched, call XPathResolver.invalidate() on it.
+#
+
+
+# Raised when a path is invalid, or can't be resolved
+class XPathError(Exception):
+  pass
+
+
+# Kinds of steps in a compiled path
+IndexStep = 0    # (IndexStep, index, part)
+SearchStep = 1   # (SearchStep, (key, value), part)
+KeyStep = 2      # (KeyStep, key, part)
+
+
+# The text that C#'s JsonNode.ToString() gives for a json value (strings aren't quoted)
+def json_value_str(value):
+  if isinstance(value, str):
+    return value
+  return json.dumps(value)
+
+
+# A compiled json_xpath: the original text, its parts, and a step for each part
+class CompiledXPath:
+  def __init__(self, xpath, parts, steps):
+    self.xpath = xpath
+    self.parts = parts   # E.g., ('layers', '[1]', 'objects', '{id=259}', 'properties')
+    self.steps = steps
+
+  def __repr__(self):
+    return f"CompiledXPath({self.xpath!r})"
+
+
+# C#'s JsonHelper.SplitJsonXPath()
+def split_xpath(xpath):
+  if xpath.startswith('/'):
+    xpath = xpath[1:]
+  return xpath.split('/')
+
+
+# Compile 'xpath' (a single path; split an InlinePatch's "outer:inner" first)
+# Raises an XPathError for a malformed index or search (the game would fail on these when it got to them).
+@functools.lru_cache(maxsize=4096)
+def compile_xpath(xpath):
+  parts = tuple(split_xpath(xpath))
+  steps = []
+  for part in parts:
+    if part.startswith('[') and part.endswith(']'):
+      if not part[1:-1].lstrip('-').isdigit():
+        raise XPathError(f"Invalid array index: {part}")
+      steps.append((IndexStep, int(part[1:-1]), part))
+    elif part.startswith('{') and part.endswith('}'):
+      if '=' not in part:
+        raise XPathError(f"Invalid search (expected {{key=value}}): {part}")
+      key, value = part[1:-1].split('=')[:2]
+      steps.append((SearchStep, (key, value), part))
+    else:
+      steps.append((KeyStep, part, part))
+  return CompiledXPath(xpath, parts, tuple(steps))
+
+
+# Resolves compiled paths against one json document ('root'), indexing each array the first time it's searched
+class XPathResolver:
+  def __init__(self, root):
+    self.root = root
+    self.indexes = {}   # { (id(array), key) -> (array, { value -> index }) }
+
+  # Returns: (parent, node, step) where parent[step] is node; parent and step are None for an empty path.
+  # Accepts a CompiledXPath, or the text of one.
+  def resolve(self, path):
+    if isinstance(path, str):
+      path = compile_xpath(path)
+    parent = None
+    node = self.root
+    last = None
+    for kind, arg, part in path.steps:
+      parent = node
+      if kind == IndexStep:
+        if not isinstance(node, list):
+          raise XPathError(f"Expected Array, not: {type(node).__name__} at: {part}")
+        if arg < 0 or arg >= len(node):
+          raise XPathError(f"Array element out of bounds: {part}")
+        last = arg
+      elif kind == SearchStep:
+        if not isinstance(node, list):
+          raise XPathError(f"Expected Array (for id search), not: {type(node).__name__} at: {part}")
+        last = self.search_index(node, arg[0], part).get(arg[1])
+        if last is None:
+          raise XPathError(f"Could not find {arg[0]},{arg[1]} at: {part}")
+      else:
+        if not isinstance(node, dict):
+          raise XPathError(f"Expected Object, not: {type(node).__name__} at: {part}")
+        if arg not in node:
+          raise XPathError(f"Cannot find part: {part}")
+        last = arg
+      node = node[last]
+    return parent, node, last
+
+  # { value (as text) -> index } for the objects in 'array' that have 'key'; later objects replace earlier ones
+  def search_index(self, array, key, part):
+    entry = self.indexes.get((id(array), key))
+    if entry is None or entry[0] is not array:
+      index = {}
+      for i, candidate in enumerate(array):
+        if not isinstance(candidate, dict):
+          raise XPathError(f"Expected Object (for id search), not: {type(candidate).__name__} at: {part}")
+        if key in candidate:
+          index[json_value_str(candidate[key])] = i
+      entry = (array, index)
+      self.indexes[(id(array), key)] = entry
+    return entry[1]
+
+  # Forget the indexes for 'array' (or all of them), after it's been changed
+  def invalidate(self, array=None):
+    if array is None:
+      self.indexes.clear()
+    else:
+      for cacheKey in [ cacheKey for cacheKey in self.indexes.keys() if cacheKey[0] == id(array) ]:
+        del self.indexes[cacheKey]
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+
+
+import os
+import os.path
+import sys
+import json
+import pickle
+import hashlib
+import argparse
+import concurrent.futures
+
+from helpers import StringsAsset, CsvAsset
+
+
+#
+# One walk over the maps in MagiciteExport, shared by our scan_*.py scripts.
+# Each scanner used to walk every map_XXXXX directory on its own, and json.load() the same entity_default.json and sc_*.json
+#   files again. Now each one registers visitors (see MapVisitor) with a MapScanner, which walks the export once, parses
+#   each json file once (and only if some visitor wants it), and hands the parsed object to every visitor that does.
+# Results are collected per map directory, and merged in the order we walk them, so a single run gives the same results
+#   (and the same .csv files) as running each scanner on its own. scan_all.py writes every scanner's .csv from one run.
+# With --jobs N, the map directories are scanned by N worker processes. Each worker only sends back what its visitors
+#   found in one directory (not the parsed json), and we still merge them in walk order, so the .csv files are the same.
+# What the visitors found in each file is also saved in a cache (see ScanCache), next to the .csv files, so the next run
+#   only has to parse the files that changed; --full ignores it (and re-scans everything).
+#
+# A scanner (e.g., scan_treasure.py) is a module with:
+#   * OutputFile  -- the .csv it writes
+#   * Visitors    -- the MapVisitor classes it needs results from (may be empty)
+#   * write_csv(assets, results, out_path) -- writes its .csv, given an ExportAssets and the MapScanner's results
+#
+
+
+# This can be in different places
+GamePath = '/mnt/d/Programs/Steam/steamapps/common/FINAL FANTASY V PR'
+DataExportPath = 'FINAL FANTASY V_Data/StreamingAssets/MagiciteExport'
+MasterPath = 'master/Assets/GameAssets/Serial/Data/Master'
+MessagePath = 'message/Assets/GameAssets/Serial/Data/Message'
+
+
+# Known 'strings', English version. These will be at <GamePath>/<DataExportPath>/<MessagePath>/<filename.txt>
+StringFiles = {
+  'system' : 'system_en.txt',
+  'story_cha' : 'story_cha_en.txt',
+  'story_mes' : 'story_mes_en.txt',
+}
+
+
+#
+# TODO: It will eventually make sense to pull from package_info, keys, etc., rather than just guessing the file structure
+#
+
+
+
+# The (non-map) assets that our scanners look things up in; each one is only read once
+class ExportAssets:
+  def __init__(self, export_path):
+    self.export_path = export_path
+    self.csvs = {}      # name -> CsvAsset (columnar, so integer columns hold ints)
+    self.strings = {}   # key (in StringFiles) -> StringsAsset
+
+  # E.g., csv('content') for <MasterPath>/content.csv
+  def csv(self, name):
+    if name not in self.csvs:
+      self.csvs[name] = CsvAsset.ReadFile(f"{self.export_path}/{MasterPath}/{name}.csv", columnar=True)
+    return self.csvs[name]
+
+  # E.g., strs('system') for <MessagePath>/system_en.txt
+  def strs(self, key):
+    if key not in self.strings:
+      self.strings[key] = StringsAsset.ReadFile(f"{self.export_path}/{MessagePath}/{StringFiles[key]}")
+    return self.strings[key]
+
+
+
+# One json file in a map folder; consider "<MagiciteExport>/map_20011/Assets/GameAssets/Serial/Res/Map/Map_20011/Map_20011_1/entity_default.json":
+class MapFile:
+  __slots__ = ('path', 'file_name', 'map_dir', 'asset_path', 'map_name', 'area_name')
+
+  def __init__(self, map_dir, imap_dir, imap_asset_dir, file_name):
+    self.path = f"{imap_dir}/{file_name}"   # Where to read it from
+    self.file_name = file_name              # entity_default.json
+    self.map_dir = map_dir                  # map_20011
+    self.asset_path = f"{imap_asset_dir}/{file_name[:-len('.json')]}"   # Assets/GameAssets/Serial/Res/Map/Map_20011/Map_20011_1/entity_default
+    self.map_name = imap_asset_dir.split('/')[-1]   # Map_20011_1
+    self.area_name = imap_asset_dir.split('/')[-2]  # Map_20011
+
+  def __repr__(self):
+    return f"MapFile({self.map_dir}:{self.asset_path})"
+
+
+# The 'map' directories (map_1234) in 'export_path'; includes some weird ones like (map_1234_nigheffect), which are usually cutscenes
+def get_map_dirs(export_path):
+  res = []
+  for fname in os.listdir(export_path):
+    abs_path = f"{export_path}/{fname}"
+    if fname.startswith('map_') and os.path.isdir(abs_path):
+      if len(fname) > 4 and fname[4] in '1234567890':  # Exceptions: map_script, map_ui, map_world, etc.
+        res.append(abs_path)
+  return res
+
+
+# Every json file in one 'map' directory (the absolute path to it): [ MapFile, ... ]
+# Within Assets/GameAssets/Serial/Res/Map/Map<XYZ>, we have a list of directories (at least 1) that contain "entity_default.json",
+#   and the event scripts (sc_*.json).
+def get_map_files(map_dir_path):
+  temp_path = f"{map_dir_path}/Assets/GameAssets/Serial/Res/Map"
+  subdirs = os.listdir(temp_path)
+
+  if len(subdirs) != 1:
+    raise Exception(f"Bad map; expected 1 subdir: {temp_path} => {subdirs}")
+
+  # Individual map folders
+  res = []
+  map_dir = os.path.basename(map_dir_path)
+  temp_path = f"{temp_path}/{subdirs[0]}"
+  for fname in os.listdir(temp_path):
+    abs_path = f"{temp_path}/{fname}"
+    if fname.startswith('Map_') and os.path.isdir(abs_path):
+      if len(fname) > 4 and fname[4] in '1234567890':
+        imap_asset_dir = f"Assets/GameAssets/Serial/Res/Map/{subdirs[0]}/{fname}"
+        for json_name in os.listdir(abs_path):
+          if json_name.endswith('.json'):
+            res.append(MapFile(map_dir, abs_path, imap_asset_dir, json_name))
+  return res
+
+
+
+# Something that wants to look at (some of) the json files in our maps.
+# Results are built per json file (new_result() + visit()), and then merged in order (merge()); a visitor shouldn't keep
+#   any other state, so that each file can be scanned (and cached) on its own.
+class MapVisitor:
+  name = None   # Results are saved under this name
+
+  # Do we want to see this MapFile?
+  def wants(self, map_file):
+    return True
+
+  def new_result(self):
+    return []
+
+  # Look at one (parsed) json file, and add what we find to 'result'
+  def visit(self, result, map_file, root):
+    raise NotImplementedError()
+
+  # Add the results for one file (or map directory) ('part') to 'result'
+  def merge(self, result, part):
+    result.extend(part)
+
+
+# Title overrides (these appear in events for specific maps); used by several scanners
+# Result: { map_name -> [ title_id, ... ] } (every non-empty title_id in its entity_default, in order, without duplicates)
+class TitleVisitor(MapVisitor):
+  name = 'titles'
+
+  def wants(self, map_file):
+    return map_file.file_name == 'entity_default.json'
+
+  def new_result(self):
+    return {}
+
+  def visit(self, result, map_file, root):
+    for layer in root['layers']:
+      for obj in layer['objects']:
+        for prop in obj.get('properties', []):
+          if prop.get('name') == 'title_id' and prop.get('value', '') != '':
+            titles = result.setdefault(map_file.map_name, [])
+            if prop['value'] not in titles:
+              titles.append(prop['value'])
+
+  def merge(self, result, part):
+    for map_name, titles in part.items():
+      dest = result.setdefault(map_name, [])
+      dest.extend(title for title in titles if title not in dest)
+
+
+# Turn the TitleVisitor's results into { map_name -> title_id }
+# A map can have several title_ids, but they should all be the same string (e.g., MSG_ARA_NAME_80 and MSG_ARA_NAME_83);
+#   if so, we use the first one.
+#   TODO: We also don't care *that* much; these might just be some kind of NPC switch, and we're
+#         only using these names to inform our searches.
+def get_title_overrides(assets, results):
+  systemStrs = assets.strs('system')
+  res = {}
+  for map_name, titles in results['titles'].items():
+    for val in titles[1:]:
+      if systemStrs.get_string(titles[0]) != systemStrs.get_string(val):
+        raise Exception(f"Title ID conflict: {titles[0]} vs: {val} => ({systemStrs.get_string(titles[0])}) vs: ({systemStrs.get_string(val)})")
+    res[map_name] = titles[0]
+  return res
+
+
+
+# Where we save the ScanCache, in the same directory as the .csv files
+CacheFile = 'map_scan_cache.pickle'
+CacheVersion = 1
+
+
+# A hash of the code that 'visitor' runs (its module, and this one), so that we can tell if its cached results are stale
+def get_fingerprint(visitor):
+  digest = hashlib.sha1()
+  for module_name in sorted(set([__name__, type(visitor).__module__])):
+    with open(sys.modules[module_name].__file__, 'rb') as f:
+      digest.update(f.read())
+  return digest.hexdigest()
+
+
+# What our visitors found in each json file last time, so that we only need to parse the files that changed.
+# For each map directory: { MapFile.asset_path -> (size, mtime_ns, sha1 of the contents, { visitor.name -> result }) }
+# A file with the same size and mtime is assumed to be the same. Otherwise we read it, and if its hash is the same (e.g.,
+#   the whole thing was re-exported) we still don't parse it. Results from a visitor whose code has changed are dropped.
+# This is a pickle that we wrote ourselves; don't point --cache at anything else.
+class ScanCache:
+  def __init__(self, path, visitors, full=False):
+    self.path = path
+    self.fingerprints = { visitor.name: get_fingerprint(visitor) for visitor in visitors }
+    self.dirs = {}   # map_dir -> { asset_path -> (size, mtime_ns, hash, { visitor.name -> result }) }
+    if not full and os.path.isfile(path):
+      self.load()
+
+  def load(self):
+    try:
+      with open(self.path, 'rb') as f:
+        data = pickle.load(f)
+      if data['version'] != CacheVersion:
+        return
+      # Keep the results from other visitors (e.g., if scan_all.py made this cache); we don't know if they're stale
+      stale = set(name for name, fingerprint in self.fingerprints.items() if data['fingerprints'].get(name) != fingerprint)
+      self.fingerprints = { **data['fingerprints'], **self.fingerprints }
+      for map_dir, entries in data['dirs'].items():
+        self.dirs[map_dir] = { asset_path: (size, mtime, digest, { name: part for name, part in parts.items() if name not in stale })
+                               for asset_path, (size, mtime, digest, parts) in entries.items() }
+    except Exception as ex:
+      print(f"WARNING: Can't read the scan cache: {self.path} ({ex}); scanning everything.")
+      self.dirs = {}
+
+  def save(self):
+    temp_path = f"{self.path}.tmp"
+    with open(temp_path, 'wb') as f:
+      pickle.dump({ 'version': CacheVersion, 'fingerprints': self.fingerprints, 'dirs': self.dirs }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, self.path)
+
+
+
+# Walks the maps in 'export_path' once, for a list of MapVisitors; with 'jobs' worker processes (1 scans them all in
+#   this process)
+class MapScanner:
+  def __init__(self, export_path, visitors, jobs=1):
+    self.export_path = export_path
+    self.visitors = visitors
+    self.jobs = jobs
+    self.files_read = 0   # For timing comparisons
+    self.bytes_read = 0
+    self.files_parsed = 0
+
+  # Scan one map directory (the absolute path to it), with the cached entries for it (or None, to not use a cache)
+  # Returns: ({ visitor.name -> result }, { asset_path -> cache entry } (or None), files read, bytes read, files parsed)
+  #   ...or None if 'cached_only' is set, and we'd have to read any of its files.
+  def scan_map_dir(self, map_dir_path, cached=None, cached_only=False):
+    res = { visitor.name: visitor.new_result() for visitor in self.visitors }
+    entries = {} if cached is not None else None
+    files_read = 0
+    bytes_read = 0
+    files_parsed = 0
+    for map_file in get_map_files(map_dir_path):
+      visitors = [ visitor for visitor in self.visitors if visitor.wants(map_file) ]
+      if len(visitors) == 0:
+        # Keep what other visitors found in it (e.g., when scan_treasure.py uses scan_all.py's cache)
+        if entries is not None and map_file.asset_path in cached:
+          entries[map_file.asset_path] = cached[map_file.asset_path]
+        continue
+
+      # Can we use the cached results?
+      parts = None
+      entry = None
+      if cached is not None:
+        stat = os.stat(map_file.path)
+        entry = cached.get(map_file.asset_path)
+        if entry is not None and not all(visitor.name in entry[3] for visitor in visitors):
+          entry = None
+        if entry is not None and (entry[0], entry[1]) == (stat.st_size, stat.st_mtime_ns):
+          parts = entry[3]
+        elif cached_only:
+          return None
+
+      if parts is None:
+        with open(map_file.path, 'rb') as f:
+          data = f.read()
+        files_read += 1
+        bytes_read += len(data)
+        digest = hashlib.sha1(data).digest() if cached is not None else None
+        if entry is not None and entry[2] == digest:
+          parts = entry[3]
+        else:
+          root = json.loads(data)
+          files_parsed += 1
+          parts = { visitor.name: visitor.new_result() for visitor in visitors }
+          for visitor in visitors:
+            visitor.visit(parts[visitor.name], map_file, root)
+        if entries is not None:
+          entry = (stat.st_size, stat.st_mtime_ns, digest, parts)
+
+      if entries is not None:
+        entries[map_file.asset_path] = entry
+      for visitor in visitors:
+        visitor.merge(res[visitor.name], parts[visitor.name])
+    return res, entries, files_read, bytes_read, files_parsed
+
+  # Scan every map, with a ScanCache (or None); returns { visitor.name -> result }
+  def scan(self, cache=None):
+    map_dirs = get_map_dirs(self.export_path)
+    cached = [ cache.dirs.get(os.path.basename(map_dir_path), {}) if cache is not None else None for map_dir_path in map_dirs ]
+    if self.jobs <= 1 or len(map_dirs) <= 1:
+      parts = list(map(self.scan_map_dir, map_dirs, cached))
+    else:
+      # Only hand out the directories that changed (checking the others is quick)
+      parts = [ self.scan_map_dir(map_dir_path, entries, True) if entries is not None else None for map_dir_path, entries in zip(map_dirs, cached) ]
+      todo = [ i for i, part in enumerate(parts) if part is None ]
+      if len(todo) > 0:
+        # Hand out a few directories at a time (there are hundreds, and most are small)
+        jobs = min(self.jobs, len(todo))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+          for i, part in zip(todo, pool.map(self.scan_map_dir, [ map_dirs[i] for i in todo ], [ cached[i] for i in todo ], chunksize=max(1, len(todo) // (8*jobs)))):
+            parts[i] = part
+
+    # Merge them in order
+    res = { visitor.name: visitor.new_result() for visitor in self.visitors }
+    for map_dir_path, (part, entries, files_read, bytes_read, files_parsed) in zip(map_dirs, parts):
+      print(f"Scanning: {map_dir_path}")
+      self.files_read += files_read
+      self.bytes_read += bytes_read
+      self.files_parsed += files_parsed
+      for visitor in self.visitors:
+        visitor.merge(res[visitor.name], part[visitor.name])
+
+    # Save what we found (before anyone writes to it); files that are gone are dropped
+    if cache is not None:
+      dirs = { os.path.basename(map_dir_path): part[1] for map_dir_path, part in zip(map_dirs, parts) }
+      unchanged = self.files_read == 0 and dirs.keys() == cache.dirs.keys() and all(dirs[name].keys() == cache.dirs[name].keys() for name in dirs)
+      cache.dirs = dirs
+      if not unchanged:
+        cache.save()
+    return res
+
+
+# Every (distinct) visitor that 'scanners' need, in order
+def get_visitors(scanners):
+  res = []
+  for scanner in scanners:
+    for visitorType in scanner.Visitors:
+      if visitorType not in [ type(visitor) for visitor in res ]:
+        res.append(visitorType())
+  return res
+
+
+# Run 'scanners' (see the top of this file) with one walk over the maps in 'export_path', and write each one's .csv
+#   into 'out_dir'. 'cache_path' is where to keep a ScanCache (None for no cache); 'full' ignores what's in it.
+# Returns the MapScanner (or None, if none of them need the maps).
+def write_tables(scanners, export_path, out_dir='.', jobs=1, cache_path=None, full=False):
+  assets = ExportAssets(export_path)
+  visitors = get_visitors(scanners)
+  scanner = MapScanner(export_path, visitors, jobs) if len(visitors) > 0 else None
+  cache = ScanCache(cache_path, visitors, full) if scanner is not None and cache_path is not None else None
+  results = scanner.scan(cache) if scanner is not None else {}
+  for module in scanners:
+    out_path = os.path.join(out_dir, module.OutputFile)
+    module.write_csv(assets, results, out_path)
+    print(f"Done, saved to: {out_path}")
+  return scanner
+
+
+# Command line for a scanner script (see scan_all.py)
+def run_scanners(scanners, description):
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument('--export', default=f"{GamePath}/{DataExportPath}", help='Path to MagiciteExport')
+  parser.add_argument('--out', default='.', help='Directory to save the .csv files in')
+  parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Number of worker processes for scanning the maps')
+  parser.add_argument('--cache', default=None, help=f"Where to keep the scan cache (default: {CacheFile} in --out; '' for none)")
+  parser.add_argument('--full', action='store_true', help='Ignore the scan cache, and re-scan every file')
+  args = parser.parse_args()
+
+  os.makedirs(args.out, exist_ok=True)
+  cache_path = args.cache if args.cache is not None else os.path.join(args.out, CacheFile)
+  write_tables(scanners, args.export, args.out, args.jobs, cache_path if cache_path != '' else None, args.full)
@@ -5,6 +5,8 @@ import os
 import sys
 import shutil
 import zipfile
+import tempfile
+import importlib.util
 
 
 # Usage
@@ -24,8 +26,27 @@ for fname in [outFile, outApWorldFile]:
   if os.path.exists(fname):
     os.remove(fname)
 
-# Pack up our custom world
-shutil.make_archive(outApWorldFile, 'zip', root_dir='custom_world')
+# Load a module from our custom world without running its __init__.py (which needs Archipelago)
+def load_world_module(name):
+  if 'ff5pr' not in sys.modules:
+    packageDir = os.path.join('custom_world', 'ff5pr')
+    spec = importlib.util.spec_from_file_location('ff5pr', os.path.join(packageDir, '__init__.py'), submodule_search_locations=[packageDir])
+    sys.modules['ff5pr'] = importlib.util.module_from_spec(spec)  # NOTE: Not executed
+  return importlib.import_module(f"ff5pr.{name}")
+
+
+# Pack up our custom world. We pack a copy of it, so that nothing we add (or change) ends up in the source tree:
+#   * Pre-compute our name/id lookup tables, so that the world doesn't have to do it on import
+#   * Stamp the same hash into the packed Pristine.py, so that the world can tell that they match (see Lookups.py)
+lookups = load_world_module('Lookups')
+with tempfile.TemporaryDirectory() as tmpDir:
+  packDir = os.path.join(tmpDir, 'custom_world')
+  shutil.copytree('custom_world', packDir, ignore=shutil.ignore_patterns('__pycache__'))
+  pristineFile = os.path.join(packDir, 'ff5pr', 'Pristine.py')
+  pristineHash = lookups.compute_pristine_hash(pristineFile)
+  lookups.write_frozen_lookups(os.path.join(packDir, 'ff5pr', f"{lookups.FrozenLookupsModule}.py"), pristineHash)
+  lookups.stamp_pristine_hash(pristineFile, pristineHash)
+  shutil.make_archive(outApWorldFile, 'zip', root_dir=packDir)
 os.rename(f"{outApWorldFile}.zip", outApWorldFile)
 
 # Write our Release zip file
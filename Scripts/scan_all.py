@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+
+
+from map_scan import run_scanners
+
+import scan_treasure
+import scan_flags
+import scan_shops
+import scan_bosses
+
+
+#
+# Run every scanner with a single walk over the maps (see map_scan.py), and write all of their tables:
+#   my_treasures.csv, my_flags.csv, my_shops.csv, and my_bosses.csv
+#
+
+
+Scanners = [scan_treasure, scan_flags, scan_shops, scan_bosses]
+
+
+if __name__ == "__main__":
+  run_scanners(Scanners, 'Scan the maps once, and write the treasure, flag, shop, and boss tables.')
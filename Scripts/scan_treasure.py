@@ -1,67 +1,17 @@
 #!/usr/bin/env python3
 
 
-import os
-import os.path
-import json
-
-from helpers import StringsAsset, CsvAsset
-
-
-# This can be in different places
-GamePath = '/mnt/d/Programs/Steam/steamapps/common/FINAL FANTASY V PR'
-DataExportPath = 'FINAL FANTASY V_Data/StreamingAssets/MagiciteExport'
-MasterPath = 'master/Assets/GameAssets/Serial/Data/Master'
-MessagePath = 'message/Assets/GameAssets/Serial/Data/Message'
-
-
-# Some known assets. These will be at <GamePath>/<DataExportPath>/<MasterPath>/<filename.csv>
-ResourceFiles = {
-  'ability.csv',
-  'area.csv',
-  'armor.csv',
-  'character_default_name.csv',
-  'condition.csv',
-  'condition_group.csv',
-  'item.csv',
-  'job.csv',
-  'game_constant_int.csv',
-  'map.csv',
-  'map_script.csv',
-  'command.csv',
-  'content.csv',
-  'product.csv',
-  'product_group.csv',
-  'monster.csv',
-  'monster_party.csv',
-  'weapon.csv',
-}
-
-
-# Known 'strings', English version. These will be at <GamePath>/<DataExportPath>/<MessagePath>/<filename.txt>
-StringFiles = {
-  'system' : 'system_en.txt',
-  'story_cha' : 'story_cha_en.txt',
-  'story_mes' : 'story_mes_en.txt',
-}
+from map_scan import MapVisitor, TitleVisitor, get_title_overrides, run_scanners
 
 
 #
-# TODO: It will eventually make sense to pull from package_info, keys, etc., rather than just guessing the file structure
+# Make a table of every treasure (chests, etc.) in the maps.
+# The maps are walked by map_scan.py; to write this along with the other scanners' tables (in one walk), use scan_all.py.
 #
 
 
-
-
-def get_map_dirs(export_path):
-  res = []
-  for fname in os.listdir(export_path):
-    abs_path = f"{export_path}/{fname}"
-    if fname.startswith('map_') and os.path.isdir(abs_path):
-      if len(fname) > 4 and fname[4] in '1234567890':  # Exceptions: map_script, map_ui, map_world, etc.
-        res.append(abs_path)
-  return res
-
+# Our output (see map_scan.py)
+OutputFile = 'my_treasures.csv'
 
 
 # Our results class
@@ -93,21 +43,16 @@ class TreasureEntry:
 
 
 
-def scan_indiv_map_for_treasure(imap_dir, res):
-  global systemStrs
-  global title_overrides_per_map
-
-  json_path = f"{imap_dir}/entity_default.json"
-  if not os.path.exists(json_path):
-    #print('   ', "WARNING: skipping!")   # This is fine
-    return
+# Collects a TreasureEntry for every object in each entity_default that has a content_id
+# Result: [ TreasureEntry, ... ]
+class TreasureVisitor(MapVisitor):
+  name = 'treasure'
 
-  with open(json_path, encoding='utf-8') as f:
-    root = json.load(f)
-    path_parts = imap_dir.replace(f"{GamePath}/{DataExportPath}/", '').split('/')  # Used later for entity_default/map_name
+  def wants(self, map_file):
+    return map_file.file_name == 'entity_default.json'
 
+  def visit(self, res, map_file, root):
     # Scan through each layer
-    title_id_override = None
     layerId = -1
     for layer in root['layers']:
       layerId += 1
@@ -115,9 +60,9 @@ def scan_indiv_map_for_treasure(imap_dir, res):
       for obj in layer['objects']:
         objId += 1
         entry = TreasureEntry()
-        entry.asset_dir = path_parts[0]
-        entry.entity_default = '/'.join(path_parts[1:]) + '/entity_default'  # Unity doesn't do file extensions, blah
-        entry.map_name = path_parts[-1]
+        entry.asset_dir = map_file.map_dir
+        entry.entity_default = map_file.asset_path  # Unity doesn't do file extensions, blah
+        entry.map_name = map_file.map_name
         entry.asset_path = f"/layers/[{layerId}]/objects/[{objId}]/properties"
         # Retrieve the properties we care about
         entry.gid = obj.get('gid')
@@ -133,54 +78,22 @@ def scan_indiv_map_for_treasure(imap_dir, res):
           elif name == 'script_id':
             entry.script_id = val
 
-          # Title ID is a little special
-          elif name == 'title_id':
-            if prop.get('value','') != '':
-              if title_id_override is None or title_id_override == val:
-                title_id_override = val
-              elif systemStrs.get_string(title_id_override) == systemStrs.get_string(val):
-                pass
-              else:
-                raise Exception(f"Title ID conflict: {title_id_override} vs: {val} => ({systemStrs.get_string(title_id_override)}) vs: ({systemStrs.get_string(value)})")
-                #
-                # TODO: These may have the same actual string, like MSG_ARA_NAME_80 and MSG_ARA_NAME_83
-                #       We also don't care *that* much; these might just be some kind of NPC switch, and we're
-                #       only using these names to inform our searches.
-                #
-
         # Save it
         if entry.content_id:
           res.append(entry)
-    if title_id_override != None:
-      title_overrides_per_map[path_parts[-1]] = title_id_override
-
 
 
-
-def scan_for_treasure(map_dir, res):
-  temp_path = f"{map_dir}/Assets/GameAssets/Serial/Res/Map"
-  subdirs = os.listdir(temp_path)
-  
-  if len(subdirs) != 1:
-    raise Exception(f"Bad map; expected 1 subdir: {temp_path} => {subdirs}")
-  
-  # Scan individual map folders
-  temp_path = f"{temp_path}/{subdirs[0]}"
-  for fname in os.listdir(temp_path):
-    abs_path = f"{temp_path}/{fname}"
-    if fname.startswith('Map_') and os.path.isdir(abs_path):
-      if len(fname) > 4 and fname[4] in '1234567890':
-        scan_indiv_map_for_treasure(abs_path, res)
+# The map results we need (see map_scan.py)
+Visitors = [TitleVisitor, TreasureVisitor]
 
 
 
 # Set additional (treasure) properties that are only available in .csv files
-def update_metadata(entry):
-  global systemStrs
-  global areaCsv
-  global mapCsv
-  global contentCsv
-  global title_overrides_per_map
+def update_metadata(entry, assets, title_overrides_per_map):
+  systemStrs = assets.strs('system')
+  areaCsv = assets.csv('area')
+  mapCsv = assets.csv('map')
+  contentCsv = assets.csv('content')
 
   # This is tracked in our lookup
   title_str = title_overrides_per_map.get(entry.map_name)
@@ -198,7 +111,7 @@ def update_metadata(entry):
   # To pull data from the maps, first match on map_name
   rows = mapCsv.search_for_prop('map_name', entry.map_name)
   if len(rows) != 1:
-    raise Exception(f"Can't find expected map ({map_name}); instead, found: {rows}")
+    raise Exception(f"Can't find expected map ({entry.map_name}); instead, found: {rows}")
   row = rows[0]
 
   # The map_title becomes the map_name_str
@@ -215,48 +128,30 @@ def update_metadata(entry):
 
 
 
+# Save treasure to a .csv file
+def write_csv(assets, results, out_path):
+  treasures = results['treasure']   # TreasureEntry
 
+  # Fill in any missing information
+  title_overrides_per_map = get_title_overrides(assets, results)   # E.g., Map_2011_1 => 'My Map'
+  for entry in treasures:
+    update_metadata(entry, assets, title_overrides_per_map)
 
-# Helper: Track title overrides (these appear in events for specific maps)
-title_overrides_per_map = {}   # E.g., Map_2011_1 => 'My Map'
-
-# Read our various assets
-systemStrs = StringsAsset.ReadFile(f"{GamePath}/{DataExportPath}/{MessagePath}/{StringFiles['system']}")
-storyMsgStrs = StringsAsset.ReadFile(f"{GamePath}/{DataExportPath}/{MessagePath}/{StringFiles['story_mes']}")
-#
-contentCsv = CsvAsset.ReadFile(f"{GamePath}/{DataExportPath}/{MasterPath}/content.csv")
-mapCsv = CsvAsset.ReadFile(f"{GamePath}/{DataExportPath}/{MasterPath}/map.csv")
-areaCsv = CsvAsset.ReadFile(f"{GamePath}/{DataExportPath}/{MasterPath}/area.csv")
-
-# Make a list of 'map' directories (map_1234); includes some weird ones like (map_1234_nigheffect) that we may need to hope don't have items
-map_dirs = get_map_dirs(f"{GamePath}/{DataExportPath}")
-
-# Within Assets/GameAssets/Serial/Res/Map/Map<XYZ>, we have a list of directories (at least 1) that contain "entity_default.json"
-# These contain a list of Treasures that we care about
-treasures = []   # TreasureEntry
-for map_dir in map_dirs:
-  # Scan it!
-  print(f"Scanning: {map_dir}")
-  scan_for_treasure(map_dir, treasures)
-
-# Fill in any missing information
-for entry in treasures:
-  update_metadata(entry)
+  # Print (debug)
+  #for entry in treasures:
+  #  print(entry)
 
-# Print (debug)
-#for entry in treasures:
-#  print(entry)
+  with open(out_path, 'w', encoding='utf-8') as out:
+    out.write("asset_dir,map_name,json_xpath,map_area_name,map_override_name,content_name_str,content_id,content_num,script_id,message_key,entity_default\n")
 
-# Save treasure to a .csv file
-out_path = 'my_treasures.csv'
-with open(out_path, 'w', encoding='utf-8') as out:
-  out.write("asset_dir,map_name,json_xpath,map_area_name,map_override_name,content_name_str,content_id,content_num,script_id,message_key,entity_default\n")
+    for entry in treasures:
+      map_area_name = entry.area_name_str
+      if entry.map_name_str != None:
+        map_area_name += f" - {entry.map_name_str}"
+      out.write(f"{entry.asset_dir},{entry.map_name},{entry.asset_path},{map_area_name},{entry.title_override},{entry.content_name_str},{entry.content_id},{entry.content_num},{entry.script_id},{entry.message_key},{entry.entity_default}\n")
 
-  for entry in treasures:
-    map_area_name = entry.area_name_str
-    if entry.map_name_str != None:
-      map_area_name += f" - {entry.map_name_str}"
-    out.write(f"{entry.asset_dir},{entry.map_name},{entry.asset_path},{map_area_name},{entry.title_override},{entry.content_name_str},{entry.content_id},{entry.content_num},{entry.script_id},{entry.message_key},{entry.entity_default}\n")
 
 
-print(f"Done, saved to: {out_path}")
+if __name__ == "__main__":
+  import scan_treasure
+  run_scanners([scan_treasure], 'Make a table of every treasure in the maps (my_treasures.csv).')
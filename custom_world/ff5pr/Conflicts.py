@@ -0,0 +1,162 @@
+#
+# Finding patches that write to the same place.
+# Our output patches the game's assets from several places: the patch sets in Patches.py, a GetItem Overwrite for every
+#   (non-shop) Location, rows in treasure_mod.csv (chests, shop product_group_id rewrites, and a few fixes), and the
+#   starting-party patches. Nothing stops two of these from targeting the same Mnemonics (an Overwrite of N Mnemonics
+#   can run into a neighbouring patch), and in-game the one that's applied last just wins.
+#
+# So, while we build the output, every planned write is recorded in a PatchWrites, as an interval in some target:
+#   * Overwrite/InlinePatch/SetSVal -- a range of indices in a Mnemonics array (asset path + the array's json_xpath)
+#   * SpotIArray                    -- each index it sets, in that array
+#   * treasure_mod.csv              -- each property it sets (as one "index" in asset path + json_xpath + property name)
+# find_overlaps() sorts each target's intervals once and sweeps them, so it's O(n log n). Two writes of the same thing
+#   (e.g., the same product_group_id to the same shop) aren't a conflict, and neither is a hand-off: a patch set that
+#   leaves a labelled Nop as a placeholder, and a later patch that finds it by that label (e.g., "Nop:SomeLabel") and
+#   replaces it (as every GetItem patch does). A write can also say that it means to replace whatever's there (e.g.,
+#   the starting-party patches replace part of "New Game Open World").
+# Overlaps *within* one patch set from Patches.py are the same for every seed, so we don't report them while generating;
+#   find_patch_set_overlaps() lists them (see Benchmarks/bench_patch_conflicts.py).
+#
+# What we do about overlaps is a *host* setting:
+#   * host.yaml:  ff5pr_options: patch_conflicts: strict
+#   * the FF5PR_PATCH_CONFLICTS environment variable, which overrides host.yaml
+# "warn" (the default) prints a warning for each one; "strict" also fails the generation; "off" doesn't check at all.
+#
+
+
+from .PatchFormat import ScriptPatch, OverwriteCommands, get_patch_set
+from .HostSettings import read_host_setting
+
+
+PatchConflictsEnvVar = 'FF5PR_PATCH_CONFLICTS'
+
+PatchConflictsModes = ['warn', 'strict', 'off']
+
+
+# Figure out what to do about conflicts, given our host settings (see HostSettings.py)
+def get_patch_conflicts_mode(host_settings):
+  return read_host_setting(host_settings, 'patch_conflicts', PatchConflictsEnvVar, PatchConflictsModes, PatchConflictsModes[0])
+
+
+# Split a json_xpath that ends in an array index: '/Mnemonics/[3]' -> ('/Mnemonics', 3)
+# Anything else is its own target, starting at 0.
+def split_index(xpath):
+  head, _, last = xpath.rpartition('/')
+  if last.startswith('[') and last.endswith(']') and last[1:-1].isdigit():
+    return head, int(last[1:-1])
+  return xpath, 0
+
+
+# One planned write: indices [start, end) of 'target' in 'asset_path'
+class PatchWrite:
+  __slots__ = ('asset_path', 'target', 'start', 'end', 'value', 'source', 'order', 'anchor', 'labels', 'group', 'overrides')
+
+  def __init__(self, asset_path, target, start, end, value, source, order, anchor='', labels=(), group=None, overrides=False):
+    self.asset_path = asset_path
+    self.target = target
+    self.start = start
+    self.end = end
+    self.value = value     # What's written (so that we can tell a duplicate from a conflict)
+    self.source = source   # Where this write came from, for messages
+    self.order = order     # Writes are applied in this order
+    self.anchor = anchor   # The label of the Nop this write replaces (at 'start'), if it finds one by label
+    self.labels = labels   # ( (index, label), ... ) for each labelled Nop this write leaves behind
+    self.group = group     # The patch set this write is from (if any)
+    self.overrides = overrides   # True if this write means to replace whatever was there
+
+  # True if it's fine for 'later' to overwrite us: it replaces a placeholder (a labelled Nop) that we left for it, or it
+  #   means to replace us
+  def hands_off_to(self, later):
+    return later.overrides or (later.anchor != '' and (later.start, later.anchor) in self.labels)
+
+  def describe(self):
+    where = f"[{self.start}]" if self.end == self.start + 1 else f"[{self.start}:{self.end}]"
+    return f"{self.target}{where} ({self.source})"
+
+
+# Every write we plan to make to the game's assets
+class PatchWrites:
+  def __init__(self, enabled=True, within_groups=False):
+    self.enabled = enabled
+    self.within_groups = within_groups   # Also report overlaps within one patch set?
+    self.writes = []
+
+  def add(self, asset_path, target, start, end, value, source, anchor='', labels=(), group=None, overrides=False):
+    if self.enabled:
+      self.writes.append(PatchWrite(asset_path, target, start, end, value, source, len(self.writes), anchor, labels, group, overrides))
+
+  # A ScriptPatch (see PatchFormat.py)
+  def add_script_patch(self, patch, source, group=None, overrides=False):
+    if not self.enabled:
+      return
+    if patch.command in OverwriteCommands:
+      target, index = split_index(patch.xpath)
+      if patch.command == 'InlinePatch':
+        innerTarget, index = split_index(patch.inline_xpath)
+        target = f"{patch.xpath}:{innerTarget}"
+      start = index + patch.args[0]
+      anchor = patch.expected_label if patch.args[0] == 0 else ''
+      labels = tuple((start + i, mnemonic.label) for i, mnemonic in enumerate(patch.payload) if mnemonic.mnemonic == 'Nop' and mnemonic.label != '')
+      self.add(patch.asset_path, target, start, start + len(patch.payload), tuple(patch.payload), source, anchor, labels, group, overrides)
+    elif patch.command == 'SetSVal':
+      target, index = split_index(patch.xpath)
+      self.add(patch.asset_path, target, index, index + 1, tuple(patch.args), source, group=group, overrides=overrides)
+    elif patch.command == 'SpotIArray':
+      for key, value in patch.payload.items():
+        self.add(patch.asset_path, patch.xpath, int(key), int(key) + 1, value, source, group=group, overrides=overrides)
+
+  # A script patch we're writing: its header line, and its Mnemonics (if any)
+  # Set 'overrides' if it's meant to replace (part of) an earlier patch.
+  def add_script(self, header, payload, source, overrides=False):
+    if self.enabled:
+      self.add_script_patch(ScriptPatch(header, payload), source, overrides=overrides)
+
+  # Every patch in the Patches.py patch set called 'name'
+  def add_patch_set(self, name):
+    if self.enabled:
+      for patch in get_patch_set(name).patches:
+        self.add_script_patch(patch, f"{name}, line {patch.line}", group=name)
+
+  # A treasure_mod.csv row: { property name -> value } at 'xpath'
+  def add_properties(self, asset_path, xpath, props, source):
+    if self.enabled:
+      for name, value in props.items():
+        self.add(asset_path, f"{xpath}/{{name={name}}}", 0, 1, str(value), source)
+
+  # Returns: [ (earlier, later), ... ] (in the order they're applied) for every write that overlaps a write that starts
+  #   before (or with) it. Each write is reported at most once, against the write before it that reaches the furthest.
+  def find_overlaps(self):
+    targets = {}
+    for write in self.writes:
+      targets.setdefault((write.asset_path, write.target), []).append(write)
+
+    res = []
+    for key in sorted(targets.keys()):
+      reach = None   # The write (so far) with the greatest 'end'
+      for write in sorted(targets[key], key=lambda write: (write.start, write.end)):
+        if reach is not None and write.start < reach.end:
+          earlier, later = (reach, write) if reach.order < write.order else (write, reach)
+          sameGroup = earlier.group is not None and earlier.group == later.group and not self.within_groups
+          if (write.start, write.end, write.value) != (reach.start, reach.end, reach.value) and not sameGroup and not earlier.hands_off_to(later):
+            res.append((earlier, later))
+        if reach is None or write.end > reach.end:
+          reach = write
+    return res
+
+  # Report every overlap, as 'mode' says (see PatchConflictsModes); returns the overlaps
+  def check(self, mode, name):
+    if mode == 'off' or not self.enabled:
+      return []
+    overlaps = self.find_overlaps()
+    for earlier, later in overlaps:
+      print(f"WARNING: Patches for {name} overlap in {earlier.asset_path}: {earlier.describe()} is overwritten by {later.describe()}")
+    if mode == 'strict' and len(overlaps) > 0:
+      raise Exception(f"{len(overlaps)} patches for {name} overlap (see above); set patch_conflicts to 'warn' to allow this.")
+    return overlaps
+
+
+# Overlaps within the Patches.py patch set called 'name': [ (earlier, later), ... ]
+def find_patch_set_overlaps(name):
+  writes = PatchWrites(within_groups=True)
+  writes.add_patch_set(name)
+  return writes.find_overlaps()
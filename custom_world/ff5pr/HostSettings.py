@@ -0,0 +1,36 @@
+#
+# Reading our *host* settings (FF5PRSettings, in __init__.py). These go in host.yaml, not in player YAMLs, and each one
+#   can also be set with an environment variable (e.g., FF5PR_OUTPUT_FORMAT=debug), which overrides host.yaml; that's
+#   handy for trying a setting out (e.g., in Benchmarks/) without editing host.yaml.
+#
+
+
+import os
+
+
+# Read the host setting 'attr' from 'host_settings' (which may be None, e.g., if there's no host.yaml entry), or from
+#   the environment variable 'env_var' if that's set.
+# 'choices' is either a list of the valid values (compared in lowercase, after 'aliases' maps other spellings onto them),
+#   or a function that turns the setting's text into its value (and raises a ValueError if it can't).
+# If the setting isn't there, we use 'default' (given as text, like the setting itself); if it's invalid, we print a
+#   WARNING and use 'default' as well.
+def read_host_setting(host_settings, attr, env_var, choices, default, aliases={}):
+  text = os.environ.get(env_var)
+  if text is None:
+    text = getattr(host_settings, attr, None)
+  text = str(text).strip() if text is not None else default
+  try:
+    return parse_host_setting(text, choices, aliases)
+  except ValueError as ex:
+    print(f"WARNING: Invalid {attr} setting: '{text}' ({ex}); using '{default}'.")
+    return parse_host_setting(default, choices, aliases)
+
+
+def parse_host_setting(text, choices, aliases):
+  if callable(choices):
+    return choices(text)
+  value = text.lower()
+  value = aliases.get(value, value)
+  if value not in choices:
+    raise ValueError(f"expected one of: {choices}")
+  return value
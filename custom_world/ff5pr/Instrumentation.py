@@ -0,0 +1,161 @@
+#
+# Optional timing/memory metrics for each stage of generation (generate_early, create_regions, etc.).
+# This is for figuring out why a big generation is slow; it's off by default, and is a *host* setting (not a player option).
+# Turn it on with either:
+#   * host.yaml:  ff5pr_options: metrics: file   (or: embed)
+#   * the FF5PR_METRICS environment variable, which overrides host.yaml (e.g., FF5PR_METRICS=embed)
+# The modes are:
+#   * off   -- do nothing (the default)
+#   * file  -- write "<output>.metrics.json" next to each .apff5pr
+#   * embed -- as 'file', and also put a copy of it inside the .apff5pr as "metrics.json"
+#
+# For each stage (and each sub-step inside a stage) we record:
+#   * wall_ms  -- elapsed time
+#   * cpu_ms   -- CPU time of the current thread
+#   * peak_kib -- highest memory use (as seen by tracemalloc) during the step, above what was in use when it started
+# NOTE: tracemalloc slows everything down a fair bit, so compare wall times to other runs with metrics on, not off.
+# NOTE: Archipelago may call generate_output() for several worlds at once (in threads); tracemalloc is process-wide,
+#       so peak_kib will include memory used by the other threads in that case.
+# NOTE: This is only imported once metrics are turned on (see get_stage_metrics() and timed_step() in __init__.py).
+#
+
+
+import os
+import json
+import time
+import zipfile
+import threading
+import tracemalloc
+
+from .HostSettings import read_host_setting
+
+
+MetricsEnvVar = 'FF5PR_METRICS'
+
+# Name of our metrics file inside the .apff5pr (when embedding)
+EmbeddedMetricsName = 'metrics.json'
+
+MetricsModes = ['off', 'file', 'embed']
+
+# Be forgiving about on/off values
+MetricsAliases = { '': 'off', '0': 'off', 'false': 'off', 'no': 'off', 'none': 'off', '1': 'file', 'true': 'file', 'yes': 'file', 'on': 'file' }
+
+
+# tracemalloc is process-wide, and several Worlds may be measuring at once; only stop it once they're all done
+tracemalloc_lock = threading.Lock()
+tracemalloc_users = 0
+
+def acquire_tracemalloc():
+  global tracemalloc_users
+  with tracemalloc_lock:
+    if tracemalloc_users == 0 and not tracemalloc.is_tracing():
+      tracemalloc.start()
+    tracemalloc_users += 1
+
+def release_tracemalloc():
+  global tracemalloc_users
+  with tracemalloc_lock:
+    tracemalloc_users -= 1
+    if tracemalloc_users == 0:
+      tracemalloc.stop()
+
+
+# Figure out which mode we're in, given our host settings (see HostSettings.py)
+def get_metrics_mode(host_settings):
+  return read_host_setting(host_settings, 'metrics', MetricsEnvVar, MetricsModes, 'off', MetricsAliases)
+
+
+# One in-progress step
+class RunningStep:
+  def __init__(self, name, record):
+    self.name = name
+    self.record = record   # Where the results will go (a dict, see StageMetrics.stages)
+    self.wall_start = time.perf_counter()
+    self.cpu_start = time.thread_time()
+    self.mem_start = tracemalloc.get_traced_memory()[0]
+    self.max_peak = self.mem_start  # Highest peak seen, across any resets of tracemalloc's peak
+
+
+# Collects metrics for one World (one player)
+class StageMetrics:
+  def __init__(self, mode):
+    self.mode = mode
+    self.enabled = (mode != 'off')
+
+    # { stageName -> { 'wall_ms', 'cpu_ms', 'peak_kib', 'steps': { stepName -> {...} } } }, in the order they were run
+    self.stages = {}
+
+    # Steps that are currently running, outermost first
+    self.running = []
+
+    # Where to save our results once the current stage ends (see save_after_stage())
+    self.pending_output = None
+
+
+  # Start measuring a stage (if nothing is running) or a sub-step of whatever is running
+  def start_step(self, name):
+    if not self.enabled:
+      return
+
+    if len(self.running) == 0:
+      acquire_tracemalloc()
+      record = self.stages.setdefault(name, {})
+    else:
+      # Our parent's peak is about to be reset, so save it first
+      parent = self.running[-1]
+      parent.max_peak = max(parent.max_peak, tracemalloc.get_traced_memory()[1])
+      record = parent.record.setdefault('steps', {}).setdefault(name, {})
+
+    tracemalloc.reset_peak()
+    self.running.append(RunningStep(name, record))
+
+
+  # Stop measuring a step, and record the results.
+  # If a step failed to end (due to an exception), ending its parent will end it too.
+  def end_step(self, name):
+    if not self.enabled:
+      return
+
+    while len(self.running) > 0:
+      step = self.running.pop()
+      peak = tracemalloc.get_traced_memory()[1]
+      step.record['wall_ms'] = round(1000 * (time.perf_counter() - step.wall_start), 3)
+      step.record['cpu_ms'] = round(1000 * (time.thread_time() - step.cpu_start), 3)
+      step.record['peak_kib'] = round(max(step.max_peak, peak) / 1024 - step.mem_start / 1024, 1)
+      if len(self.running) > 0:
+        self.running[-1].max_peak = max(self.running[-1].max_peak, peak)
+      if step.name == name:
+        break
+
+    if len(self.running) == 0:
+      release_tracemalloc()
+      if self.pending_output is not None:
+        self.save(self.pending_output)
+        self.pending_output = None
+
+
+  # Add the results of a step that was measured somewhere else (e.g., in a worker process; see Snapshot.py) to whatever is running
+  def add_step(self, name, record):
+    if self.enabled and len(self.running) > 0:
+      self.running[-1].record.setdefault('steps', {})[name] = record
+
+
+  # Ask for our results to be saved next to the .apff5pr at 'file_path' once the current stage ends.
+  # (We wait, so that the results include the rest of generate_output().)
+  def save_after_stage(self, file_path):
+    if self.enabled:
+      self.pending_output = file_path
+
+
+  def to_json(self):
+    return json.dumps({ 'mode': self.mode, 'stages': self.stages }, indent=2)
+
+
+  # Write our results next to the .apff5pr at 'file_path' (and maybe inside it)
+  def save(self, file_path):
+    contents = self.to_json()
+    with open(f"{os.path.splitext(file_path)[0]}.metrics.json", 'w', encoding='utf-8') as f:
+      f.write(contents)
+    if self.mode == 'embed':
+      with zipfile.ZipFile(file_path, mode='a', compression=zipfile.ZIP_DEFLATED, compresslevel=3) as zf:
+        zf.writestr(EmbeddedMetricsName, contents)
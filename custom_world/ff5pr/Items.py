@@ -0,0 +1,122 @@
+#
+# Compiled item table: everything we need to know about each Item name, worked out once per process.
+# Creating an Item (and later, deciding what the client should do when it's received) used to mean normalizing the
+#   name, parsing "5x Potion + 1x Ether" strings, and looking up the classification string every time.
+# Instead, get_item_table() resolves every name in item_name_to_id the first time it's called, and every World shares the result.
+#
+# NOTE: This only *reads* pristine_items, and never changes it; don't keep references to the pristine objects themselves.
+#
+
+
+import functools
+
+from BaseClasses import ItemClassification
+
+from .Pristine import pristine_items, normalize_item_name, parse_jumbo_items
+
+
+# { lowercase classification string (from Pristine.py) -> ItemClassification }
+ItemClassificationLookup = {
+  'filler': ItemClassification.filler,
+  'progression': ItemClassification.progression,
+  'useful': ItemClassification.useful,
+  'trap': ItemClassification.trap,
+  'skipbalancing': ItemClassification.skip_balancing,
+  'deprioritized': ItemClassification.deprioritized,
+  'progression_deprioritized_skip_balancing': ItemClassification.progression_deprioritized_skip_balancing,
+  'progression_skip_balancing': ItemClassification.progression_skip_balancing,
+  'progression_deprioritized': ItemClassification.progression_deprioritized,
+}
+
+
+# Helper: Classification string to ItemClassification type
+def ParseItemClassification(classStr):
+  res = ItemClassificationLookup.get(classStr.lower())
+  if res is None:
+    print(f"WARNING: Unknown Item classification type: {classStr}")
+    return ItemClassification.filler
+  return res
+
+
+# Everything we know about one (normalized) Item name
+class CompiledItem:
+  __slots__ = ('name', 'code', 'classification', 'tags', 'action')
+
+  def __init__(self, name: str, code: int, classification: ItemClassification, tags: frozenset[str], action: tuple):
+    self.name = name  # Normalized name, e.g. "2x Potion + 1x Ether"
+    self.code = code  # Archipelago id
+    self.classification = classification
+    self.tags = tags  # Same as the pristine item's tags; Jumbo items are just tagged "Jumbo"
+    self.action = action  # What the client does when it receives this: ('job', JobId) or ('jumbo', content_id, count, ...); None for mundane items
+
+  def __repr__(self):
+    return f"CompiledItem({self.name}, {self.code}, {self.classification}, {self.action})"
+
+
+# Work out the client action for the item 'name'; see gen_pre_process_locations()
+def compile_item_action(name):
+  if name in pristine_items and 'Job' not in pristine_items[name].tags:
+    # Mundane; no special action.
+    return None
+  elif name in pristine_items:
+    subItems = parse_jumbo_items(name)
+    if len(subItems)!=1 or not subItems[0][1].startswith('Job:'):
+      raise Exception(f"Bad jumbo job: {name}")
+    return ('job', pristine_items[subItems[0][1]].optattrs['JobId'])
+  else:  # This is a Jumbo item
+    values = ['jumbo']
+    for count, subName in parse_jumbo_items(name):
+      if subName.startswith('Job:'):
+        raise Exception(f"Bad jumbo non-job: {name}")
+      values.append(pristine_items[subName].content_id)
+      values.append(count)
+    return tuple(values)
+
+
+class ItemTable:
+  def __init__(self, item_name_to_id):
+    # { name -> CompiledItem }; this also contains non-normalized names, once they've been looked up
+    self.items = {}
+    for name, code in item_name_to_id.items():
+      if name in pristine_items:
+        data = pristine_items[name]
+        entry = CompiledItem(name, code, ParseItemClassification(data.classification), frozenset(data.tags), compile_item_action(name))
+      else:
+        entry = CompiledItem(name, code, ItemClassification.filler, frozenset(['Jumbo']), compile_item_action(name))
+      self.items[name] = entry
+
+    # content_ids of mundane items that are also Key+Progression items in game (like the Adamantite), sorted by name.
+    self.mundane_prog_items = tuple(pristine_items[name].content_id for name in sorted(pristine_items.keys()) if self.is_mundane_prog_item(pristine_items[name]))
+
+    # Archipelago ids of every Item that gives the player Gil (including Jumbo items like "100x Gil")
+    gilContentIds = set(data.content_id for data in pristine_items.values() if 'Gil' in data.tags)
+    self.gil_codes = frozenset(entry.code for entry in self.items.values() if self.gives_gil(entry, gilContentIds))
+
+
+  @staticmethod
+  def is_mundane_prog_item(data):
+    return (data.classification.lower() == 'progression') and ('KeyItem' in data.tags) and ('Job' not in data.tags) and ('WorldTeleport' not in data.tags)
+
+
+  @staticmethod
+  def gives_gil(entry, gilContentIds):
+    if 'Gil' in entry.tags:
+      return True
+    if entry.action is not None and entry.action[0] == 'jumbo':
+      return any(content_id in gilContentIds for content_id in entry.action[1::2])
+    return False
+
+
+  # Look up an item by any name that normalizes to one of ours (e.g., "2 Potions + 1 Ether")
+  def get(self, name):
+    entry = self.items.get(name)
+    if entry is None:
+      entry = self.items[normalize_item_name(name)]
+      self.items[name] = entry  # Worst case, two threads both do this and store the same thing.
+    return entry
+
+
+# The shared ItemTable for the given World class (built the first time it's needed)
+@functools.cache
+def get_item_table(world_type):
+  return ItemTable(world_type.item_name_to_id)
@@ -0,0 +1,84 @@
+#
+# Name/ID lookup tables that our World needs at class-definition time (item_name_to_id, location_name_to_id, etc.)
+# Computing these means parsing every Jumbo item name in Pristine.py, and Archipelago imports every apworld on startup
+#   (even the Launcher, which only needs the names). So, Scripts/pack_release.py calls write_frozen_lookups() to save
+#   the finished tables into FrozenLookups.py, which ships inside the .apworld.
+# FrozenLookups.py records a hash of the Pristine.py it was built from, and pack_release.py stamps the same hash into
+#   the packed Pristine.py (as PristineHash). On import we just compare the two constants, so checking is free; reading
+#   and hashing Pristine.py on every import cost more than computing the tables does. If they don't match (e.g., a
+#   checkout, where PristineHash is None), we just compute the tables again.
+# NOTE: This only catches a stale FrozenLookups.py; if you edit the Pristine.py inside a packed .apworld, re-pack it.
+#
+
+
+from .Pristine import create_ap_item_lookup, create_ap_location_lookup, PristineHash
+
+
+# Name of the generated module (relative to this package)
+FrozenLookupsModule = 'FrozenLookups'
+
+
+# Hash of Pristine.py's contents (ignoring line endings, which git may change). Only pack_release.py needs this.
+def compute_pristine_hash(file_path):
+  import hashlib
+  with open(file_path, 'rb') as f:
+    data = f.read()
+  return hashlib.sha256(data.replace(b'\r\n', b'\n')).hexdigest()
+
+
+# Stamp 'pristine_hash' into the Pristine.py at 'file_path' (as PristineHash), keeping its line endings
+def stamp_pristine_hash(file_path, pristine_hash):
+  import re
+  with open(file_path, 'rb') as f:
+    data = f.read()
+  data, count = re.subn(rb'^PristineHash = None(?=\r?$)', f"PristineHash = {pristine_hash!r}".encode('ascii'), data, flags=re.MULTILINE)
+  if count != 1:
+    raise Exception(f"Could not find 'PristineHash = None' in: {file_path}")
+  with open(file_path, 'wb') as f:
+    f.write(data)
+
+
+# Compute all lookups from the pristine data. This is the slow path.
+# Returns: product_to_shop_lookup, item_name_to_id, item_name_groups, location_name_to_id, location_name_groups
+def compute_lookups():
+  product_to_shop_lookup = {}
+  item_name_to_id, item_name_groups = create_ap_item_lookup()
+  location_name_to_id, location_name_groups = create_ap_location_lookup(product_to_shop_lookup)
+  return product_to_shop_lookup, item_name_to_id, item_name_groups, location_name_to_id, location_name_groups
+
+
+# Load our lookups from FrozenLookups.py if it exists and matches Pristine.py; otherwise, compute them.
+# Returns the same values as compute_lookups()
+def load_lookups():
+  try:
+    from . import FrozenLookups as frozen
+  except ImportError:
+    return compute_lookups()
+
+  if frozen.pristine_hash != PristineHash:
+    print("WARNING: FrozenLookups.py is out of date with Pristine.py; computing lookups instead.")
+    return compute_lookups()
+
+  # Groups are stored as sorted lists, but Archipelago expects sets
+  item_name_groups = { name: set(items) for name, items in frozen.item_name_groups.items() }
+  location_name_groups = { name: set(locs) for name, locs in frozen.location_name_groups.items() }
+  return dict(frozen.product_to_shop_lookup), dict(frozen.item_name_to_id), item_name_groups, dict(frozen.location_name_to_id), location_name_groups
+
+
+# Write our lookups to a Python module at 'file_path' (normally FrozenLookups.py, next to this file), recording
+#   'pristine_hash' (see compute_pristine_hash()) as the Pristine.py they were built from.
+# Each table is written on one line, to keep the module small.
+def write_frozen_lookups(file_path, pristine_hash):
+  product_to_shop_lookup, item_name_to_id, item_name_groups, location_name_to_id, location_name_groups = compute_lookups()
+  item_name_groups = { name: sorted(items) for name, items in item_name_groups.items() }
+  location_name_groups = { name: sorted(locs) for name, locs in location_name_groups.items() }
+
+  with open(file_path, 'w', encoding='utf-8', newline='\n') as f:
+    f.write("# Generated by Scripts/pack_release.py; DO NOT EDIT.\n")
+    f.write("# See Lookups.py; if Pristine.py's PristineHash doesn't match this hash, these tables are ignored.\n")
+    f.write(f"pristine_hash = {pristine_hash!r}\n")
+    f.write(f"product_to_shop_lookup = {product_to_shop_lookup!r}\n")
+    f.write(f"item_name_to_id = {item_name_to_id!r}\n")
+    f.write(f"item_name_groups = {item_name_groups!r}\n")
+    f.write(f"location_name_to_id = {location_name_to_id!r}\n")
+    f.write(f"location_name_groups = {location_name_groups!r}\n")
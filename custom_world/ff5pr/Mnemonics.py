@@ -0,0 +1,141 @@
+#
+# A typed model of the script Mnemonics that our patches write into the game's event scripts (see Patches.py for
+#   the patch format). In the game's json, each Mnemonic looks like this:
+#   {
+#     "label": "",
+#     "mnemonic": "GetItem",
+#     "operands": {
+#       "iValues": [42,1,0,0,0,0,0,0],
+#       "rValues": [0,0,0,0,0,0,0,0],
+#       "sValues": ["","","","","","","",""]
+#     },
+#     "type": 1,
+#     "comment": ""
+#   }
+# ...where every operand array has exactly 8 slots. A Mnemonic only stores the slots that matter; the rest are filled in
+#   when it's encoded.
+#
+# Mnemonics can't be changed once made, so each one remembers its encoded text. The ones we write for every player
+#   (Nop, GetItem for a given item, SysCall for a given name) are also made once per process (see Nop(), GetItem(), SysCall()).
+#
+# Like multiworld_data.json, script patches are written in the host's output format (see Output.py):
+#   * compact -- no whitespace, and no comments
+#   * debug   -- as before: our own Mnemonics are one per line, and the patches in Patches.py are copied as written
+# (Patches.py itself is parsed into Mnemonics by PatchFormat.py.)
+#
+
+
+import json
+import functools
+
+
+# Number of slots in each operand array
+OperandSlots = 8
+
+# The 'type' of each Mnemonic; Nop is the only "label" type we write
+CommandType = 1
+LabelType = 2
+
+# The fields in the game's json (sorted)
+JsonKeys = ['comment', 'label', 'mnemonic', 'operands', 'type']
+OperandKeys = ['iValues', 'rValues', 'sValues']
+
+
+# (Encoders are cheap to re-use, but not to make.)
+# Script strings are written as-is (not \u-escaped); the game reads the patch file as utf-8.
+compact_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+debug_encoder = json.JSONEncoder(separators=(',', ': '), ensure_ascii=False)
+
+
+# A single script command
+class Mnemonic:
+  __slots__ = ('mnemonic', 'iValues', 'rValues', 'sValues', 'label', 'type', 'comment', 'encoded')
+
+  # iValues/rValues/sValues may be shorter than OperandSlots; the rest are 0 (or "")
+  # 'type' defaults to LabelType for Nop and CommandType for everything else.
+  def __init__(self, mnemonic, iValues=(), rValues=(), sValues=(), label='', type=None, comment=''):
+    if max(len(iValues), len(rValues), len(sValues)) > OperandSlots:
+      raise ValueError(f"Mnemonic {mnemonic} has more than {OperandSlots} operands")
+    self.mnemonic = mnemonic
+    self.iValues = tuple(iValues) + (0,) * (OperandSlots - len(iValues))
+    self.rValues = tuple(rValues) + (0,) * (OperandSlots - len(rValues))
+    self.sValues = tuple(sValues) + ('',) * (OperandSlots - len(sValues))
+    self.label = label
+    self.type = type if type is not None else (LabelType if mnemonic == 'Nop' else CommandType)
+    self.comment = comment
+    self.encoded = {}   # { outputFormat -> str }
+
+  # Make a Mnemonic from the game's json (as parsed by json.loads())
+  # Raises a ValueError if it isn't shaped like one (every field, and exactly OperandSlots of each operand).
+  @classmethod
+  def from_json(cls, obj):
+    if sorted(obj.keys()) != JsonKeys:
+      raise ValueError(f"Mnemonic must have exactly these keys: {JsonKeys} ; not: {sorted(obj.keys())}")
+    operands = obj['operands']
+    if not isinstance(operands, dict) or sorted(operands.keys()) != OperandKeys:
+      raise ValueError(f"Mnemonic {obj['mnemonic']} must have exactly these operands: {OperandKeys}")
+    for key, slotType in zip(OperandKeys, [int, (int, float), str]):
+      values = operands[key]
+      if not isinstance(values, list) or len(values) != OperandSlots or not all(isinstance(value, slotType) and type(value) is not bool for value in values):
+        raise ValueError(f"Mnemonic {obj['mnemonic']} has invalid {key}: {values}")
+    return cls(obj['mnemonic'], operands['iValues'], operands['rValues'], operands['sValues'], obj['label'], obj['type'], obj['comment'])
+
+  # The game's json for this Mnemonic (something json.dumps() can write)
+  def to_json(self):
+    return {
+      'label': self.label,
+      'mnemonic': self.mnemonic,
+      'operands': { 'iValues': list(self.iValues), 'rValues': list(self.rValues), 'sValues': list(self.sValues) },
+      'type': self.type,
+      'comment': self.comment,
+    }
+
+  # This Mnemonic's json text, in one of Output.OutputFormats (see encode_mnemonics())
+  def encode(self, outputFormat):
+    res = self.encoded.get(outputFormat)
+    if res is None:
+      if outputFormat == 'compact':
+        res = compact_encoder.encode(self.to_json())
+      else:
+        # This is how we've always written our own Mnemonics
+        res = (f'{{"label": {debug_encoder.encode(self.label)},"mnemonic": {debug_encoder.encode(self.mnemonic)},'
+               f'"operands": {{"iValues": {compact_encoder.encode(self.iValues)},"rValues": {compact_encoder.encode(self.rValues)},'
+               f'"sValues": {compact_encoder.encode(self.sValues)}}},"type": {self.type},"comment": {debug_encoder.encode(self.comment)}}}')
+      self.encoded[outputFormat] = res
+    return res
+
+  def __eq__(self, other):
+    if not isinstance(other, Mnemonic):
+      return NotImplemented
+    return self.to_json() == other.to_json()
+
+  def __hash__(self):
+    return hash((self.mnemonic, self.iValues, self.sValues, self.label))
+
+  def __repr__(self):
+    return f"Mnemonic({self.mnemonic!r}, label={self.label!r})"
+
+
+# Common Mnemonics, made once per process
+@functools.cache
+def Nop(label=''):
+  return Mnemonic('Nop', label=label)
+
+@functools.cache
+def GetItem(content_id, content_num):
+  return Mnemonic('GetItem', iValues=(content_id, content_num))
+
+@functools.cache
+def SysCall(name):
+  return Mnemonic('SysCall', sValues=(name,))
+
+
+# Encode a list of Mnemonics as a json array (the body of an 'Overwrite' patch), on one line
+def encode_mnemonics(mnemonics, outputFormat):
+  return '[' + ','.join([ mnemonic.encoded.get(outputFormat) or mnemonic.encode(outputFormat) for mnemonic in mnemonics ]) + ']'
+
+# The same, for the one-GetItem patch that (almost) every Location gets; encoded once per process
+@functools.cache
+def encode_get_item(content_id, content_num, outputFormat):
+  return encode_mnemonics([GetItem(content_id, content_num)], outputFormat)
+
@@ -0,0 +1,327 @@
+#
+# Helpers for writing our output (.apff5pr) file.
+# Our patch files are built up as lists of text chunks, which are then streamed into the zip file one at a time;
+#   each chunk is encoded and compressed as it goes, so we never join a whole file into one big string.
+#
+# How each member of the .apff5pr is compressed is a *host* setting (see CompressionPlan, below):
+#   * host.yaml:  ff5pr_options: compression: "auto,threads=4"
+#   * the FF5PR_COMPRESSION environment variable, which overrides host.yaml
+# The default ("deflate:3") is what we've always used. Benchmarks/bench_compression.py compares the options.
+#
+# Our JSON output (multiworld_data.json, and the script patches; see Mnemonics.py) can be written in one of two formats;
+#   this is also a host setting:
+#   * host.yaml:  ff5pr_options: output_format: debug
+#   * the FF5PR_OUTPUT_FORMAT environment variable, which overrides host.yaml
+# "compact" (the default) has no whitespace, and packs the biggest lookups into dense arrays; "debug" is laid out for reading.
+#
+
+
+import io
+import json
+import time
+import zlib
+import zipfile
+import threading
+import concurrent.futures
+
+from .HostSettings import read_host_setting
+
+
+# Write 'chunks' (a list of strings, or just one string) into a new file called 'name' inside the (open) ZipFile 'zf'.
+# The result is the same as zf.writestr(name, ''.join(chunks)), but without the extra copies.
+# Chunks may also be (utf-8) bytes, such as the shared blocks below; these are written without re-encoding them.
+# NOTE: Only one file in a ZipFile can be open for writing at a time, so finish one file before starting the next.
+def write_zip_text(zf, name, chunks):
+  if isinstance(chunks, str):
+    chunks = [chunks]
+  # Most chunks are strings, so we hand runs of them to writelines() and only stop for the (few) bytes chunks.
+  types = list(map(type, chunks))
+  bytesIndices = [ i for i, chunkType in enumerate(types) if chunkType is bytes ] if bytes in types else []
+  start = 0
+  with io.TextIOWrapper(zf.open(name, mode='w'), encoding='utf-8', newline='') as out:
+    for end in bytesIndices:
+      out.writelines(chunks[start:end])
+      out.flush()
+      out.buffer.write(chunks[end])
+      start = end + 1
+    out.writelines(chunks[start:])
+
+
+# Blocks of output text that are the same for every player (and every World) are only built once per process.
+# Archipelago may call generate_output() for several Worlds at once (in threads), so building a block is locked;
+#   reading a block that's already built isn't.
+# { key -> bytes } ; each block is stored already encoded, and write_zip_text() writes it as-is.
+shared_blocks = {}
+shared_blocks_lock = threading.Lock()
+
+# Retrieve the shared block called 'key', calling build() (which returns a string or list of strings) to make it if needed.
+# 'key' must identify the contents exactly; e.g., ('script_patches', ('patch_a', 'patch_b')).
+def get_shared_block(key, build):
+  block = shared_blocks.get(key)
+  if block is None:
+    with shared_blocks_lock:
+      block = shared_blocks.get(key)
+      if block is None:
+        chunks = build()
+        block = (chunks if isinstance(chunks, str) else ''.join(chunks)).encode('utf-8')
+        shared_blocks[key] = block
+  return block
+
+
+
+CompressionEnvVar = 'FF5PR_COMPRESSION'
+
+DefaultCompression = 'deflate:3'
+
+# Compression methods we can use for a member, by name
+Codecs = { 'stored': zipfile.ZIP_STORED, 'deflate': zipfile.ZIP_DEFLATED, 'bzip2': zipfile.ZIP_BZIP2, 'lzma': zipfile.ZIP_LZMA }
+
+# Valid levels for each method, and the level we use if none is given (None if it doesn't have levels)
+CodecLevels = { 'stored': None, 'deflate': range(0, 10), 'bzip2': range(1, 10), 'lzma': None }
+CodecDefaultLevels = { 'stored': None, 'deflate': 6, 'bzip2': 9, 'lzma': None }
+
+# The game client opens the .apff5pr with .NET's ZipArchive (see RandoControl.cs), which can only read these methods.
+# Only Archipelago itself reads archipelago.json, so that one member can use anything.
+ClientCodecs = ['stored', 'deflate']
+ManifestName = 'archipelago.json'
+
+# For 'auto': members smaller than this are stored (deflate saves less than it costs), members smaller than
+#   AutoLargeSize use a high deflate level (it's cheap when they're small), and anything larger a fast one.
+AutoStoredSize = 1024
+AutoLargeSize = 256 * 1024
+AutoCodecs = [ ('stored', None), ('deflate', 6), ('deflate', 3) ]
+
+
+# Parse "codec" or "codec:level" into (codec, level)
+def parse_codec(text):
+  codec, _, level = text.strip().lower().partition(':')
+  if codec not in Codecs:
+    raise ValueError(f"Unknown compression method: '{codec}' (expected one of: {list(Codecs.keys())})")
+  if level == '':
+    return codec, CodecDefaultLevels[codec]
+  validLevels = CodecLevels[codec]
+  if validLevels is None or not level.isdigit() or int(level) not in validLevels:
+    raise ValueError(f"Invalid level for {codec}: '{level}'")
+  return codec, int(level)
+
+
+# How to compress each member of an .apff5pr
+# The spec is a comma-separated list of any of these:
+#   * codec[:level]          -- the default for every member; codec is stored, deflate (levels 0-9), bzip2 (1-9) or lzma
+#   * auto                   -- pick a codec for each member based on its size (see AutoCodecs)
+#   * member=codec[:level]   -- use this for one member (e.g., "script_patch.csv=deflate:9"); this beats 'auto'
+#   * threads=N              -- compress the members in N threads, then write them into the archive
+# E.g., "auto,threads=4" or "deflate:6,archipelago.json=stored".
+# The game client can't read bzip2 or lzma members, so unless 'client_safe' is turned off those are only used for
+#   archipelago.json; every other member falls back to the default ("deflate:3").
+class CompressionPlan:
+  def __init__(self, spec=DefaultCompression, client_safe=True):
+    self.spec = spec
+    self.client_safe = client_safe
+    self.default = self.fallback = parse_codec(DefaultCompression)
+    self.auto = False
+    self.members = {}   # { memberName -> (codec, level) }
+    self.threads = 0
+
+    for term in spec.split(','):
+      term = term.strip()
+      if term == '':
+        continue
+      if term.lower() == 'auto':
+        self.auto = True
+      elif term.lower().startswith('threads='):
+        threads = term.partition('=')[2].strip()
+        if not threads.isdigit():
+          raise ValueError(f"Invalid number of compression threads: '{threads}'")
+        self.threads = int(threads)
+      elif '=' in term:
+        name, _, codec = term.partition('=')
+        self.members[name.strip()] = parse_codec(codec)
+      else:
+        self.default = parse_codec(term)
+
+  # Returns (codec, level) for the member called 'name', which is about 'size' bytes long
+  def choose(self, name, size):
+    if name in self.members:
+      res = self.members[name]
+    elif self.auto:
+      res = AutoCodecs[0] if size < AutoStoredSize else AutoCodecs[1] if size < AutoLargeSize else AutoCodecs[2]
+    else:
+      res = self.default
+    if self.client_safe and res[0] not in ClientCodecs and name != ManifestName:
+      res = self.fallback
+    return res
+
+  def __repr__(self):
+    return f"CompressionPlan('{self.spec}')"
+
+
+# Figure out our compression, given our host settings (see HostSettings.py)
+def get_compression(host_settings):
+  plan = read_host_setting(host_settings, 'compression', CompressionEnvVar, CompressionPlan, DefaultCompression)
+  if any(codec not in ClientCodecs for codec, _ in [plan.default] + [ res for name, res in plan.members.items() if name != ManifestName ]):
+    print(f"WARNING: The game client can only read {ClientCodecs} members; everything except {ManifestName} will use '{DefaultCompression}' instead.")
+  return plan
+
+
+
+# Write a new .apff5pr at 'file_path' containing 'members' (a list of (name, chunks), as for write_zip_text()).
+# Each member is compressed according to 'plan' (a CompressionPlan). If 'finish' is given, it's called with the open
+#   ZipFile once our members are written, to add the archipelago.json manifest.
+def write_archive(file_path, members, plan, finish=None):
+  with zipfile.ZipFile(file_path, mode='w') as zf:
+    if plan.threads > 1:
+      write_members_threaded(zf, members, plan)
+    else:
+      for name, chunks in members:
+        set_compression(zf, *plan.choose(name, chunks_size(chunks)))
+        write_zip_text(zf, name, chunks)
+
+    if finish is not None:
+      set_compression(zf, *plan.choose(ManifestName, 0))   # It's tiny
+      finish(zf)
+
+
+# Make the next member written to 'zf' (with zf.open() or zf.writestr()) use this codec and level
+def set_compression(zf, codec, level):
+  zf.compression = Codecs[codec]
+  zf.compresslevel = level
+
+
+# Roughly how many bytes is this member? (Close enough for CompressionPlan.choose().)
+def chunks_size(chunks):
+  return len(chunks) if isinstance(chunks, (str, bytes)) else sum(map(len, chunks))
+
+
+# Compression threads, shared by every World in this process
+# Other Worlds may be submitting to the pool (outside the lock) at any time, so it's never shut down: if a World wants
+#   more threads, it gets a new, bigger pool, and the old one lives on for whoever is still using it (its threads exit
+#   once it's no longer referenced).
+compress_pool = None
+compress_pool_size = 0
+compress_pool_lock = threading.Lock()
+
+def get_compress_pool(threads):
+  global compress_pool, compress_pool_size
+  with compress_pool_lock:
+    if compress_pool is None or compress_pool_size < threads:
+      compress_pool = concurrent.futures.ThreadPoolExecutor(max_workers=threads, thread_name_prefix='ff5pr-compress')
+      compress_pool_size = threads
+    return compress_pool
+
+
+# Encode and compress one member (in a compression thread); zlib releases the GIL while it works.
+# Returns: (uncompressed size, CRC, compressed bytes)
+def compress_member(chunks, codec, level):
+  if isinstance(chunks, (str, bytes)):
+    chunks = [chunks]
+  data = b''.join([ chunk if type(chunk) is bytes else chunk.encode('utf-8') for chunk in chunks ])
+  crc = zlib.crc32(data)
+  if codec == 'deflate':
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)   # Raw deflate, just like zipfile
+    return len(data), crc, compressor.compress(data) + compressor.flush()
+  return len(data), crc, data
+
+
+# Write 'members' using the compression threads. Stored and deflate members are compressed in parallel and then copied
+#   into the archive, in order; bzip2 and lzma members (if any) are written normally, when their turn comes.
+# NOTE: This holds each member fully in memory (compressed and not), unlike write_zip_text().
+def write_members_threaded(zf, members, plan):
+  pool = get_compress_pool(plan.threads)
+  jobs = []
+  for name, chunks in members:
+    codec, level = plan.choose(name, chunks_size(chunks))
+    future = pool.submit(compress_member, chunks, codec, level) if codec in ['stored', 'deflate'] else None
+    jobs.append((name, chunks, codec, level, future))
+
+  for name, chunks, codec, level, future in jobs:
+    if future is None:
+      set_compression(zf, codec, level)
+      write_zip_text(zf, name, chunks)
+    else:
+      write_compressed_member(zf, name, Codecs[codec], *future.result())
+
+
+# Add an already-compressed member to the (open) ZipFile 'zf'.
+# zipfile has no way to do this, so we do what it does when you close a member opened with zf.open(name, 'w').
+# NOTE: This relies on zipfile's internals (fp, start_dir, filelist, NameToInfo), which have been stable for a long time;
+#       bench_compression.py reads every member back, so run it after upgrading Python.
+def write_compressed_member(zf, name, compressType, fileSize, crc, data):
+  zinfo = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+  zinfo.compress_type = compressType
+  zinfo.external_attr = 0o600 << 16   # Same as zf.open(name, 'w')
+  zinfo.file_size = fileSize
+  zinfo.compress_size = len(data)
+  zinfo.CRC = crc
+  zip64 = max(fileSize, len(data)) > zipfile.ZIP64_LIMIT
+  zinfo.header_offset = zf.fp.tell()
+  zf.fp.write(zinfo.FileHeader(zip64))
+  zf.fp.write(data)
+  zf.start_dir = zf.fp.tell()
+  zf.filelist.append(zinfo)
+  zf.NameToInfo[name] = zinfo
+
+
+
+OutputFormatEnvVar = 'FF5PR_OUTPUT_FORMAT'
+
+OutputFormats = ['compact', 'debug']
+
+
+# Figure out our output format, given our host settings (see HostSettings.py)
+def get_output_format(host_settings):
+  return read_host_setting(host_settings, 'output_format', OutputFormatEnvVar, OutputFormats, OutputFormats[0])
+
+
+# Gaps of up to this many IDs are filled with 0 inside a dense run; bigger gaps start a new run (see dense_runs())
+DenseMaxGap = 8
+
+# Pack { id -> value } (integers; values are never 0) into runs of dense arrays: [ [firstId - base, [value, value, ...]], ... ]
+# The Nth value in a run is for ID (base + firstId + N); 0 means there's no entry for that ID.
+def dense_runs(mapping, base):
+  runs = []
+  prev = None
+  for key in sorted(mapping.keys()):
+    if prev is None or key - prev > DenseMaxGap:
+      values = []
+      runs.append([key - base, values])
+    else:
+      values.extend([0] * (key - prev - 1))
+    values.append(mapping[key])
+    prev = key
+  return runs
+
+
+# (Encoders are cheap to re-use, but not to make.)
+compact_encoder = json.JSONEncoder(sort_keys=True, separators=(',', ':'))
+debug_encoder = json.JSONEncoder(sort_keys=True, indent=2)
+
+# Write the JSON object 'doc' ({ key -> value }) as a list of text chunks, in one pass; keys are written in sorted order.
+# 'outputFormat' is one of OutputFormats:
+#   * compact -- no whitespace. Any key in 'dense_keys' ({ key -> (baseKey, base) }) is packed with dense_runs(), and
+#                its base is written as 'baseKey'.
+#   * debug   -- the same as json.dumps(doc, sort_keys=True, indent=2), except that the dicts in 'line_keys' are written
+#                with one entry per line, in their own order (so that they're readable).
+def encode_json(doc, outputFormat, line_keys=(), dense_keys=None):
+  dense_keys = dense_keys if dense_keys is not None else {}
+  chunks = []
+  if outputFormat == 'compact':
+    doc = dict(doc)
+    for key, (baseKey, base) in dense_keys.items():
+      if key in doc:
+        doc[key] = dense_runs(doc[key], base)
+        doc[baseKey] = base
+    for key in sorted(doc.keys()):
+      chunks.append(f"{',' if len(chunks) > 0 else '{'}{json.dumps(key)}:{compact_encoder.encode(doc[key])}")
+    chunks.append('}' if len(chunks) > 0 else '{}')
+  else:
+    for key in sorted(doc.keys()):
+      value = doc[key]
+      if key in line_keys:
+        lines = [ f'    "{entryKey}": {json.dumps(entry)}' for entryKey, entry in value.items() ]   # (Our keys never need escaping)
+        valueStr = "{\n" + ',\n'.join(lines) + "\n  }"
+      else:
+        valueStr = debug_encoder.encode(value).replace('\n', '\n  ')
+      chunks.append(f"{',' if len(chunks) > 0 else '{'}\n  {json.dumps(key)}: {valueStr}")
+    chunks.append('\n}' if len(chunks) > 0 else '{}')
+  return chunks
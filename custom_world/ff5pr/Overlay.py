@@ -0,0 +1,211 @@
+#
+# Copy-on-write views of the 'pristine' data.
+# The pristine dictionaries (in Pristine.py) are shared by every FF5 World in the process, and are never modified.
+# Each World gets a PristineOverlay, which records only the fields that World has changed (e.g., the 'orig_item'
+#   of a shuffled shop Product). Reading a field through a view checks the overlay first, then the shared object.
+#
+# In other words, this:
+#   shop = world.pristine_shops['Tule Weapon Shop']
+#   shop.products['Tule Weapon Shop Item A'].orig_item = 'Elixir'
+# ...only changes 'orig_item' for this World's view of that Product; every other World still sees 'Broadsword'.
+#
+# Some caveats:
+#   * Views are made on first access (and then kept by the overlay), so don't rely on "is" to compare them. Compare names instead.
+#   * Nested lists (like tags) are returned as tuples, and nested dicts (like optattrs or a shop's products) are read-only.
+#     Replace the whole field if you need to change them.
+#
+
+
+from collections.abc import MutableMapping
+from types import MappingProxyType
+
+
+# Most fields are plain values, which are returned as-is
+PlainTypes = frozenset([str, int, float, bool, type(None)])
+
+
+# Per-World record of everything that differs from the pristine data
+class PristineOverlay:
+  def __init__(self):
+    # { pristineObject -> { fieldName -> newValue } } ; pristine objects hash by identity, so this is safe
+    self.changes = {}
+
+    # { fieldName -> value } ; overrides that field for *every* object viewed through this overlay
+    self.masks = {}
+
+    # { id(pristineObject) -> (pristineObject, view) } ; each view is made once, since we read the same objects over and
+    #   over (e.g., while writing our output). We hold on to the pristine object too, so that its id can't be reused.
+    self.views = {}
+
+  # Wrap a pristine object (or dict of pristine objects) so that it reads/writes through this overlay.
+  # Dicts are wrapped read-only unless 'writable' is set. Writable views are only made for the top-level dicts (see
+  #   clone_pristine_obs()), so they aren't kept here; a nested dict is shared by every World, and can't be added to.
+  def view(self, value, writable=False):
+    if type(value) in PlainTypes:
+      return value
+    if writable:
+      return PristineDictView(value, self, writable)
+    cached = self.views.get(id(value))
+    if cached is not None:
+      return cached[1]
+    if isinstance(value, dict):
+      if any(hasattr(entry, '__dict__') for entry in value.values()):
+        res = PristineDictView(value, self, False)
+      else:
+        res = MappingProxyType(value)
+    elif isinstance(value, list):
+      res = tuple(value)
+    elif hasattr(value, '__dict__'):
+      res = PristineView(value, self)
+    else:
+      return value
+    self.views[id(value)] = (value, res)
+    return res
+
+  # Make 'fieldName' read as 'value' for every object in this World (e.g., clearing all 'orig_item' fields).
+  # This is much cheaper than setting it on each object, since we don't need to record a change per object.
+  def mask_field(self, fieldName, value):
+    self.masks[fieldName] = value
+    for _, view in self.views.values():
+      if isinstance(view, PristineView):
+        view.__dict__.pop(fieldName, None)
+
+  # How many individual field changes have we recorded?
+  def num_changes(self):
+    return sum(len(fields) for fields in self.changes.values())
+
+  # Our changes in a form that can be pickled (e.g., sent to another process); pristine objects are replaced by their keys.
+  # 'keys' is { pristineObject -> key }, and the changed values must be picklable themselves (they're usually strings).
+  def export_changes(self, keys):
+    return { 'masks': dict(self.masks), 'changes': [ (keys[base], dict(fields)) for base, fields in self.changes.items() ] }
+
+  # Replay the result of export_changes() into this (fresh) overlay; 'objects' is { key -> pristineObject }
+  def import_changes(self, exported, objects):
+    for fieldName, value in exported['masks'].items():
+      self.mask_field(fieldName, value)
+    for key, fields in exported['changes']:
+      self.changes.setdefault(objects[key], {}).update(fields)
+      cached = self.views.get(id(objects[key]))
+      if cached is not None:
+        for fieldName in fields:
+          cached[1].__dict__.pop(fieldName, None)
+
+
+
+# A single pristine object (PristineItem, PristineLocation, PristineShop, etc.), as seen by one World
+# Each field is read through the overlay once, and then kept in the view's own __dict__, so that reading it again is as
+#   cheap as reading a plain object. Anything that changes the overlay drops the fields it affects from there.
+class PristineView:
+  __slots__ = ('_base', '_overlay', '__dict__')
+
+  def __init__(self, base, overlay):
+    object.__setattr__(self, '_base', base)
+    object.__setattr__(self, '_overlay', overlay)
+
+  def __getattr__(self, name):
+    overlay = self._overlay
+    fields = overlay.changes.get(self._base)
+    if name in overlay.masks:
+      res = overlay.masks[name]
+    elif fields is not None and name in fields:
+      res = fields[name]
+    else:
+      res = overlay.view(getattr(self._base, name))
+    self.__dict__[name] = res
+    return res
+
+  def __setattr__(self, name, value):
+    self._overlay.changes.setdefault(self._base, {})[name] = value
+    self.__dict__.pop(name, None)
+
+  def __delattr__(self, name):
+    raise AttributeError(f"Cannot delete pristine field: {name}")
+
+  def __eq__(self, other):
+    if isinstance(other, PristineView):
+      return self._base is other._base and self._overlay is other._overlay
+    return NotImplemented
+
+  def __hash__(self):
+    return hash((id(self._base), id(self._overlay)))
+
+  def __repr__(self):
+    return f"PristineView({self._base!r})"
+
+
+
+# A dictionary of pristine objects (e.g., { productName -> PristineProduct }), as seen by one World.
+# Lookups return views; entries added by this World are stored locally (the shared dict is never changed).
+class PristineDictView(MutableMapping):
+  __slots__ = ('_base', '_overlay', '_writable', '_added', '_removed', '_viewed')
+
+  def __init__(self, base, overlay, writable):
+    self._base = base
+    self._overlay = overlay
+    self._writable = writable
+    self._added = {}      # { key -> value } ; values are stored as-is (they're usually views already)
+    self._removed = set()
+    self._viewed = {}     # { key -> view } ; shared entries we've already looked up (see PristineView)
+
+  def _check_writable(self):
+    if not self._writable:
+      raise TypeError("This pristine dictionary is read-only; replace the field that holds it instead")
+
+  def __getitem__(self, key):
+    res = self._viewed.get(key)
+    if res is not None:
+      return res
+    if key in self._added:
+      return self._added[key]
+    if key in self._removed:
+      raise KeyError(key)
+    res = self._viewed[key] = self._overlay.view(self._base[key])
+    return res
+
+  def __setitem__(self, key, value):
+    self._check_writable()
+    self._viewed.pop(key, None)
+    self._removed.discard(key)
+    self._added[key] = value
+
+  def __delitem__(self, key):
+    self._check_writable()
+    if key not in self:
+      raise KeyError(key)
+    self._viewed.pop(key, None)
+    self._added.pop(key, None)
+    if key in self._base:
+      self._removed.add(key)
+
+  def __contains__(self, key):
+    return key in self._added or (key in self._base and key not in self._removed)
+
+  # Shared keys come first (in their original order), then any keys this World added; this matches a copied dict.
+  def __iter__(self):
+    for key in self._base:
+      if key not in self._removed:
+        yield key
+    for key in self._added:
+      if key not in self._base:
+        yield key
+
+  def __len__(self):
+    return len(self._base) - len(self._removed) + sum(1 for key in self._added if key not in self._base)
+
+  # The entries this World added/removed, in a form that can be pickled (see PristineOverlay.export_changes())
+  # Added views are replaced by the key of the pristine object they wrap.
+  def export_entries(self, keys):
+    added = [ (key, ('view', keys[value._base]) if isinstance(value, PristineView) else ('value', value)) for key, value in self._added.items() ]
+    return { 'added': added, 'removed': sorted(self._removed) }
+
+  # Replay the result of export_entries() into this (fresh) view
+  def import_entries(self, exported, objects):
+    for key, (kind, value) in exported['added']:
+      self._viewed.pop(key, None)
+      self._added[key] = self._overlay.view(objects[value]) if kind == 'view' else value
+    for key in exported['removed']:
+      self._viewed.pop(key, None)
+    self._removed.update(exported['removed'])
+
+  def __repr__(self):
+    return f"PristineDictView({len(self)} entries, {len(self._added)} added)"
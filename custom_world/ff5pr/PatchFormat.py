@@ -0,0 +1,177 @@
+#
+# Parsing (and checking) the script patches in Patches.py.
+# Each patch set is text in the format described at the top of Patches.py. The game reads this text with
+#   EventPatcher.readInData() (in MyFF5Plugin), so a bad header or broken json used to show up only in-game; now each
+#   patch set is parsed the first time it's used (see get_patch_set()), and any problem raises an Exception right away.
+# The parsed patches are cached per process, and are what we write the output from (PatchSet.encode()) and what
+#   validate_patches() checks.
+#
+# The rules follow EventPatcher.readInData():
+#   * Empty lines and lines starting with '#' are skipped (between patches).
+#   * A line starting with "Assets" starts a patch: asset_path,json_xpath[:inline_xpath],mnemonic[:label],command[,args]
+#   * Every line after that, up to the next empty line, is the patch's json.
+# We're stricter than the game in a few places (e.g., an Overwrite must have a list of well-formed Mnemonics); anything we
+#   reject here would either be ignored or fail in-game.
+#
+
+
+import json
+import functools
+
+from .Mnemonics import Mnemonic, encode_mnemonics, compact_encoder
+
+
+# Commands that overwrite Mnemonics, starting at an offset from the one found at the json_xpath
+OverwriteCommands = ['Overwrite', 'InlinePatch']
+
+
+# One patch: a header line, and the json that goes with it (if any)
+class ScriptPatch:
+  def __init__(self, header, payload=None, line=None):
+    self.header = header    # The header line, as written
+    self.payload = payload  # [ Mnemonic, ... ] for OverwriteCommands, { index -> value } for SpotIArray; None if there's no json
+    self.line = line        # Line number of the header in its patch set (if it came from one), for error messages
+
+    parts = header.split(',')
+    if len(parts) < 4:
+      raise ValueError("expected at least: asset_path,json_xpath,mnemonic_check,command")
+    if not parts[0].startswith('Assets'):
+      raise ValueError(f"asset path doesn't start with 'Assets' (stray line?): {parts[0]}")
+    self.asset_path = parts[0]
+    self.xpath, _, self.inline_xpath = parts[1].partition(':')
+    self.expected_mnemonic, _, self.expected_label = parts[2].partition(':')
+    self.command = parts[3]
+    self.args = parts[4:]
+
+    if not self.xpath.startswith('/'):
+      raise ValueError(f"json_xpath doesn't start with '/': {self.xpath}")
+    if self.inline_xpath != '' and self.command != 'InlinePatch':
+      raise ValueError(f"only InlinePatch can have an inline_xpath, not: {self.command}")
+
+    # Check the command's arguments
+    if self.command in OverwriteCommands:
+      if len(self.args) < 1 or not self.args[0].isdigit():
+        raise ValueError(f"{self.command} needs a (non-negative) offset, not: {self.args}")
+      if self.command == 'InlinePatch' and self.inline_xpath == '':
+        raise ValueError("InlinePatch needs an inline_xpath")
+      self.args = [ int(self.args[0]) ]
+    elif self.command == 'SpotIArray':
+      self.args = []
+    elif self.command.startswith('SetSVal'):
+      index = self.command[len('SetSVal'):]
+      if not (index.startswith('[') and index.endswith(']') and index[1:-1].isdigit()):
+        raise ValueError(f"invalid SetSVal command+index: {self.command}")
+      if len(self.args) < 1:
+        raise ValueError(f"{self.command} needs a value")
+      self.command = 'SetSVal'
+      self.args = [ int(index[1:-1]), self.args[0] ]
+    else:
+      raise ValueError(f"unknown command: {self.command}")
+
+    # Check the json
+    if self.command in OverwriteCommands:
+      if not isinstance(payload, list) or len(payload) == 0 or not all(isinstance(mnemonic, Mnemonic) for mnemonic in payload):
+        raise ValueError(f"{self.command} needs a list of Mnemonics")
+    elif self.command == 'SpotIArray':
+      if not isinstance(payload, dict) or not all(key.isdigit() and type(value) is int for key, value in payload.items()):
+        raise ValueError("SpotIArray needs an object of { \"index\": integer } (with non-negative indices)")
+
+  # Make a patch from its header and the text of its json (as read from a patch set)
+  @classmethod
+  def parse(cls, header, jsonText, line=None):
+    payload = None
+    if jsonText != '':
+      try:
+        payload = json.loads(jsonText)
+      except json.JSONDecodeError as ex:
+        raise ValueError(f"invalid json: {ex}")
+      if isinstance(payload, list) and all(isinstance(obj, dict) and 'mnemonic' in obj for obj in payload):
+        payload = [ Mnemonic.from_json(obj) for obj in payload ]
+    return cls(header, payload, line)
+
+  # The text of this patch, in one of Output.OutputFormats; the json (if any) is on one line.
+  def encode(self, outputFormat):
+    if self.payload is None:
+      return f"{self.header}\n\n"
+    if isinstance(self.payload, list):
+      return f"{self.header}\n{encode_mnemonics(self.payload, outputFormat)}\n\n"
+    return f"{self.header}\n{compact_encoder.encode(self.payload)}\n\n"
+
+  def __eq__(self, other):
+    if not isinstance(other, ScriptPatch):
+      return NotImplemented
+    return (self.header, self.payload) == (other.header, other.payload)
+
+  def __repr__(self):
+    return f"ScriptPatch({self.header!r})"
+
+
+# All of the patches in one entry of Patches.all_patch_contents
+class PatchSet:
+  def __init__(self, name, text, patches):
+    self.name = name
+    self.text = text          # As written in Patches.py
+    self.patches = patches    # [ ScriptPatch, ... ]
+
+  # The text of this patch set, in one of Output.OutputFormats.
+  # In 'debug' format, we write it as it appears in Patches.py (comments and all).
+  def encode(self, outputFormat):
+    if outputFormat != 'compact':
+      return self.text
+    return ''.join(patch.encode(outputFormat) for patch in self.patches)
+
+
+# Parse the patch set called 'name', from its 'text'
+# Raises an Exception (naming the patch set and line) if anything is wrong with it.
+def parse_patch_text(name, text):
+  patches = []
+  header = None     # If not None, we're collecting the json for this header
+  headerLine = None
+  jsonLines = []
+
+  def finish_patch():
+    try:
+      patches.append(ScriptPatch.parse(header, ' '.join(jsonLines), headerLine))
+    except ValueError as ex:
+      raise Exception(f"Invalid patch in '{name}' (line {headerLine}): {ex}")
+
+  for lineNum, line in enumerate(text.split('\n'), start=1):
+    line = line.strip()
+    if header is not None:
+      if line != '':
+        jsonLines.append(line)
+      else:
+        finish_patch()
+        header = None
+        jsonLines = []
+      continue
+    if line == '' or line.startswith('#'):
+      continue
+    header = line
+    headerLine = lineNum
+  if header is not None:
+    finish_patch()
+
+  return PatchSet(name, text, patches)
+
+
+# Retrieve the parsed patch set called 'name' (see Patches.all_patch_contents); each one is only parsed once per process.
+@functools.cache
+def get_patch_set(name):
+  from .Patches import all_patch_contents
+  return parse_patch_text(name, all_patch_contents[name])
+
+
+# Check every patch set in Patches.py (not just the ones this seed uses); for the validate_pristine_data option.
+def validate_patches():
+  from .Patches import all_patch_contents
+  error = False
+  for name in all_patch_contents.keys():
+    try:
+      get_patch_set(name)
+    except Exception as ex:
+      print(f"ERROR: {ex}")
+      error = True
+
+  if error:
+    raise Exception(f"Validation failed (see above).")
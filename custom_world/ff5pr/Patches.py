@@ -2,6 +2,7 @@
 # Key is some identifier, like 'Shorter Crystal Cutscenes'
 # Value is the contents of the .csv file to generate. 
 # We store them this way so that it's easier to mix-and-match patches.
+# Each one is parsed (and checked) the first time it's used; see PatchFormat.py.
 
 
 # The format of the .csv file is not strictly CSV (since patches have commas); rather:
@@ -22,14 +22,15 @@
 
 
 #
-# NOTE: Do not import the 'pristine_X' dictionaries. Instead, call 'clone_pristine_obs()' to create copies that
-#       you can store + modify + use locally.
+# NOTE: Do not import the 'pristine_X' dictionaries. Instead, call 'clone_pristine_obs()' to create views that
+#       you can store + modify + use locally. (Modifying these views never changes the shared dictionaries; see Overlay.py)
 #
 
 
-import copy
 import sys
 
+from .Overlay import PristineOverlay
+
 
 # Note that our custom items start at 5000, and our job "items" start at 2000
 
@@ -40,6 +41,9 @@ PristineMultiworldItemStart = 3000000
 # ID of the first "jumbo" Item; IDs will increase by 1 from here
 JumboItemStartID = 5500
 
+# ID of the first Location; every Location ID is in [90000,99999]
+LocationStart = 90000
+
 # NOTE: When I have Locations out-of-order, I'll start them at 91000 (and clean it up later).
 
 # ID of the first "Shop" Location (the client doesn't need to see this)
@@ -55,6 +59,10 @@ CurrMaxContentId = 1690
 MaxProductId = 341
 MaxProductGroupId = 57
 
+# Hash of this file, which Scripts/pack_release.py stamps into the copy it packs into the .apworld (see Lookups.py)
+# It stays None in a checkout, so a left-over FrozenLookups.py is never trusted there.
+PristineHash = None
+
 
 
 
@@ -353,7 +361,7 @@ def validate_pristine():
       else:
         seen_ids.add(data.loc_id)
 
-      if (data.loc_id < 90000) or (data.loc_id > 99999):
+      if (data.loc_id < LocationStart) or (data.loc_id > 99999):
         print(f"ERROR: Location Id is out of range [90000,99999]: {data.loc_id}")
         error = True
 
@@ -421,22 +429,28 @@ def validate_pristine():
 
 
 
-# Call this function and store the results to get copies of all 'pristine' dictionaries, which each FF5 World can operate on independently.
-# I'm not sure if global module variables are shared between instances, but I think they are.
+# Call this function and store the results to get views of all 'pristine' dictionaries, which each FF5 World can operate on independently.
+# Global module variables are shared between all Worlds in the process, so we never copy them; instead, every change a
+#   World makes is recorded in its own PristineOverlay (the last value returned).
 # Call as:
-#   pristine_items, pristine_locations, pristine_regions, pristine_connections, pristine_shops, optional_split_shops, optional_blue_magic_shops, pristine_game_patches = clone_pristine_obs()
+#   pristine_items, pristine_locations, pristine_regions, pristine_connections, pristine_shops, optional_split_shops, optional_blue_magic_shops, pristine_game_patches, pristine_overlay = clone_pristine_obs()
 def clone_pristine_obs():
-  # Most of these are just deep-copied.
-  res_items = copy.deepcopy(pristine_items)
-  res_regions = copy.deepcopy(pristine_regions)
-  res_locations = make_pristine_locations(res_regions)  # NOT a deep-copy; we need the refs intact
-  res_connections = copy.deepcopy(pristine_connections)
-  res_shops = copy.deepcopy(pristine_shops)
-  res_optional_shops = copy.deepcopy(optional_split_shops)
-  res_optional_blue_magic_shops = copy.deepcopy(optional_blue_magic_shops)
-  res_game_patches = copy.deepcopy(pristine_game_patches)
-  
-  return res_items, res_locations, res_regions, res_connections, res_shops, res_optional_shops, res_optional_blue_magic_shops, res_game_patches
+  overlay = PristineOverlay()
+
+  # The dictionaries are wrapped; a view of pristine_locations and a view of pristine_regions share the same overlay,
+  #   so a change to a Location through either one is seen by both.
+  res_items = overlay.view(pristine_items, True)
+  res_regions = overlay.view(pristine_regions, True)
+  res_locations = overlay.view(pristine_locations, True)
+  res_shops = overlay.view(pristine_shops, True)
+  res_optional_shops = overlay.view(optional_split_shops, True)
+  res_optional_blue_magic_shops = overlay.view(optional_blue_magic_shops, True)
+
+  # These are never modified, so we can just share them.
+  res_connections = pristine_connections_tuple
+  res_game_patches = pristine_game_patches_tuple
+
+  return res_items, res_locations, res_regions, res_connections, res_shops, res_optional_shops, res_optional_blue_magic_shops, res_game_patches, overlay
 
 
 
@@ -444,7 +458,8 @@ def clone_pristine_obs():
 # List of patch filenames to apply, indexed by name
 # At the moment, these are all required, but we might imagine a future where the player can turn some of them off
 #   E.g., using the randomizer to *just* randomize every Job Crystal Shard, but without cutting the cutscenes short.
-pristine_game_patches = {
+# NOTE: This must be a list (not a set); patches are written in this order, and a set's order changes from run to run.
+pristine_game_patches = [
   # Start a new game in Open World format
   "New Game Open World",
 
@@ -454,7 +469,8 @@ pristine_game_patches = {
   # Prepare our NPC + boss scripts that give us items; they need their own custom Message names, and they need to 
   #   have a 'marker' Nop put in place so that we can patch these confidently.
   "Prepare NPC and Boss Event Checks",
-}
+]
+pristine_game_patches_tuple = tuple(pristine_game_patches)
 
 
 # Pristine items
@@ -1365,6 +1381,7 @@ pristine_connections = [
   # Transition between Worlds
   ("World Map 1", "World 1 to 2 Teleport", "require_X_jobs")  # Has X Jobs (default 10)
 ]
+pristine_connections_tuple = tuple(pristine_connections)
 
 
 
@@ -0,0 +1,47 @@
+#
+# Access rules (and item rules) for our Locations and Entrances.
+# Rules are referred to by name (e.g., the connections in Pristine.py use "require_adamant"). Each World calls compile_rules()
+#   once its Options are known, which makes one rule for each name; every Location/Entrance that needs that rule shares it.
+# Anything that depends on the player's Options (like the number of Jobs needed) is worked out at compile time, since
+#   Archipelago evaluates these rules a *lot* (during fill, and again for every sphere of the spoiler log).
+# NOTE: The rules are plain closures; calling an object's __call__ is noticeably slower (see Benchmarks/bench_fill_item_rules.py).
+#
+
+
+# Rule: the player has 'count' of the given item
+def has_item(item: str, player: int, count: int = 1):
+  def rule(state) -> bool:
+    return state.has(item, player, count)
+  return rule
+
+
+# Rule: the player has at least 'count' items (in total) from a fixed list of item names
+def has_items_from_list(items, player: int, count: int):
+  items = tuple(items)
+  def rule(state) -> bool:
+    return state.has_from_list(items, player, count)
+  return rule
+
+
+# Item rule: the item is not one of *our* items with one of these codes
+# (Item codes are only unique within a game, so we check that too; but only for the few items that match.)
+def forbid_item_codes(codes: frozenset[int], game: str):
+  def rule(item) -> bool:
+    return item.code not in codes or item.game != game
+  return rule
+
+
+# Make all of the named rules for this World
+# Returns: { ruleName -> rule }
+def compile_rules(world):
+  player = world.player
+  num_jobs_needed = int(world.options.jobs_for_world1_completion)  # Defaults to 10
+  return {
+    'require_world_1_teleport': has_item('W1Teleport', player),
+    'require_X_jobs': has_items_from_list(sorted(world.item_name_groups['Job']), player, num_jobs_needed),
+    'require_adamant': has_item('Adamantite', player),
+    'require_fire_be_gone': has_item('FireBeGone', player),
+
+    # Item rules
+    'dont_sell_gil': forbid_item_codes(world.item_table.gil_codes, world.game),
+  }
@@ -0,0 +1,249 @@
+#
+# Writing our output (.apff5pr) files in a pool of worker processes.
+# generate_output() is mostly string building and compression, all in pure Python; even when Archipelago calls it for several
+#   Worlds at once (in threads), they take turns holding the GIL. With output workers turned on, each World instead takes a small,
+#   picklable snapshot of everything generate_output() reads (item placements, Options, boss swaps, shop checks, unused_locations,
+#   changed_products, and the changes in its pristine overlay), and a worker process runs the same code (write_output()) on it.
+# This is off by default, and (like metrics) is a *host* setting:
+#   * host.yaml:  ff5pr_options: output_workers: 4
+#   * the FF5PR_OUTPUT_WORKERS environment variable, which overrides host.yaml
+# 0 (the default) writes every file in the generating process, as before.
+#
+# The files are the same either way; Benchmarks/bench_parallel_output.py checks this (and times both).
+# NOTE: Worker processes use the platform's default start method. If that isn't 'fork', each worker imports the world
+#       (and the pristine data) once when it starts, so this only pays off for larger multiworlds.
+#
+
+
+import os
+import types
+import threading
+import functools
+import dataclasses
+import concurrent.futures
+
+from . import Pristine
+from .Pristine import clone_pristine_obs
+from .Items import get_item_table
+from .Instrumentation import StageMetrics
+from .HostSettings import read_host_setting
+
+
+OutputWorkersEnvVar = 'FF5PR_OUTPUT_WORKERS'
+
+
+# Turn the output_workers setting into a number of workers
+def parse_output_workers(text):
+  text = text.lower()
+  # Be forgiving about on/off values
+  if text in ['', 'false', 'no', 'none', 'off']:
+    return 0
+  if text == 'auto':
+    return os.cpu_count() or 1
+  if not text.isdigit():
+    raise ValueError("expected a number, or 'auto'")
+  return int(text)
+
+# How many worker processes should write our output files? (0 means "don't use workers"; see HostSettings.py)
+def get_output_workers(host_settings):
+  return read_host_setting(host_settings, 'output_workers', OutputWorkersEnvVar, parse_output_workers, '0')
+
+
+
+# Every pristine object, by a key that's the same in every process:
+#   e.g., ('pristine_items', 'Elixir') or ('pristine_shops', 'Tule Item Shop', 'products', 'Tule Item Shop Item A')
+# Objects that appear more than once (a Location is in both pristine_locations and its Region) use the first key we find.
+PristineDictNames = [ 'pristine_items', 'pristine_locations', 'pristine_regions', 'pristine_shops', 'optional_split_shops', 'optional_blue_magic_shops' ]
+
+# The World's views of these can have entries added/removed (the optional shops are folded into pristine_shops by generate_early())
+WorldDictNames = [ 'pristine_items', 'pristine_locations', 'pristine_regions', 'pristine_shops' ]
+
+@functools.cache
+def get_pristine_keys():
+  keys = {}     # { pristineObject -> key }
+  objects = {}  # { key -> pristineObject }
+  def add(key, obj):
+    if obj not in keys:
+      keys[obj] = key
+      objects[key] = obj
+
+  for dictName in PristineDictNames:
+    for name, obj in getattr(Pristine, dictName).items():
+      add((dictName, name), obj)
+      # Nested dicts of pristine objects (a Region's Locations, a Shop's Products)
+      for fieldName, value in vars(obj).items():
+        if isinstance(value, dict):
+          for subName, subObj in value.items():
+            if hasattr(subObj, '__dict__'):
+              add((dictName, name, fieldName, subName), subObj)
+  return keys, objects
+
+
+
+# What generate_output() needs to know about an Item
+class ItemRecord:
+  __slots__ = ('name', 'code', 'player', 'classification', 'text')
+
+  def __init__(self, item):
+    self.name = item.name
+    self.code = item.code
+    self.player = item.player
+    self.classification = item.classification
+    self.text = str(item)   # Includes "(PlayerName)", which needs the multiworld
+
+  def __getstate__(self):
+    return (self.name, self.code, self.player, self.classification, self.text)
+
+  def __setstate__(self, state):
+    self.name, self.code, self.player, self.classification, self.text = state
+
+  def __str__(self):
+    return self.text
+
+
+# ...and about a Location
+class LocationRecord:
+  __slots__ = ('name', 'address', 'player', 'item')
+
+  def __init__(self, loc):
+    self.name = loc.name
+    self.address = loc.address
+    self.player = loc.player
+    self.item = ItemRecord(loc.item) if loc.item is not None else None
+
+  def __getstate__(self):
+    return (self.name, self.address, self.player, self.item)
+
+  def __setstate__(self, state):
+    self.name, self.address, self.player, self.item = state
+
+
+# What generate_output() needs to know about the MultiWorld
+class MultiWorldRecord:
+  def __init__(self, multiworld, player):
+    self.seed_name = multiworld.seed_name
+    self.player_name = dict(multiworld.player_name)
+    self.out_file_name_base = multiworld.get_out_file_name_base(player)
+
+  def get_player_name(self, player):
+    return self.player_name[player]
+
+  def get_out_file_name_base(self, player):
+    return self.out_file_name_base
+
+
+
+# A picklable copy of everything a World's write_output() reads.
+# Once restore()'d (in the worker), it stands in for the World: write_output() and its helpers are taken from the World's class.
+class OutputSnapshot:
+  def __init__(self, world):
+    keys, _ = get_pristine_keys()
+
+    self.world_type = type(world)
+    self.player = world.player
+    self.multiworld = MultiWorldRecord(world.multiworld, world.player)
+    self.metrics_mode = world.metrics.mode
+    self.compression = world.compression
+    self.output_format = world.output_format
+    self.patch_conflicts = world.patch_conflicts
+
+    # Options are saved as their values, which behave the same way for our purposes (int(), truthiness)
+    self.option_values = { field.name: getattr(world.options, field.name).value for field in dataclasses.fields(world.options) }
+
+    # Placements
+    self.locations = [ LocationRecord(loc) for loc in world.get_locations() ]
+    self.pool_items = [ ItemRecord(item) for item in world.pool_items ]
+
+    # Randomization results from generate_early()
+    self.firstJob = world.firstJob
+    self.boss_swap = dict(world.boss_swap)
+    self.shop_check_names = list(world.shop_checks.keys())
+    self.unused_locations = dict(world.unused_locations)
+    self.changed_products = set(world.changed_products)
+
+    # Our view of the pristine data
+    self.pristine_game_patches = tuple(world.pristine_game_patches)
+    self.overlay_changes = world.pristine_overlay.export_changes(keys)
+    self.dict_entries = { name: getattr(world, name).export_entries(keys) for name in WorldDictNames }
+
+
+  # Rebuild everything that can't be pickled (or shouldn't be), in the process that will write the output
+  def restore(self):
+    _, objects = get_pristine_keys()
+
+    self.options = types.SimpleNamespace(**self.option_values)
+    self.item_table = get_item_table(self.world_type)
+    self.metrics = StageMetrics(self.metrics_mode)
+
+    self.pristine_items, self.pristine_locations, self.pristine_regions, _, self.pristine_shops, _, _, _, self.pristine_overlay = clone_pristine_obs()
+    self.pristine_overlay.import_changes(self.overlay_changes, objects)
+    for name, entries in self.dict_entries.items():
+      getattr(self, name).import_entries(entries, objects)
+
+    self.shop_checks = { prodName: self.pristine_shops[self.product_to_shop_lookup[prodName]].products[prodName] for prodName in self.shop_check_names }
+    self.location_lookup = { loc.name: loc for loc in self.locations }
+    return self
+
+  def get_locations(self):
+    return self.locations
+
+  def getLocation(self, locationName):
+    return self.location_lookup.get(locationName)
+
+  # Anything else (write_output() and its helpers, class-wide lookups) comes from the World's class
+  def __getattr__(self, name):
+    if name.startswith('__') or name == 'world_type':
+      raise AttributeError(name)
+    value = getattr(self.world_type, name)
+    if isinstance(value, types.FunctionType):
+      return types.MethodType(value, self)
+    return value
+
+
+
+# Runs in the worker: write the output file for one snapshot
+# Returns: (file_path, metrics) ; the metrics (if on) are for the worker's part, and the World saves them with its own.
+def write_snapshot_output(snapshot, output_directory):
+  snapshot.restore()
+  metrics = snapshot.metrics
+  metrics.start_step('worker')
+  try:
+    file_path = snapshot.write_output(output_directory)
+    metrics.pending_output = None   # The World saves our results, along with the rest of its stages
+  finally:
+    metrics.end_step('worker')
+  return file_path, metrics.stages.get('worker')
+
+
+
+# One pool of worker processes, shared by every FF5 World in this process (and re-used by later generations)
+# If a World asks for more workers than the pool has, we make a bigger one; but we never shut the old one down, since
+#   its jobs may still be running. Once nothing refers to it, it finishes them and its processes exit on their own.
+output_pool = None
+output_pool_size = 0
+output_lock = threading.Lock()
+
+def get_output_pool(workers):
+  global output_pool, output_pool_size
+  if output_pool is None or output_pool_size < workers:
+    output_pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    output_pool_size = workers
+  return output_pool
+
+
+# Snapshot this World and hand it to the pool, unless that's already been done.
+# Archipelago may call this from several threads (stage_generate_output() and generate_output()), so it's locked.
+def start_output(world, output_directory):
+  with output_lock:
+    if world.output_future is None:
+      world.output_future = get_output_pool(world.output_workers).submit(write_snapshot_output, OutputSnapshot(world), output_directory)
+    return world.output_future
+
+
+# Wait for this World's output file to be written (starting it if needed), and collect the worker's metrics
+# Returns: the path of the .apff5pr file
+def finish_output(world, output_directory):
+  file_path, workerMetrics = start_output(world, output_directory).result()
+  if workerMetrics is not None:
+    world.metrics.add_step('worker', workerMetrics)
+  return file_path
@@ -2,10 +2,9 @@ import Utils
 import os
 import copy
 import settings
-import base64
 import json
-import threading
-import requests
+import typing
+import functools
 import zipfile
 from worlds.AutoWorld import World, WebWorld
 from worlds.generic.Rules import add_rule, add_item_rule
@@ -13,9 +12,16 @@ from worlds.Files import APPatch
 from BaseClasses import Tutorial, MultiWorld, ItemClassification, LocationProgressType, Item, Location, Region, CollectionState
 
 from .Options import FF5PROptions
-from .Pristine import pristine_items, clone_pristine_obs, validate_pristine, custom_messages, create_ap_item_lookup, create_ap_location_lookup, normalize_item_name, parse_jumbo_items, teleport_failsafe, PristineMultiworldItemStart, JumboItemStartID, CurrMaxContentId, MaxProductId, MaxProductGroupId
-from .Patches import all_patch_contents
-from .Monsters import monsters, boss_encounters
+from .Pristine import pristine_items, clone_pristine_obs, validate_pristine, custom_messages, teleport_failsafe, LocationStart, PristineMultiworldItemStart, JumboItemStartID, CurrMaxContentId, MaxProductId, MaxProductGroupId
+from .Lookups import load_lookups
+from .Items import get_item_table
+from .Rules import compile_rules
+from .Mnemonics import Nop, GetItem, SysCall, encode_mnemonics, encode_get_item
+from .PatchFormat import get_patch_set, validate_patches
+
+# NOTE: Archipelago imports every world on startup, so our big data modules (Patches, Monsters) are only imported
+#       inside the functions that use them. Please don't import them at the top of this file.
+#       The same goes for the modules that only generate_output() needs (Output, Snapshot, Conflicts).
 
 
 
@@ -34,33 +40,6 @@ class FF5PRLocation(Location):
 
 
 
-# Helper: Classification string to ItemClassification type
-#         TODO: Put into its own file
-def ParseItemClassification(classStr):
-  classStr = classStr.lower()
-  if classStr == 'filler':
-    return ItemClassification.filler
-  elif classStr == 'progression':
-    return ItemClassification.progression
-  elif classStr == 'useful':
-    return ItemClassification.useful
-  elif classStr == 'trap':
-    return ItemClassification.trap
-  elif classStr == 'skipbalancing':
-    return ItemClassification.skip_balancing
-  elif classStr == 'deprioritized':
-    return ItemClassification.deprioritized
-  elif classStr == 'progression_deprioritized_skip_balancing':
-    return ItemClassification.progression_deprioritized_skip_balancing
-  elif classStr == 'progression_skip_balancing':
-    return ItemClassification.progression_skip_balancing
-  elif classStr == 'progression_deprioritized':
-    return ItemClassification.progression_deprioritized
-  else:
-    print("WARNING: Unknown Item classification type: {classStr}")
-    return ItemClassification.filler
-
-
 # Helper: Classification string to LocationClassification type
 def ParseLocationClassification(classStr):
   classStr = classStr.lower()
@@ -104,13 +83,14 @@ def create_region(world: World, name: str, locations, completion_items, prog_ite
 
             # Lock via fire?
             if "BlockedByFire" in data.tags:
-                ruleFn = lambda state: world.require_fire_be_gone(state)
-                add_rule(location, ruleFn)
+                add_rule(location, world.rules['require_fire_be_gone'])
 
         res.locations.append(location)
+        world.location_lookup[name] = location
 
-    # Append it to the multiworld's list of regions
+    # Append it to the multiworld's list of regions (and to our own lookup)
     world.multiworld.regions.append(res)
+    world.region_lookup[res.name] = res
 
     return res
 
@@ -130,30 +110,115 @@ def create_shop(world: World, shopName: str, prodName: str, locId: int):
     # TODO: Call add_rule() if you need it. Right now I don't think anything blocks shops (beyond normal Region access)?
 
     # Don't allow Gil to be sold in shops
-    ruleFn = lambda item: world.dont_sell_gil(item)
-    add_item_rule(location, ruleFn)
+    add_item_rule(location, world.rules['dont_sell_gil'])
 
     # Lock via fire?
     if "BlockedByFire" in orig_shop.tags:
-        ruleFn = lambda state: world.require_fire_be_gone(state)
-        add_rule(location, ruleFn)
+        add_rule(location, world.rules['require_fire_be_gone'])
 
     # Include it!
     region.locations.append(location)
+    world.location_lookup[prodName] = location
+
+
+
+
+# Helper: Return the contents of all of the named game patches (see Patches.py), in order, in the given output format
+# (Each one is parsed and checked the first time it's used; see PatchFormat.py)
+def gen_script_patches(patchNames, outputFormat):
+    return [ get_patch_set(name).encode(outputFormat) for name in patchNames ]
+
+
+# Give the Blue Magic icon to all Blue Magic
+BlueMagicIconMessages = { f"MSG_MAGIC_NAME_{msg_id}": "<IC_ABOK> %ORIG%" for msg_id in range(205, 234+1) }   # Special string that means "put this in front of the existing string"
+
+
+# Per-stage metrics (see Instrumentation.py) are off unless the host turns them on; until then, a World's metrics are one of
+#   these, so that we don't import Instrumentation.py (and tracemalloc) at all.
+class NoStageMetrics:
+    mode = 'off'
+    enabled = False
+
+    def start_step(self, name):
+        pass
+
+    def end_step(self, name):
+        pass
+
+    def add_step(self, name, record):
+        pass
+
+    def save_after_stage(self, file_path):
+        pass
+
+
+# A StageMetrics for the host's settings (or a NoStageMetrics, if metrics are off)
+def get_stage_metrics(host_settings):
+    if os.environ.get('FF5PR_METRICS') is None and getattr(host_settings, 'metrics', None) in [None, 'off']:
+        return NoStageMetrics()
+    from .Instrumentation import StageMetrics, get_metrics_mode
+    return StageMetrics(get_metrics_mode(host_settings))
+
+
+# Decorator for World functions: record metrics for this function under 'name' (see Instrumentation.py)
+# Expects the World to have a StageMetrics (or a NoStageMetrics) in self.metrics
+def timed_step(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            metrics = self.metrics
+            if not metrics.enabled:
+                return func(self, *args, **kwargs)
+            metrics.start_step(name)
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                metrics.end_step(name)
+        return wrapper
+    return decorator
+
+
+# Settings for the person *hosting* the generation (these go in host.yaml, not in player YAMLs)
+class FF5PRSettings(settings.Group):
+    class Metrics(str):
+        """
+        Record timing and memory use for each generation stage, for debugging slow generations (see Instrumentation.py).
+        "off" to disable, "file" to write a .metrics.json next to each .apff5pr, or "embed" to also put it inside the .apff5pr.
+        Can be overridden with the FF5PR_METRICS environment variable.
+        """
 
+    class OutputWorkers(str):
+        """
+        Number of worker processes to write the .apff5pr files with (see Snapshot.py), or "auto" for one per CPU.
+        0 writes them in the generating process. Can be overridden with the FF5PR_OUTPUT_WORKERS environment variable.
+        """
 
+    class Compression(str):
+        """
+        How to compress each file inside the .apff5pr (see CompressionPlan in Output.py). E.g., "deflate:3" (the default),
+        "stored", "auto" (pick by size), "script_patch.csv=deflate:9", "threads=4" (compress in parallel), or a comma-separated mix.
+        The game client can only read "stored" and "deflate". Can be overridden with the FF5PR_COMPRESSION environment variable.
+        """
 
+    class OutputFormat(str):
+        """
+        Format of the JSON in the .apff5pr: "compact" (the default) or "debug" (laid out for reading; see Output.py).
+        Can be overridden with the FF5PR_OUTPUT_FORMAT environment variable.
+        """
+
+    class PatchConflicts(str):
+        """
+        What to do when two of our patches write to the same Mnemonics or property (see Conflicts.py): "warn" (the default)
+        prints each one, "strict" also fails the generation, and "off" doesn't check.
+        Can be overridden with the FF5PR_PATCH_CONFLICTS environment variable.
+        """
+
+    metrics: Metrics = Metrics("off")
+    output_workers: OutputWorkers = OutputWorkers("0")
+    compression: Compression = Compression("deflate:3")
+    output_format: OutputFormat = OutputFormat("compact")
+    patch_conflicts: PatchConflicts = PatchConflicts("warn")
 
-# Helper: Return a json object for the "SysCall" Mnemonic
-# TODO: Very much goes into output tools
-def GetJsonSysCallObj(jobSysCallName):
-    return '{"label": "","mnemonic": "SysCall","operands": {"iValues": [0,0,0,0,0,0,0,0],"rValues": [0,0,0,0,0,0,0,0],"sValues": ["' + jobSysCallName + '","","","","","","",""]},"type": 1,"comment": ""}'
-# Similar, but for GetItem
-def GetJsonItemObj(content_id, content_num):
-    return '{"label": "","mnemonic": "GetItem","operands": {"iValues": [' + f"{content_id},{content_num}" + ',0,0,0,0,0,0],"rValues": [0,0,0,0,0,0,0,0],"sValues": ["","","","","","","",""]},"type": 1,"comment": ""}'
-# Same for "no-op"
-def GetNoOpObj():
-    return '{"label": "","mnemonic": "Nop","operands": {"iValues": [0,0,0,0,0,0,0,0],"rValues": [0,0,0,0,0,0,0,0],"sValues": ["","","","","","","",""]},"type": 2,"comment": ""}'
 
 
 class FF5PRWebWorld(WebWorld):
@@ -181,7 +246,7 @@ class FF5PRWorld(World):
 
     options_dataclass = FF5PROptions
     options: FF5PROptions   # This just exists to give us type hints
-    #settings: typing.ClassVar[FF5PRSettings]  # I don't think we need this yet?
+    settings: typing.ClassVar[FF5PRSettings]
 
     # Does this world have any meaningful layout or pathing?
     # If so, set this to True, and the paths to various checks will be shown in the spoiler log
@@ -193,18 +258,16 @@ class FF5PRWorld(World):
     #   FF5PRWorld.var_name or self.var_name (within a function). This means that I need to remember
     #   NOT to put anything here if each World *instance* needs its own copy of it.
 
-    # Mapping from a product_name to the shop_name that carries it
-    # This is consistent across all possible Shops (even if you shuffle the item it 'originally' carries)
-    product_to_shop_lookup = {}
-
-    # Make a mapping from item 'name' to item 'id', so that we can look up 'Elixir' and get 14
-    # Also set our item groups while we're at it
-    # See note in create_ap_item_lookup() re: consistency
-    item_name_to_id,item_name_groups = create_ap_item_lookup()
-
-    # Make a mapping from location 'name' to location 'id', so that we can look up 'Ronka Ruins Crystal Shard A' and get 90136
-    # See note in create_ap_location_lookup() re: consistency
-    location_name_to_id,location_name_groups = create_ap_location_lookup(product_to_shop_lookup)
+    # All of these are built by load_lookups(), which uses the pre-built tables in FrozenLookups.py if they're
+    #   still valid (see Lookups.py), and otherwise computes them:
+    # product_to_shop_lookup: Mapping from a product_name to the shop_name that carries it
+    #   This is consistent across all possible Shops (even if you shuffle the item it 'originally' carries)
+    # item_name_to_id: Mapping from item 'name' to item 'id', so that we can look up 'Elixir' and get 14
+    #   Also set our item groups while we're at it
+    #   See note in create_ap_item_lookup() re: consistency
+    # location_name_to_id: Mapping from location 'name' to location 'id', so that we can look up 'Ronka Ruins Crystal Shard A' and get 90136
+    #   See note in create_ap_location_lookup() re: consistency
+    product_to_shop_lookup,item_name_to_id,item_name_groups,location_name_to_id,location_name_groups = load_lookups()
 
     options_dataclass = FF5PROptions
 
@@ -217,8 +280,9 @@ class FF5PRWorld(World):
         super().__init__(world, player)
 
         # Snapshot of all our Pristine objects
+        # These are copy-on-write views of the shared data; any changes we make are recorded in pristine_overlay
         # Note: 'optional_split_shops' will be folded into 'pristine_shops' once player Options are set
-        self.pristine_items, self.pristine_locations, self.pristine_regions, self.pristine_connections, self.pristine_shops, self.optional_split_shops, self.optional_blue_magic_shops, self.pristine_game_patches = clone_pristine_obs()
+        self.pristine_items, self.pristine_locations, self.pristine_regions, self.pristine_connections, self.pristine_shops, self.optional_split_shops, self.optional_blue_magic_shops, self.pristine_game_patches, self.pristine_overlay = clone_pristine_obs()
 
         # List of shop items that will actually function as Locations
         #   { (productName) => Product, ... }
@@ -240,6 +304,41 @@ class FF5PRWorld(World):
         # If empty, we are not doing boss shuffling (or anything that requires bosses to be "special")
         self.boss_swap = {}
 
+        # Lookups for this world's Regions and Locations, filled in as create_region()/create_shop() makes them.
+        # The multiworld's list of regions contains *every* player's regions, so don't scan it when we need one of ours.
+        #   { regionName -> Region }, { locationName -> Location }
+        self.region_lookup = {}
+        self.location_lookup = {}
+
+        # The Items that create_items() added to the multiworld's item pool (in order), plus any other Items of ours that
+        #   end up in the final pool (see add_final_pool_items()).
+        # Like the regions list, the item pool contains *every* player's items; use this instead of scanning it.
+        self.pool_items = []
+
+        # Compiled information about every Item we can create (shared by all FF5 Worlds; see Items.py)
+        self.item_table = get_item_table(type(self))
+
+        # Our access rules, by name (see Rules.py); these are made in create_regions(), once our Options are known
+        self.rules = {}
+
+        # Per-stage timing/memory metrics; these do nothing unless the host turned them on (see Instrumentation.py)
+        self.metrics = get_stage_metrics(self.settings)
+
+        # If the host turned on output workers, our .apff5pr is written by a worker process (see Snapshot.py)
+        # output_future is that worker's job, once we've handed it over.
+        # (output_workers is read from the host's settings just before we write our output; see read_output_settings())
+        self.output_workers = None
+        self.output_future = None
+
+        # How to compress the members of our .apff5pr, and how to lay out its JSON (see Output.py)
+        # These are read from the host's settings just before we write our output (see read_output_settings())
+        self.compression = None
+        self.output_format = None
+
+        # What to do if our patches overlap (see Conflicts.py)
+        # This is also read from the host's settings just before we write our output (see read_output_settings())
+        self.patch_conflicts = None
+
 
     # Helper: check the range on the parameters to a triangular distribution
     # Assumes all 3 values are within the valid range (typically 0 to 100), but
@@ -266,26 +365,12 @@ class FF5PRWorld(World):
         return self.random.sample(src_list, num_items)
 
 
-    # Some access rules
-    # TODO: Move to the .Rules file... but how to get playerID in that case?
-    def require_world_1_teleport(self, state: CollectionState) -> bool:
-        return state.has("W1Teleport", self.player)
-    def require_X_jobs(self, state: CollectionState) -> bool:
-        num_jobs_needed = int(self.options.jobs_for_world1_completion)  # Defaults to 10
-        return state.has_group("Job", self.player, num_jobs_needed)
-    def require_adamant(self, state: CollectionState) -> bool:
-        return state.has("Adamantite", self.player)
-    def require_fire_be_gone(self, state: CollectionState) -> bool:
-        return state.has("FireBeGone", self.player)
-
-    # Some item rules
-    def dont_sell_gil(self, item: Item) -> bool:
-        return not item.name.endswith(' Gil')
-
+    # (Access rules and item rules are in Rules.py; see compile_rules())
 
 
     # Called before any other randomization step.
     # We'll use this to decide which Shop items count as Locations
+    @timed_step('generate_early')
     def generate_early(self):
         # Randomize our first job?
         self.firstJob = 'Job: Freelancer'
@@ -374,6 +459,8 @@ class FF5PRWorld(World):
 
         # Shuffle bosses
         if self.options.shuffle_bosses:
+            from .Monsters import boss_encounters
+
             # Create a list of boss battles to pull from
             orig_encounters = list(sorted(boss_encounters.keys()))
             new_encounters = copy.deepcopy(orig_encounters)
@@ -388,17 +475,24 @@ class FF5PRWorld(World):
 
     # Helper: Retrieve a region object
     def getRegion(self, regionName):
-        for region in self.multiworld.regions:
-            if region.player == self.player and region.name == regionName:
-                return region
-        return None
+        return self.region_lookup.get(regionName)
+
+    # Helper: Retrieve a location object (including shop Locations)
+    def getLocation(self, locationName):
+        return self.location_lookup.get(locationName)
 
     # Place this world's Regions and their Locations in the multiworld regions list
     # TODO: Dispatch to .Region.create_regions()
+    @timed_step('create_regions')
     def create_regions(self):
         # TODO: Put this as early as possible
         if self.options.validate_pristine_data:
             validate_pristine()
+            validate_patches()
+
+        # Make our access rules; create_region() and create_shop() share these
+        #   { ruleName -> rule }
+        self.rules = compile_rules(self)
 
         # Create all regions, and their child locations
         completion_items = []
@@ -428,16 +522,10 @@ class FF5PRWorld(World):
         for regA, regB, connectRule in self.pristine_connections:
             # Deal with our rule
             ruleFn = None
-            if connectRule == "require_world_1_teleport":
-                ruleFn = lambda state: self.require_world_1_teleport(state)
-            elif connectRule == "require_X_jobs":
-                ruleFn = lambda state: self.require_X_jobs(state)
-            elif connectRule == "require_adamant":
-                ruleFn = lambda state: self.require_adamant(state)
-            elif connectRule == "require_fire_be_gone":
-                ruleFn = lambda state: self.require_fire_be_gone(state)
-            elif connectRule is not None:
-                raise Exception(f"BAD RULE: {connectRule}")
+            if connectRule is not None:
+                ruleFn = self.rules.get(connectRule)
+                if ruleFn is None:
+                    raise Exception(f"BAD RULE: {connectRule}")
 
             self.getRegion(regA).connect(self.getRegion(regB), None, ruleFn)  # Third param is "name"
 
@@ -445,6 +533,7 @@ class FF5PRWorld(World):
 
     # Create this world's items and add them to the item pool
     # After this function call, all Items, Regions, and Locations are fixed (this includes Events).
+    @timed_step('create_items')
     def create_items(self):
         # Build up a list of all items that we want to add to the pool
         items = []
@@ -457,30 +546,31 @@ class FF5PRWorld(World):
 
         # By default, we add the original set of items to the item pool.
         # In other words, if Chest X contains a Potion and Chest Y contains an Ether, add a Potion then an Ether
-        for region in self.multiworld.regions:
-            if region.player == self.player:  # I think this is right?
-                for location in region.locations:
-                    # Is this a shop?
-                    if location.name in shop_lookup:
-                        itemName = shop_lookup[location.name]
-                        new_item = self.create_item(itemName)
-                        items.append(new_item)
-                    else:
-                        pristine_location = self.pristine_locations[location.name]
-                        if pristine_location.loc_id is not None:   # Not an "Event" location+item
-                            pristine_item_name = pristine_location.orig_item
+        # (Our regions are in the same order that we added them to the multiworld.)
+        for region in self.region_lookup.values():
+            for location in region.locations:
+                # Is this a shop?
+                if location.name in shop_lookup:
+                    itemName = shop_lookup[location.name]
+                    new_item = self.create_item(itemName)
+                    items.append(new_item)
+                else:
+                    pristine_location = self.pristine_locations[location.name]
+                    if pristine_location.loc_id is not None:   # Not an "Event" location+item
+                        pristine_item_name = pristine_location.orig_item
 
-                            # Switch 'Freelancer' with this job if this is our starting job.
-                            if pristine_item_name == self.firstJob:
-                                pristine_item_name = 'Job: Freelancer'
+                        # Switch 'Freelancer' with this job if this is our starting job.
+                        if pristine_item_name == self.firstJob:
+                            pristine_item_name = 'Job: Freelancer'
 
-                            new_item = self.create_item(pristine_item_name)
-                            items.append(new_item)
+                        new_item = self.create_item(pristine_item_name)
+                        items.append(new_item)
 
         # TODO: Here is where we balance the Item-to-Location ratio; i.e., make 'Junk' items if we're short
 
         # Update
         self.multiworld.itempool += items
+        self.pool_items.extend(items)
 
         # Collect our first unlock; right now only World 1 is available
         firstTeleport = None
@@ -494,11 +584,8 @@ class FF5PRWorld(World):
 
         # Now that we've created all items, we set the 'orig_item' property of all Locations/Shops to None
         # This helps us avoid errors caused by using the *original* item, and not the *assigned* item.
-        for entry in self.pristine_locations.values():
-            entry.orig_item = None
-        for shop in self.pristine_shops.values():
-            for entry in shop.products.values():
-                entry.orig_item = None
+        # (Masking the field in our overlay does this for every Location and Product at once.)
+        self.pristine_overlay.mask_field('orig_item', None)
 
 
 
@@ -511,20 +598,21 @@ class FF5PRWorld(World):
     #   * ALL items are added to a lookup to make the .NET client code consistent. So, content_id 1 (Potion) will be given an entry
     #     that says "give them 1 Potion". A little verbose, but worth it for consistency.
     def create_item(self, fullName: str) -> FF5PRItem:
-        # Create our item by parsing the name string
-        normName = normalize_item_name(fullName)
-        itemClassification = ParseItemClassification(self.pristine_items[normName].classification) if normName in self.pristine_items else ItemClassification.filler
-        return FF5PRItem(normName, itemClassification, self.item_name_to_id[normName], self.player)
+        # Our item table has already parsed (and normalized) every name we know about
+        entry = self.item_table.get(fullName)
+        return FF5PRItem(entry.name, entry.classification, entry.code, self.player)
 
 
-    # Retrieve a JSON serialized string that we'll pass on to our Client to handle specific MultiWorld stuff
+    # Retrieve a JSON document (as a list of text chunks) that we'll pass on to our Client to handle specific MultiWorld stuff
     #   (player name, seed, etc.)
-    # @special_items_str - { itemId -> [pseudoItem, pseudoItem, ...]}  (but in string format)
+    # @item_cid_to_action - { itemId -> [pseudoItem, pseudoItem, ...]}
     #   pseudoItems can be: ['item', content_id, content_num] or ['job', job_id] or ['remote', location_id]
+    # @shop_item_to_location_revlookup - { (product_group,item_cid) -> [location_cid, location_cid, ...] }
     # @mundane_prog_items - [contentId, contentId, ...]
     #   These are *normal* game items (like Adamantite) that are used for Progression (so we should not allow the player to buy >1 of them)
     # @firstJobId = if present, we're not starting as Freelancer
-    def serialize_multiworl_data(self, location_cid_to_item_cid, special_shop_str, special_items_str, mundane_prog_items, firstJobId, teleport_failsafe):
+    @timed_step('serialize_multiworl_data')
+    def serialize_multiworl_data(self, location_cid_to_item_cid, shop_item_to_location_revlookup, item_cid_to_action, mundane_prog_items, firstJobId, teleport_failsafe):
         # Constants
         # TODO: max is based on known monsters; we should test if it can go higher (including w/ scan, etc.) -- C# supports up to 2,147,483,647
         StatScaleHpMin = 1
@@ -546,6 +634,8 @@ class FF5PRWorld(World):
         #
         RecLvlMaxWorld1 = 30  # Bosses on World 1 go up to Recommended Level 24. We allow this to boost slightly higher.
 
+        from .Monsters import monsters, boss_encounters
+
         res = {}
 
         # The seed is displayed in a few places.
@@ -563,10 +653,10 @@ class FF5PRWorld(World):
 
         # Mapping of non-standard items to their actions.
         # This could be a Remote item, a Jumbo item, etc.
-        res['item_cid_to_action'] = '@@SPECIAL_ITEM_STR@@'
+        res['item_cid_to_action'] = { itemId: item_cid_to_action[itemId] for itemId in sorted(item_cid_to_action.keys()) }
 
         # Shop reverse lookup is similar
-        res['shop_item_to_location_revlookup'] = '@@SPECIAL_SHOP_STR@@'
+        res['shop_item_to_location_revlookup'] = { f"{pgItemId[0]}:{pgItemId[1]}": shop_item_to_location_revlookup[pgItemId] for pgItemId in sorted(shop_item_to_location_revlookup.keys()) }
 
         res['mundane_prog_items'] = mundane_prog_items
 
@@ -640,20 +730,19 @@ class FF5PRWorld(World):
                 enc_mobs[encId] = encMobs
         res['encounter_mobs'] = enc_mobs
 
-        # Turn our json object into a string
-        res = json.dumps(res, sort_keys=True, indent=2)
-
-        # Substitute our magic formatted values
-        res = res.replace('"@@SPECIAL_ITEM_STR@@",', "{\n"+special_items_str+"\n  },", 1)
-        res = res.replace('"@@SPECIAL_SHOP_STR@@"', "{\n"+special_shop_str+"\n  }", 1)    # NOTE: No comma, since it's the last element for now...
-
-        return res
+        # Turn our json object into text (in one go; see encode_json())
+        from .Output import encode_json
+        # In debug format, the two big lookups get one line per entry, so that they're readable; in compact format,
+        #   location_cid_to_item_cid becomes dense arrays (by Location ID), which the client unpacks.
+        return encode_json(res, self.output_format,
+          line_keys=['item_cid_to_action', 'shop_item_to_location_revlookup'],
+          dense_keys={ 'location_cid_to_item_cid': ('location_cid_base', LocationStart) })
 
 
     # Write our set of custom messages, along with any extra that were generated along the way
     def write_custom_messages(self, extra_messages):
-        message_strings = "Assets/GameAssets/Serial/Data/Message/story_mes_en\n\n"
-        nameplate_strings = "Assets/GameAssets/Serial/Data/Message/story_cha_en\n\n"
+        message_strings = [ "Assets/GameAssets/Serial/Data/Message/story_mes_en\n\n" ]
+        nameplate_strings = [ "Assets/GameAssets/Serial/Data/Message/story_cha_en\n\n" ]
         for key,val in custom_messages['Assets/GameAssets/Serial/Data/Message/story_mes_en'].items():  # TODO: Better abstraction
             newMsg = val
             if isinstance(val, list):
@@ -661,7 +750,7 @@ class FF5PRWorld(World):
                 newMsg = 'Found '
                 for i in range(len(val)):
                     loc_name = val[i]
-                    loc = self.get_location(loc_name)   # TODO: I guess we could put the 'pristine' name here if we ever filter Locations
+                    loc = self.getLocation(loc_name)   # TODO: I guess we could put the 'pristine' name here if we ever filter Locations
                     if loc.item.player != self.player:
                         newMsg += str(loc.item)   # Includes "(PlayerName)" in the __repr
                     else:
@@ -676,25 +765,26 @@ class FF5PRWorld(World):
                 newMsg = f"Welcome to the randomizer! Your seed is: {self.multiworld.seed_name}"
 
             # Write the message
-            message_strings += f"{key},{newMsg}\n"
+            message_strings.append(f"{key},{newMsg}\n")
 
             # Write the nameplace (default to empty string)
             name_str = custom_messages['Assets/GameAssets/Serial/Data/Message/story_cha_en'].get(key,'')  # TODO: Better abstraction
-            nameplate_strings += f"{key},{name_str}\n"
+            nameplate_strings.append(f"{key},{name_str}\n")
 
 
         # Add our extra messages
         for key, val in extra_messages.items():
             if not isinstance(val, list):
                 val = ['', val]
-            message_strings += f"{key},{val[1]}\n"
-            nameplate_strings += f"{key},{val[0]}\n"
+            message_strings.append(f"{key},{val[1]}\n")
+            nameplate_strings.append(f"{key},{val[0]}\n")
 
         return message_strings, nameplate_strings
 
 
     # The goal here is to map every Location to a simple "item ID" that refers to "whatever you get at that location",
     #   so that we don't need to play around with content_count, or other misdirections.
+    @timed_step('gen_pre_process_locations')
     def gen_pre_process_locations(self, location_cid_to_item_cid, item_cid_to_action, item_cid_to_msg_desc):
         APCustomIcon = '<IC_BRS>'
         JobCustomIcon = '<IC_GMB>'
@@ -745,8 +835,10 @@ class FF5PRWorld(World):
 
 
         # Add Actions for all of our Items. This is needed regardless of whether we get these items from our own world or another's
-        for item in self.multiworld.itempool:
-            if item.player == self.player and item.code is not None:
+        # Note that this covers every Item we *added* to the pool, even if Archipelago later took it out (e.g., for start_inventory_from_pool),
+        #   as well as any Items of ours that Archipelago added itself (see add_final_pool_items()); we may be given any of them.
+        for item in self.pool_items:
+            if item.code is not None:
                 # The item's ID (as our game refers to it)
                 item_id = item.code - PristineMultiworldItemStart
 
@@ -758,37 +850,21 @@ class FF5PRWorld(World):
 
                 # Mundane vs. jumbo vs. job
                 # TODO: If we add Jumbo items for everything AND use the RANDO_GOT_ style messages, we can simplify all this.
-                if item.name in self.pristine_items and 'Job' not in self.pristine_items[item.name].tags:
+                # The action itself was worked out ahead of time in our item table (see Items.py); it's shared, so don't modify it.
+                action = self.item_table.get(item.name).action
+                if action is None:
                     # Mundane; no special action.
                     # Item descriptions for mundane+progression (like Adamantite) will have "[Progression]" added manually (for now)
                     # TODO: Maybe put an 'item' entry in item_id_to_action and then filter it later?
                     pass
-                elif item.name in self.pristine_items and 'Job' in self.pristine_items[item.name].tags:  # TODO: simplify, once we check the TEST above
-                    # TODO: This is annoying right now...
-                    #       We can probably pull most of this logic up into Pristine itself (have every item report its 'action')
-                    subItems = parse_jumbo_items(item.name)
-                    if len(subItems)!=1 or not subItems[0][1].startswith('Job:'):
-                        raise Exception("Bad jumbo job: {item.name}")
-                    self.pristine_item = self.pristine_items[subItems[0][1]]
-                    item_cid_to_action[item_id] = ['job', self.pristine_item.optattrs['JobId']]
+                elif action[0] == 'job':
+                    item_cid_to_action[item_id] = action
                     item_cid_to_msg_desc[item_id] = [
                       f"{JobCustomIcon}{item.name}",
                       f"Unlock the {item.name}",
                     ]
-                else:  # This is a Jumbo item
-                    # List of [content_id, content_num]
-                    subItems = parse_jumbo_items(item.name)
-                    values = []
-
-                    # TODO: This is also annoying...
-                    for entry in subItems:
-                        if entry[1].startswith('Job:'):
-                            raise Exception("Bad jumbo non-job: {item.name}")
-                        self.pristine_item = self.pristine_items[entry[1]]
-                        values.append(self.pristine_item.content_id)  # content_id
-                        values.append(entry[0])  # content_num
-
-                    item_cid_to_action[item_id] = ['jumbo'] + values
+                else:  # This is a Jumbo item; the action is ['jumbo', content_id, content_num, content_id, content_num, ...]
+                    item_cid_to_action[item_id] = action
                     item_cid_to_msg_desc[item_id] = [
                       f"{JumboCustomIcon}{item.name}",
                       f"A bundle of your favorite items!",
@@ -799,16 +875,17 @@ class FF5PRWorld(World):
     #
     # TODO: We actually have to make proper text/descriptions for these, since they will show up in shops *before* we buy them.
     #
+    @timed_step('gen_pre_process_faux_items')
     def gen_pre_process_faux_items(self, location_cid_to_item_cid, item_cid_to_action, item_cid_to_msg_desc, system_extra_messages):
-        res = ''
+        res = []
 
         # In case we mess up, it is better to have some glitch item than it is to crash. Thus, the second
         #   thing we do is to create Items for each of the pseudo-items in the previous list. If we mess up our 
         #   Client code (and the Client tries to actually give the pseudo-item to the player), they'll at least 
         #   be given something they can see in their menu, instead of crashing outright.
-        res += "# Faux Items; these should never be in the player's inventory, but if we mess up it's better not to crash\n"
-        res += "Assets/GameAssets/Serial/Data/Master/content\n"
-        res += "+id,mes_id_name,mes_id_battle,mes_id_description,icon_id,type_id,type_value\n"
+        res.append("# Faux Items; these should never be in the player's inventory, but if we mess up it's better not to crash\n")
+        res.append("Assets/GameAssets/Serial/Data/Master/content\n")
+        res.append("+id,mes_id_name,mes_id_battle,mes_id_description,icon_id,type_id,type_value\n")
         for item_id in sorted(item_cid_to_action.keys()):
             # Does our 'new' item actually already exist?
             if item_id <= CurrMaxContentId:
@@ -823,13 +900,13 @@ class FF5PRWorld(World):
             forShowItemId = 59    # Our custom for-show "Item"
             itemNameKey = f"MSG_RANDO_FAUX_ITEM_NAME_{len(system_extra_messages)}"
             itemDescKey = f"MSG_RANDO_FAUX_ITEM_DESC_{len(system_extra_messages)}"
-            res += f"{item_id},{itemNameKey},None,{itemDescKey},0,{forShowItemType},{forShowItemId}\n"
+            res.append(f"{item_id},{itemNameKey},None,{itemDescKey},0,{forShowItemType},{forShowItemId}\n")
 
             # Add the message too!
             msg_and_desc = item_cid_to_msg_desc[item_id]
             system_extra_messages[itemNameKey] = msg_and_desc[0]
             system_extra_messages[itemDescKey] = msg_and_desc[1]
-        res += "\n"
+        res.append("\n")
 
         # Add our shared string for mundane "local" items
         itemNameKey = f"MSG_RANDO_FAUX_LOCAL_ITEM_NAME"
@@ -838,9 +915,9 @@ class FF5PRWorld(World):
         system_extra_messages[itemDescKey] = "If you're seeing this, we messed something up."
 
         # We add a separate patch for "local" items (Locations), to keep things organized
-        res += "# Faux Mundane Item Locations; these also exist to avoid crashing in case of mistakes\n"
-        res += "Assets/GameAssets/Serial/Data/Master/content\n"
-        res += "+id,mes_id_name,mes_id_battle,mes_id_description,icon_id,type_id,type_value\n"
+        res.append("# Faux Mundane Item Locations; these also exist to avoid crashing in case of mistakes\n")
+        res.append("Assets/GameAssets/Serial/Data/Master/content\n")
+        res.append("+id,mes_id_name,mes_id_battle,mes_id_description,icon_id,type_id,type_value\n")
         for loc_id in sorted(location_cid_to_item_cid.keys()):
             # Have we already procesed this (as a Remote item)?
             if loc_id in item_cid_to_action:
@@ -848,8 +925,8 @@ class FF5PRWorld(World):
             
             # Note: Local mundane items are never sold in shops, so they can all share the same description/name.
             # We *really* should never see these.
-            res += f"{loc_id},{itemNameKey},None,{itemDescKey},0,1,59\n"   # Just use "Item" number "59" as a template
-        res += "\n"
+            res.append(f"{loc_id},{itemNameKey},None,{itemDescKey},0,1,59\n")   # Just use "Item" number "59" as a template
+        res.append("\n")
 
         return res
 
@@ -882,68 +959,232 @@ class FF5PRWorld(World):
 
 
     # Helper: Set an Item/Ability cost (in gil) for things that might end up in shops at some point.
-    # Returns a string that can be appended to master_csvs_file
+    # Returns a list of lines that can be added to master_csvs_file; these are the same for every player.
+    @timed_step('fix_shop_no_costs')
     def fix_shop_no_costs(self):
-        res = ""
+        res = []
 
         # Set a default cost for items that cost 0 gil (otherwise they will crash the game when you buy them)
-        res += "# Default cost for items that normally cost nothing\n"
-        res += "Assets/GameAssets/Serial/Data/Master/item\n"
-        res += "id,buy\n"
-        res += "46,100\n"   # Adamantite
-        res += "\n"
+        res.append("# Default cost for items that normally cost nothing\n")
+        res.append("Assets/GameAssets/Serial/Data/Master/item\n")
+        res.append("id,buy\n")
+        res.append("46,100\n")   # Adamantite
+        res.append("\n")
         #
-        res += "# Default cost for abilities that normally cost nothing\n"
-        res += "Assets/GameAssets/Serial/Data/Master/ability\n"
-        res += "id,buy\n"
-        res += "165,100\n"  # Shiva
-        res += "166,100\n"  # ...
-        res += "167,100\n"
-        res += "168,100\n"
-        res += "169,100\n"
-        res += "170,100\n"
-        res += "171,100\n"
-        res += "172,100\n"
-        res += "173,100\n"
-        res += "174,100\n"
-        res += "175,100\n"
-        res += "176,100\n"   # Bahamut
-        res += "383,150\n"   # Doom (Blue Magic)
-        res += "384,90\n"    # Roulette
-        res += "385,6000\n"  # Aqua Breath
-        res += "386,280\n"   # Level 5 Death
-        res += "387,280\n"   # Level 4 Graviga
-        res += "388,280\n"   # Level 2 Old
-        res += "389,280\n"   # Level 3 Flare
-        res += "390,500\n"   # Pond's Chorus
-        res += "391,500\n"   # Lilliputian Lyric
-        res += "392,500\n"   # Flash
-        res += "393,1500\n"  # Time Slip
-        res += "394,150\n"   # Moon Flute
-        res += "395,4000\n"  # Death Claw
-        res += "396,150\n"   # Aero
-        res += "397,600\n"   # Aera
-        res += "398,6000\n"  # Aeroga
-        res += "399,350\n"   # Flame Thrower
-        res += "400,80\n"    # Goblin Punch
-        res += "401,3000\n"  # Dark Spark
-        res += "402,2000\n"  # Off-Guard
-        res += "403,150\n"   # Transfusion
-        res += "404,1700\n"  # Mind Blast
-        res += "405,150\n"   # Vampire
-        res += "406,100\n"   # Magic Hammer
-        res += "407,9000\n"  # Mighty Guard
-        res += "408,90\n"    # Self-Destruct
-        res += "409,80\n"    # ???
-        res += "410,2000\n"  # 1000 Needles
-        res += "411,2000\n"  # White Wind
-        res += "412,300\n"   # Missile (Blue Magic)
-        res += "\n"
+        res.append("# Default cost for abilities that normally cost nothing\n")
+        res.append("Assets/GameAssets/Serial/Data/Master/ability\n")
+        res.append("id,buy\n")
+        res.append("165,100\n")  # Shiva
+        res.append("166,100\n")  # ...
+        res.append("167,100\n")
+        res.append("168,100\n")
+        res.append("169,100\n")
+        res.append("170,100\n")
+        res.append("171,100\n")
+        res.append("172,100\n")
+        res.append("173,100\n")
+        res.append("174,100\n")
+        res.append("175,100\n")
+        res.append("176,100\n")   # Bahamut
+        res.append("383,150\n")   # Doom (Blue Magic)
+        res.append("384,90\n")    # Roulette
+        res.append("385,6000\n")  # Aqua Breath
+        res.append("386,280\n")   # Level 5 Death
+        res.append("387,280\n")   # Level 4 Graviga
+        res.append("388,280\n")   # Level 2 Old
+        res.append("389,280\n")   # Level 3 Flare
+        res.append("390,500\n")   # Pond's Chorus
+        res.append("391,500\n")   # Lilliputian Lyric
+        res.append("392,500\n")   # Flash
+        res.append("393,1500\n")  # Time Slip
+        res.append("394,150\n")   # Moon Flute
+        res.append("395,4000\n")  # Death Claw
+        res.append("396,150\n")   # Aero
+        res.append("397,600\n")   # Aera
+        res.append("398,6000\n")  # Aeroga
+        res.append("399,350\n")   # Flame Thrower
+        res.append("400,80\n")    # Goblin Punch
+        res.append("401,3000\n")  # Dark Spark
+        res.append("402,2000\n")  # Off-Guard
+        res.append("403,150\n")   # Transfusion
+        res.append("404,1700\n")  # Mind Blast
+        res.append("405,150\n")   # Vampire
+        res.append("406,100\n")   # Magic Hammer
+        res.append("407,9000\n")  # Mighty Guard
+        res.append("408,90\n")    # Self-Destruct
+        res.append("409,80\n")    # ???
+        res.append("410,2000\n")  # 1000 Needles
+        res.append("411,2000\n")  # White Wind
+        res.append("412,300\n")   # Missile (Blue Magic)
+        res.append("\n")
+
+        return res
+
+
+    # Helper: Add our new items (Server Connection, Win Condition, etc.) and their content entries.
+    # Returns a list of lines that can be added to master_csvs_file; these are the same for every player.
+    def gen_new_item_rows(self):
+        res = []
+
+        # TODO: Not exactly sure how to organize this...
+        res.append("# Add any new items\n")
+        res.append("Assets/GameAssets/Serial/Data/Master/item\n")
+        res.append("+id,sort_id,type_id,system_id,item_lv,attribute_id,accuracy_rate,destroy_rate,standard_value,renge_id,menu_renge_id,battle_renge_id,invalid_reflection,period_id,throw_flag,preparation_flag,drink_flag,machine_flag,condition_group_id,battle_effect_asset_id,menu_se_asset_id,menu_function_group_id,battle_function_group_id,buy,sell,sales_not_possible\n")
+        res.append("58,58,2,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0\n")   # "Server Connection" key item
+        res.append("59,59,2,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1,0,1\n")   # "Display" Normal Item (Content Type 1) (Item Type 2 == Key)
+        res.append("60,60,2,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0\n")   # Tells you the "Win Condition" (key item)
+        # system_id=1 (restorative), destroy_rate=0 (infinite use), standard_value=100 (no idea), renge_id=2 (Custom (like Ramuh)), preparation_flag=0 (don't use in Mix), menu_function_group_id=83 (?teleport?)
+        res.append("61,61,1,1,0,0,100,0,100,2,2,2,1,0,0,0,0,0,0,0,255,83,0,1,1,1\n")   # "Teleport to World 1", given to you when you unlock World 1 (i.e., at the beginning)
+        res.append("\n")
+        # 
+        res.append("# ...and their content entries\n")
+        res.append("Assets/GameAssets/Serial/Data/Master/content\n")
+        res.append("+id,mes_id_name,mes_id_battle,mes_id_description,icon_id,type_id,type_value\n")
+        res.append("1691,MSG_RANDO_SERVER_ITEM_NAME,None,MSG_RANDO_SERVER_ITEM_DESC,0,1,58\n")
+        res.append("1692,MSG_RANDO_WINCONDITION_ITEM_NAME,None,MSG_RANDO_WINCONDITION_ITEM_DESC,0,1,60\n")
+        res.append("5000,MSG_TELEPORT_WORLD1_ITEM_NAME,None,MSG_TELEPORT_WORLD1_ITEM_DESC,0,1,61\n")
+        res.append("\n")
 
         return res
 
 
-    # Create the patch file
+    # Helper: Remove boss drops that are in the item pool, and give bosses EXP and AP.
+    # Returns a list of lines that can be added to master_csvs_file; these are the same for every player.
+    def gen_boss_reward_rows(self):
+        res = []
+
+        # Remove all (relevant) boss drops and give them XP
+        # I think that "drop1" and "drop2" might have something to do with normal vs. rare drops (so bosses list the same item in both, but you only get one...)
+        # TODO: Yeah, we really need to organize this...
+        res.append("# Add EXP to bosses but remove their drops (they're in the item pool)\n")
+        res.append("Assets/GameAssets/Serial/Data/Master/monster\n")
+        res.append("id,exp,drop_content_id1,drop_content_id1_value,drop_content_id2,drop_content_id2_value\n")
+        res.append("283,210,0,0,0,0\n")   # Karlabos
+        res.append("285,400,0,0,0,0\n")   # Siren
+        res.append("286,400,0,0,0,0\n")   # Siren (Undead)
+        res.append("287,530,0,0,0,0\n")   # Forza
+        res.append("288,530,0,0,0,0\n")   # Magissa
+        res.append("317,650,0,0,0,0\n")   # Shiva
+        #res.append("293,650,0,0,0,0\n")  # Ice Commander (already drops nothing)
+        res.append("54,1950,0,0,0,0\n")   # Ifrit (Note: 233 is also him, but I'm not sure why)
+        res.append("33,1950,0,0,0,0\n")   # Byblos (Note: 515 is also him; no idea why)
+        res.append("294,3070,0,0,0,0\n")  # Sandworm
+        #res.append("295,0,0,0,0,0\n")    # Hole (already drops nothing)
+        res.append("364,3900,0,0,0,0\n")  # Cray Claw
+        res.append("296,4000,0,0,0,0\n")  # Adamantoise
+        res.append("300,4100,0,0,0,0\n")  # Soul Cannon
+        #res.append("371,4100,0,0,0,0\n") # Launcher - skipped (leave drops/xp intact)
+        res.append("307,4100,0,0,0,0\n")  # Titan
+        res.append("306,4100,0,0,0,0\n")  # Chimera Brain
+        res.append("\n")
+
+        # Keep "crystal" boss drops (and ramuh, etc.), but give them XP
+        res.append("# Add EXP to bosses (and keep their drops) if their items don't go into the item pool\n")
+        res.append("Assets/GameAssets/Serial/Data/Master/monster\n")
+        res.append("id,exp\n")
+        res.append("281,200\n")   # Wing Raptor
+        res.append("282,200\n")   # Wing Raptor (Closed)
+        res.append("289,1120\n")  # Galura
+        res.append("290,1410\n")  # Liquid Flame
+        res.append("291,1410\n")  # Liquid Flame (Alt. Form 2)
+        res.append("292,1410\n")  # Liquid Flame (Alt. Form 3)
+        res.append("40,1500\n")   # Ramuh - should be in item pool but isn't (Note: he's also at 234)
+        res.append("301,4500\n")  # Archaeoavis
+        res.append("302,4500\n")  # Archaeoavis (Form 2)
+        res.append("303,4500\n")  # Archaeoavis (Form 3)
+        res.append("304,4500\n")  # Archaeoavis (Form 4)
+        res.append("305,4500\n")  # Archaeoavis (Form 5)
+        res.append("308,666\n")   # Purobolos (there's 6 of them, and they drop potions)
+        res.append("\n")
+
+        # ...and give the bosses AP (via their encounters)
+        res.append("# Adjust boss AP amounts via their encounters\n")
+        res.append("Assets/GameAssets/Serial/Data/Master/monster_party\n")
+        res.append("id,get_ap\n")
+        res.append("440,10\n")   # Wing Raptor
+        res.append("441,10\n")   # Karlabos
+        res.append("442,10\n")   # Siren
+        res.append("443,11\n")   # Magissa and Forza - TODO: Confirm; this weird in the data.
+        res.append("444,13\n")   # Galura
+        res.append("498,20\n")   # Shiva (& Ice Commander)
+        res.append("445,15\n")   # Liquid Flame
+        res.append("654,16\n")   # Liquid Flame (Note: Unclear why this encounter exists, but its AP is consistent. I'm changing it, but giving it distinct AP so we can track it...)
+        res.append("655,17\n")   # Liquid Flame (Note: Unclear why this encounter exists, but its AP is consistent. I'm changing it, but giving it distinct AP so we can track it...)
+        res.append("495,20\n")   # Ifrit
+        res.append("447,20\n")   # Byblos
+        res.append("77,20\n")    # Ramuh
+        res.append("448,15\n")   # Sandworm + Holes
+        res.append("507,20\n")   # Cray Claw
+        res.append("449,15\n")   # Adamantoise
+        res.append("452,20\n")   # Soul Cannon & Launchers
+        res.append("453,20\n")   # Archeoaevis  (TODO: There's a *bunch* of these, no idea why)
+        res.append("456,20\n")   # Purobolos
+        res.append("455,20\n")   # Titan
+        res.append("454,20\n")   # Chimera Brain
+        res.append("\n")
+
+        return res
+
+
+    # Called once for all FF5 Worlds, at the same time as (or before) generate_output() for each of them.
+    # If we're using output workers, hand every World's output to them now, so that the files are written in parallel
+    #   even if generate_output() is called for one World at a time.
+    @classmethod
+    def stage_generate_output(cls, multiworld: MultiWorld, output_directory: str) -> None:
+        cls.add_final_pool_items(multiworld)
+        for world in multiworld.get_game_worlds(cls.game):
+            world.read_output_settings()
+            if world.output_workers > 0:
+                from .Snapshot import start_output
+                start_output(world, output_directory)
+
+
+    # Archipelago can also put Items of ours into the pool that create_items() didn't make (e.g., item links replace some of
+    #   a linked player's items with create_filler()), and the client needs Actions for those too. So, once the pool is final,
+    #   we add them to each World's pool_items. The pool has *every* player's items, so we sort it by player just once.
+    @classmethod
+    def add_final_pool_items(cls, multiworld: MultiWorld) -> None:
+        final_items = { world.player: [] for world in multiworld.get_game_worlds(cls.game) }
+        for item in multiworld.itempool:
+            if item.player in final_items:
+                final_items[item.player].append(item)
+        for player, items in final_items.items():
+            world = multiworld.worlds[player]
+            known = set(map(id, world.pool_items))
+            world.pool_items.extend(item for item in items if id(item) not in known)
+
+
+    # Create our patch file (see write_output())
+    @timed_step('generate_output')
+    def generate_output(self, output_directory: str) -> None:
+        self.read_output_settings()
+        if self.output_workers > 0:
+            from .Snapshot import finish_output
+            file_path = finish_output(self, output_directory)
+        else:
+            file_path = self.write_output(output_directory)
+
+        # Save our metrics once this stage is done (if they're turned on)
+        self.metrics.save_after_stage(file_path)
+
+
+    # Read the host's settings for writing our .apff5pr. These (and the modules they come from) aren't needed until
+    #   generate_output(), so we don't import those modules before then. Anything that's already set is kept.
+    def read_output_settings(self):
+        from .Output import get_compression, get_output_format
+        from .Snapshot import get_output_workers
+        from .Conflicts import get_patch_conflicts_mode
+        if self.output_workers is None:
+            self.output_workers = get_output_workers(self.settings)
+        if self.compression is None:
+            self.compression = get_compression(self.settings)
+        if self.output_format is None:
+            self.output_format = get_output_format(self.settings)
+        if self.patch_conflicts is None:
+            self.patch_conflicts = get_patch_conflicts_mode(self.settings)
+
+
+    # Create the patch file (our .apff5pr); returns its path.
     # The way Items and Locations interact with the game is complicated enough that I've had to basically
     #  rewrite the logic here three times. In order to avoid a fourth rewrite, I'm going to document
     #  the specifics of that behavior here.
@@ -971,15 +1212,20 @@ class FF5PRWorld(World):
     #     * When the player buys N of Item X, we will mark off "N" of the Locations in this store's lookup for Item X. If we've already 
     #       marked them all, just do nothing (let them buy the item).
     #       * We can accomplish this by checking the "Locations sent to server" Dictionary; we don't need to store additional data.
-    def generate_output(self, output_directory: str) -> None:
+    # NOTE: With output workers on, this is called on an OutputSnapshot in another process, not on the World itself.
+    #       If you need something new from the World in here, add it to the snapshot (see Snapshot.py).
+    def write_output(self, output_directory: str) -> str:
         # If we need to put hints in message boxes, do this:
         #if self.hints != 'none':
         #    self.hint_data_available.wait()
 
         #
-        # We have a series of output 'files', but we'll keep them in-memory to make zipping simpler.
+        # We have a series of output 'files'. Each one is built up as a list of text chunks (not one big string),
+        #   and then streamed into the zip file at the end (see Output.py).
         #
 
+        from .Output import write_archive, get_shared_block
+
         # Default prices for 'special' items
         job_price = int(self.options.shop_custom_price_jobs)
         mwitem_price = int(self.options.shop_custom_price_multiworld_items)
@@ -987,15 +1233,21 @@ class FF5PRWorld(World):
 
         # Prepare a file that contains all of our game-modifying patches. 
         # These will be applied before anything else is patched.
-        script_patch_file = "# These patches are applied before any later item-modifying patches.\n\n"
-        for name in self.pristine_game_patches:
-            script_patch_file += all_patch_contents[name]
-        script_patch_file += "\n\n# These patches are applied last; they modify the actual items being placed\n\n"
+        patchNames = tuple(self.pristine_game_patches)
+        script_patch_file = [ "# These patches are applied before any later item-modifying patches.\n\n" ]
+        script_patch_file.append(get_shared_block(('script_patches', self.output_format, patchNames), lambda: gen_script_patches(patchNames, self.output_format)))
+        script_patch_file.append("\n\n# These patches are applied last; they modify the actual items being placed\n\n")
+
+        # Every write we make to the game's assets, so that we can check that none of them overlap (see Conflicts.py)
+        from .Conflicts import PatchWrites
+        patch_writes = PatchWrites(self.patch_conflicts != 'off')
+        for name in patchNames:
+            patch_writes.add_patch_set(name)
 
 
 
         # Treasure file is as basic a csv as they get
-        treasure_mod_file = "entity_default,json_xpath,content_id,content_num,message_key\n"
+        treasure_mod_file = [ "entity_default,json_xpath,content_id,content_num,message_key\n" ]
 
         # TODO: Need a good place for these 'generic' entries. This one lets you use the normal airship in the Torna Canal.
         #       It's a generic version of the treasure format, and I don't feel like writing another parser.
@@ -1005,20 +1257,22 @@ class FF5PRWorld(World):
         #          getting the door event to work. Not strictly wrong, but a little clunky.
         #       In short, too much effort for 1 boss.
         # TODO: We might be able to fix (1) with "ChangeView()" --- that causes the screen to shift to its "Mode 7" angle -- we *could* potentially make the airship "land" with this + a SysCall ?
-        #treasure_mod_file += "Assets/GameAssets/Serial/Res/Map/Map_10010/Map_10010/entity_default,/layers/[1]/objects/{id=234}/properties,target_transportation_ids,string,\n"
-        #treasure_mod_file += "Assets/GameAssets/Serial/Res/Map/Map_30050/Map_30050/entity_default,/layers/[0]/objects/{id=21}/properties,target_transportation_ids,string,\n"
-        #treasure_mod_file += "Assets/GameAssets/Serial/Res/Map/Map_30050/Map_30050/ev_e_0026,/layers/[0]/objects/{id=8}/properties,target_transportation_ids,string,\n"
+        #treasure_mod_file.append("Assets/GameAssets/Serial/Res/Map/Map_10010/Map_10010/entity_default,/layers/[1]/objects/{id=234}/properties,target_transportation_ids,string,\n")
+        #treasure_mod_file.append("Assets/GameAssets/Serial/Res/Map/Map_30050/Map_30050/entity_default,/layers/[0]/objects/{id=21}/properties,target_transportation_ids,string,\n")
+        #treasure_mod_file.append("Assets/GameAssets/Serial/Res/Map/Map_30050/Map_30050/ev_e_0026,/layers/[0]/objects/{id=8}/properties,target_transportation_ids,string,\n")
         #
         # Make the Ship's Graveyard map entrance teleport you to the start of the Ship's Graveyard
-        treasure_mod_file += "Assets/GameAssets/Serial/Res/Map/Map_10010/Map_10010/entity_default,/layers/[1]/objects/{id=259}/properties,point_id,int,1\n"
+        treasure_mod_file.append("Assets/GameAssets/Serial/Res/Map/Map_10010/Map_10010/entity_default,/layers/[1]/objects/{id=259}/properties,point_id,int,1\n")
+        patch_writes.add_properties("Assets/GameAssets/Serial/Res/Map/Map_10010/Map_10010/entity_default", "/layers/[1]/objects/{id=259}/properties", {'point_id': 1}, "Ship's Graveyard entrance")
         # Always allow "pull"-ing the switch in the Catapult
-        treasure_mod_file += "Assets/GameAssets/Serial/Res/Map/Map_20231/Map_20231_4/ev_e_0224,/layers/[0]/objects/{id=30}/properties,script_id,int,2666\n"
+        treasure_mod_file.append("Assets/GameAssets/Serial/Res/Map/Map_20231/Map_20231_4/ev_e_0224,/layers/[0]/objects/{id=30}/properties,script_id,int,2666\n")
+        patch_writes.add_properties("Assets/GameAssets/Serial/Res/Map/Map_20231/Map_20231_4/ev_e_0224", "/layers/[0]/objects/{id=30}/properties", {'script_id': 2666}, "Catapult switch")
 
         # Will contain *all* .csv patches
-        master_csvs_file = ""
+        master_csvs_file = []
 
         # Set a default cost for items that cost 0 gil (otherwise they will crash the game when you buy them)
-        master_csvs_file += self.fix_shop_no_costs()
+        master_csvs_file.append(get_shared_block('fix_shop_no_costs', self.fix_shop_no_costs))
 
         # When we get multiworld items, we want to show a meaningful message box.
         # To do that, we'll need to pad the system message list with a bunch of extra messages, since each one is unique.
@@ -1044,20 +1298,17 @@ class FF5PRWorld(World):
         item_cid_to_msg_desc = {}      # content_id -> [content_name_msg, content_desc_msg] ; the text you'll see when you are in a shop that has this item
                                        # TODO: Should only need to be items, since we don't put Locations in stores as-is. Won't need to be mundane either.
         self.gen_pre_process_locations(location_cid_to_item_cid, item_cid_to_action, item_cid_to_msg_desc)
-        master_csvs_file += self.gen_pre_process_faux_items(location_cid_to_item_cid, item_cid_to_action, item_cid_to_msg_desc, system_extra_messages)
+        master_csvs_file.extend(self.gen_pre_process_faux_items(location_cid_to_item_cid, item_cid_to_action, item_cid_to_msg_desc, system_extra_messages))
 
         # Make a list of mundante items that are also Key+Progression items in game. 
         # These are typically plot items (like the Adamantite) that you might now see in stores (via rando magic)
-        mundane_prog_items = []
-        for name in sorted(self.pristine_items.keys()):
-            entry = self.pristine_items[name]
-            if (entry.classification.lower() == 'progression') and ('KeyItem' in entry.tags) and ('Job' not in entry.tags) and ('WorldTeleport' not in entry.tags):
-                mundane_prog_items.append(entry.content_id)
+        mundane_prog_items = list(self.item_table.mundane_prog_items)
 
         # Patch all of *our* Locations
         shop_item_to_location_revlookup = {}  # (product_group,item_cid) -> [location_cid, location_cid, ...] ; used when we buy "item_cid" in Shop 'product_group'; we need to tell the Server which Location we triggered.
         shop_adds_txt = {}  # If we make new shops, their products will need new entries (product_id -> line)
         shop_changes_txt = {}  # We'll append these all at once, later (product_id -> line)
+        self.metrics.start_step('patch_locations')
         for loc in self.get_locations():
             # Skip Event Items; they are meant to be built in to the Game Engine (or just abstractions)
             if loc.item.code is None:
@@ -1134,26 +1385,32 @@ class FF5PRWorld(World):
                 # There can (rarely) be multiple parallel game maps for this Location; it's assumed game logic will handle keeping them aligned.
                 # NOTE: I'm referring to the Flying Ronka Ruins here, which has duplicated maps for some reason.
                 asset_paths = pristine_location.asset_path
-                if not isinstance(asset_paths, list):
+                if not isinstance(asset_paths, (list, tuple)):   # Lists are viewed as tuples
                     asset_paths = [asset_paths]
                 for asset_path in asset_paths:
                     # 1. Is this a simple chest? (No event; part of entity_default?)
                     if 'entity_default' in asset_path:
                         parts = asset_path.split(':')
-                        treasure_mod_file += f"{parts[0]},{parts[1]},{loc_cid},1,{message_key}\n"
+                        treasure_mod_file.append(f"{parts[0]},{parts[1]},{loc_cid},1,{message_key}\n")
+                        patch_writes.add_properties(parts[0], parts[1], {'content_id': loc_cid, 'content_num': 1, 'message_key': message_key}, loc.name)
                         continue
 
                     # 2. Use GetItem for SysCall in scripts AND for GetItem in scripts
                     else:
                         # We use GetItem here
                         parts = asset_path.split(':')
-                        script_patch_file += f"{parts[0]},{parts[1]},Nop:{pristine_location.optattrs['Label']},Overwrite,0\n"
-                        script_patch_file += "[" + GetJsonItemObj(loc_cid, 1) + "]\n\n" # Two newlines are necessary
+                        header = f"{parts[0]},{parts[1]},Nop:{pristine_location.optattrs['Label']},Overwrite,0"
+                        mnemonics = [GetItem(loc_cid, 1)]
+                        script_patch_file.append(header + "\n")
+                        script_patch_file.append(encode_get_item(loc_cid, 1, self.output_format) + "\n\n") # Two newlines are necessary
+                        patch_writes.add_script(header, mnemonics, loc.name)
+        self.metrics.end_step('patch_locations')
 
 
         # We must add all shops/products that are not already Locations *if* they are split from the original shop
         # Otherwise, they will continue to clone their original shop's inventory (which may have been randomized).
         # You can see this sometimes with very low "shop location" odds.
+        self.metrics.start_step('patch_shops')
         for shopName in sorted(self.pristine_shops.keys()):
             # TODO: Lots of this is copied from the earlier loop through Locations; can we somehow share it?
             orig_shop = self.pristine_shops[shopName]
@@ -1203,7 +1460,8 @@ class FF5PRWorld(World):
 
                 # ...and, patch the script
                 parts = shop.asset_path.split(':', 1)
-                treasure_mod_file += f"{parts[0]},{parts[1]},product_group_id,int,{prod_group}\n"
+                treasure_mod_file.append(f"{parts[0]},{parts[1]},product_group_id,int,{prod_group}\n")
+                patch_writes.add_properties(parts[0], parts[1], {'product_group_id': prod_group}, shopName)
 
             # TODO: Also.... we should structure this as "map locationId -> itemId" (including creating jumbos, etc.), 
             #       and then "do the thing with the locationId". And then just PUT THE LOCATIOn->ACTION MAPPING INTO
@@ -1211,79 +1469,66 @@ class FF5PRWorld(World):
 
             # Patch in any new product groups
             if len(prod_group_adds_txt) > 0:
-                master_csvs_file += "# Add new product_groups for new stores\n"
-                master_csvs_file += "Assets/GameAssets/Serial/Data/Master/product_group\n"
-                master_csvs_file += "+id,mes_id_name\n"  # Note the '+'
+                master_csvs_file.append("# Add new product_groups for new stores\n")
+                master_csvs_file.append("Assets/GameAssets/Serial/Data/Master/product_group\n")
+                master_csvs_file.append("+id,mes_id_name\n")  # Note the '+'
                 for prod_group in sorted(prod_group_adds_txt.keys()):
                     line = prod_group_adds_txt[prod_group]
-                    master_csvs_file += line
-                master_csvs_file += "\n"
+                    master_csvs_file.append(line)
+                master_csvs_file.append("\n")
 
             # ...and overwrite any existing ones
             if len(prod_group_changes_txt) > 0:
-                master_csvs_file += "# Change product group names for existing stores\n"
-                master_csvs_file += "Assets/GameAssets/Serial/Data/Master/product_group\n"
-                master_csvs_file += "id,mes_id_name\n"    # Note: no '+'
+                master_csvs_file.append("# Change product group names for existing stores\n")
+                master_csvs_file.append("Assets/GameAssets/Serial/Data/Master/product_group\n")
+                master_csvs_file.append("id,mes_id_name\n")    # Note: no '+'
                 for prod_group in sorted(prod_group_changes_txt.keys()):
                     line = prod_group_changes_txt[prod_group]
-                    master_csvs_file += line
-                master_csvs_file += "\n"
+                    master_csvs_file.append(line)
+                master_csvs_file.append("\n")
 
         # Patch all shop Product additions
         if len(shop_adds_txt) > 0:
-            master_csvs_file += "# Add new Product (shop) entries\n"
-            master_csvs_file += "Assets/GameAssets/Serial/Data/Master/product\n"
-            master_csvs_file += "+id,content_id,group_id,coefficient,purchase_limit\n"
+            master_csvs_file.append("# Add new Product (shop) entries\n")
+            master_csvs_file.append("Assets/GameAssets/Serial/Data/Master/product\n")
+            master_csvs_file.append("+id,content_id,group_id,coefficient,purchase_limit\n")
             for prod_id in sorted(shop_adds_txt.keys()):
                 line = shop_adds_txt[prod_id]
-                master_csvs_file += line
-            master_csvs_file += "\n"
+                master_csvs_file.append(line)
+            master_csvs_file.append("\n")
 
         # Patch all shop Product changes
         if len(shop_changes_txt) > 0:
-            master_csvs_file += "# Set Product (shop) entries\n"
-            master_csvs_file += "Assets/GameAssets/Serial/Data/Master/product\n"
-            master_csvs_file += "id,content_id,coefficient,purchase_limit\n"
+            master_csvs_file.append("# Set Product (shop) entries\n")
+            master_csvs_file.append("Assets/GameAssets/Serial/Data/Master/product\n")
+            master_csvs_file.append("id,content_id,coefficient,purchase_limit\n")
             for prod_id in sorted(shop_changes_txt.keys()):
                 line = shop_changes_txt[prod_id]
-                master_csvs_file += line
-            master_csvs_file += "\n"
-
-        # Map all "jumbo"/job items *in this seed* to lists of items to be received.
-        # We make a custom JSON string since we don't have fine-tuned formatting options and I want to be able to read this.
-        # Note: We could one day treat all items as jumbo/special, but it might not simplify that much on the .NET side...
-        special_item_str = ''
-        for itemId in sorted(item_cid_to_action.keys()):
-            if len(special_item_str) > 0:
-                special_item_str += ',\n'
-            action = item_cid_to_action[itemId]
-            special_item_str += f'    "{itemId}": {json.dumps(action, indent=None)}'
-
-        # Build another nice formatted string for shops
-        special_shop_str = ''
-        for pgItemId in sorted(shop_item_to_location_revlookup.keys()):
-            if len(special_shop_str) > 0:
-                special_shop_str += ',\n'
-            locations = shop_item_to_location_revlookup[pgItemId]
-            special_shop_str += f'    "{pgItemId[0]}:{pgItemId[1]}": {json.dumps(locations, indent=None)}'
+                master_csvs_file.append(line)
+            master_csvs_file.append("\n")
+        self.metrics.end_step('patch_shops')
+
+        # Note: item_cid_to_action maps all "jumbo"/job items *in this seed* to lists of items to be received.
+        #       We could one day treat all items as jumbo/special, but it might not simplify that much on the .NET side...
 
 
         # Give the Blue Magic icon to all Blue Magic
-        for msg_id in range(205, 234+1):
-            key = f"MSG_MAGIC_NAME_{msg_id}"
-            bmage_icon = '<IC_ABOK>'
-            system_extra_messages[key] = f"{bmage_icon} %ORIG%"   # Special string that means "put this in front of the existing string"
+        system_extra_messages.update(BlueMagicIconMessages)
 
         # Write our custom Messages + Nameplates
         message_strings_file,nameplate_strings_file = self.write_custom_messages(extra_messages)
 
         # Mess with the starting party
+        party_patch = None
         if self.options.solo_character_challenge:
-            script_patch_file += f"Assets/GameAssets/Serial/Res/Map/Map_20250/Map_20250/sc_e_0001,/Mnemonics/[3],SysCall,Overwrite,0\n"
-            script_patch_file += "[" + GetJsonSysCallObj('Party Joined: Bartz') + ',' + GetNoOpObj() + ',' + GetNoOpObj() + ',' + GetNoOpObj() + "]\n\n"  # Two newlines are necessary
+            party_patch = ('solo_character_challenge', [SysCall('Party Joined: Bartz'), Nop(), Nop(), Nop()])
         elif self.options.bring_your_granddaughter_to_work_day:
-            script_patch_file += f"Assets/GameAssets/Serial/Res/Map/Map_20250/Map_20250/sc_e_0001,/Mnemonics/[3],SysCall,Overwrite,0\n"
-            script_patch_file += "[" + GetJsonSysCallObj('Party Joined: Galuf') + ',' + GetJsonSysCallObj('Party Joined: Krile') + ',' + GetJsonSysCallObj('Party Left: Bartz') + ',' + GetNoOpObj() + "]\n\n"  # Two newlines are necessary
+            party_patch = ('bring_your_granddaughter_to_work_day', [SysCall('Party Joined: Galuf'), SysCall('Party Joined: Krile'), SysCall('Party Left: Bartz'), Nop()])
+        if party_patch is not None:
+            header = "Assets/GameAssets/Serial/Res/Map/Map_20250/Map_20250/sc_e_0001,/Mnemonics/[3],SysCall,Overwrite,0"
+            script_patch_file.append(header + "\n")
+            script_patch_file.append(encode_mnemonics(party_patch[1], self.output_format) + "\n\n")  # Two newlines are necessary
+            patch_writes.add_script(header, party_patch[1], party_patch[0], overrides=True)   # Replaces the party from "New Game Open World"
 
         # If our starting job is not 'Freelancer', we need to add the new starting job... AND remove Freelancer
         fjId = None
@@ -1296,150 +1541,80 @@ class FF5PRWorld(World):
             # Now do some patching
             #if fjId:
                 # Actually, we need to do this in the game engine; the .csvs don't quite do it right.
-                #master_csvs_file += "# Switch the first unlocked job\n"
-                #master_csvs_file += "Assets/GameAssets/Serial/Data/Master/initialize_data\n"
-                #master_csvs_file += "id,value1\n"
-                #master_csvs_file += f"35,{fjId}\n"  # id:35 == INT_JOB_1
-                #master_csvs_file += "\n"
+                #master_csvs_file.append("# Switch the first unlocked job\n")
+                #master_csvs_file.append("Assets/GameAssets/Serial/Data/Master/initialize_data\n")
+                #master_csvs_file.append("id,value1\n")
+                #master_csvs_file.append(f"35,{fjId}\n")  # id:35 == INT_JOB_1
+                #master_csvs_file.append("\n")
                 #
-                #master_csvs_file += "# Set all characters to start with this job (this will also eliminate Freelancer)\n"
-                #master_csvs_file += "Assets/GameAssets/Serial/Data/Master/character_status\n"
-                #master_csvs_file += "id,job_id\n"
-                #master_csvs_file += f"1,{fjId}\n"  # Bartz
-                #master_csvs_file += f"2,{fjId}\n"  # Lenna
-                #master_csvs_file += f"3,{fjId}\n"  # Galuf
-                #master_csvs_file += f"4,{fjId}\n"  # Faris
-                #master_csvs_file += f"5,{fjId}\n"  # Krile
-                #master_csvs_file += f"6,{fjId}\n"  # Bartz again!
-                #master_csvs_file += "\n"
+                #master_csvs_file.append("# Set all characters to start with this job (this will also eliminate Freelancer)\n")
+                #master_csvs_file.append("Assets/GameAssets/Serial/Data/Master/character_status\n")
+                #master_csvs_file.append("id,job_id\n")
+                #master_csvs_file.append(f"1,{fjId}\n")  # Bartz
+                #master_csvs_file.append(f"2,{fjId}\n")  # Lenna
+                #master_csvs_file.append(f"3,{fjId}\n")  # Galuf
+                #master_csvs_file.append(f"4,{fjId}\n")  # Faris
+                #master_csvs_file.append(f"5,{fjId}\n")  # Krile
+                #master_csvs_file.append(f"6,{fjId}\n")  # Bartz again!
+                #master_csvs_file.append("\n")
 
                 # Also patch in our script command to remove the Freelancer job
-                #script_patch_file += f"Assets/GameAssets/Serial/Res/Map/Map_20250/Map_20250/sc_e_0001,/Mnemonics/[8],Nop:RemoveFreelancer,Overwrite,0\n"
-                #script_patch_file += "[" + GetJsonSysCallObj('RemoveFreelancer') + "]\n\n"  # Two newlines are necessary
+                #script_patch_file.append(f"Assets/GameAssets/Serial/Res/Map/Map_20250/Map_20250/sc_e_0001,/Mnemonics/[8],Nop:RemoveFreelancer,Overwrite,0\n")
+                #script_patch_file.append(encode_mnemonics([SysCall('RemoveFreelancer')], self.output_format) + "\n\n")  # Two newlines are necessary
             #else:
             #    print(f"ERROR: Could not find job ID for job '{self.firstJob}'")
 
         # Prepare our various .csv patches (things like items, etc.)
-        # TODO: Not exactly sure how to organize this...
-        master_csvs_file += "# Add any new items\n"
-        master_csvs_file += "Assets/GameAssets/Serial/Data/Master/item\n"
-        master_csvs_file += "+id,sort_id,type_id,system_id,item_lv,attribute_id,accuracy_rate,destroy_rate,standard_value,renge_id,menu_renge_id,battle_renge_id,invalid_reflection,period_id,throw_flag,preparation_flag,drink_flag,machine_flag,condition_group_id,battle_effect_asset_id,menu_se_asset_id,menu_function_group_id,battle_function_group_id,buy,sell,sales_not_possible\n"
-        master_csvs_file += "58,58,2,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0\n"   # "Server Connection" key item
-        master_csvs_file += "59,59,2,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1,0,1\n"   # "Display" Normal Item (Content Type 1) (Item Type 2 == Key)
-        master_csvs_file += "60,60,2,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0\n"   # Tells you the "Win Condition" (key item)
-        # system_id=1 (restorative), destroy_rate=0 (infinite use), standard_value=100 (no idea), renge_id=2 (Custom (like Ramuh)), preparation_flag=0 (don't use in Mix), menu_function_group_id=83 (?teleport?)
-        master_csvs_file += "61,61,1,1,0,0,100,0,100,2,2,2,1,0,0,0,0,0,0,0,255,83,0,1,1,1\n"   # "Teleport to World 1", given to you when you unlock World 1 (i.e., at the beginning)
-        master_csvs_file += "\n"
-        # 
-        master_csvs_file += "# ...and their content entries\n"
-        master_csvs_file += "Assets/GameAssets/Serial/Data/Master/content\n"
-        master_csvs_file += "+id,mes_id_name,mes_id_battle,mes_id_description,icon_id,type_id,type_value\n"
-        master_csvs_file += "1691,MSG_RANDO_SERVER_ITEM_NAME,None,MSG_RANDO_SERVER_ITEM_DESC,0,1,58\n"
-        master_csvs_file += "1692,MSG_RANDO_WINCONDITION_ITEM_NAME,None,MSG_RANDO_WINCONDITION_ITEM_DESC,0,1,60\n"
-        master_csvs_file += "5000,MSG_TELEPORT_WORLD1_ITEM_NAME,None,MSG_TELEPORT_WORLD1_ITEM_DESC,0,1,61\n"
-        master_csvs_file += "\n"
+        master_csvs_file.append(get_shared_block('new_item_rows', self.gen_new_item_rows))
 
         # Add our new item name/descriptions to system
-        system_strings_file = "Assets/GameAssets/Serial/Data/Message/system_en\n"
-        system_strings_file += f"MSG_RANDO_SERVER_ITEM_NAME,<IC_BRS>Server Connection\n"
-        system_strings_file += f"MSG_RANDO_SERVER_ITEM_DESC,TBD\n"   # Will be intercepted by the engine
-        system_strings_file += f"MSG_RANDO_WINCONDITION_ITEM_NAME,<IC_BRS>Win Condition\n"
-        system_strings_file += f"MSG_RANDO_WINCONDITION_ITEM_DESC,To complete World 1, you need to find {int(self.options.jobs_for_world1_completion)} Jobs\n"
-        system_strings_file += f"MSG_TELEPORT_WORLD1_ITEM_NAME,<IC_TMGC>Teleport Stone (World 1)\n"
-        system_strings_file += f"MSG_TELEPORT_WORLD1_ITEM_DESC,Teleports you to the World 1 map. Infinite uses. Save first; it's buggy!\n"
+        # (Only the Win Condition description differs between players.)
+        system_strings_file = [ get_shared_block('system_strings_head', lambda: [
+          "Assets/GameAssets/Serial/Data/Message/system_en\n",
+          "MSG_RANDO_SERVER_ITEM_NAME,<IC_BRS>Server Connection\n",
+          "MSG_RANDO_SERVER_ITEM_DESC,TBD\n",   # Will be intercepted by the engine
+          "MSG_RANDO_WINCONDITION_ITEM_NAME,<IC_BRS>Win Condition\n",
+        ]) ]
+        system_strings_file.append(f"MSG_RANDO_WINCONDITION_ITEM_DESC,To complete World 1, you need to find {int(self.options.jobs_for_world1_completion)} Jobs\n")
+        system_strings_file.append(get_shared_block('system_strings_teleport', lambda: [
+          "MSG_TELEPORT_WORLD1_ITEM_NAME,<IC_TMGC>Teleport Stone (World 1)\n",
+          "MSG_TELEPORT_WORLD1_ITEM_DESC,Teleports you to the World 1 map. Infinite uses. Save first; it's buggy!\n",
+        ]))
         for key, val in system_extra_messages.items():
-            system_strings_file += f"{key},{val}\n"
+            system_strings_file.append(f"{key},{val}\n")
 
-        # Remove all (relevant) boss drops and give them XP
-        # I think that "drop1" and "drop2" might have something to do with normal vs. rare drops (so bosses list the same item in both, but you only get one...)
-        # TODO: Yeah, we really need to organize this...
-        master_csvs_file += "# Add EXP to bosses but remove their drops (they're in the item pool)\n"
-        master_csvs_file += "Assets/GameAssets/Serial/Data/Master/monster\n"
-        master_csvs_file += "id,exp,drop_content_id1,drop_content_id1_value,drop_content_id2,drop_content_id2_value\n"
-        master_csvs_file += "283,210,0,0,0,0\n"   # Karlabos
-        master_csvs_file += "285,400,0,0,0,0\n"   # Siren
-        master_csvs_file += "286,400,0,0,0,0\n"   # Siren (Undead)
-        master_csvs_file += "287,530,0,0,0,0\n"   # Forza
-        master_csvs_file += "288,530,0,0,0,0\n"   # Magissa
-        master_csvs_file += "317,650,0,0,0,0\n"   # Shiva
-        #master_csvs_file += "293,650,0,0,0,0\n"  # Ice Commander (already drops nothing)
-        master_csvs_file += "54,1950,0,0,0,0\n"   # Ifrit (Note: 233 is also him, but I'm not sure why)
-        master_csvs_file += "33,1950,0,0,0,0\n"   # Byblos (Note: 515 is also him; no idea why)
-        master_csvs_file += "294,3070,0,0,0,0\n"  # Sandworm
-        #master_csvs_file += "295,0,0,0,0,0\n"    # Hole (already drops nothing)
-        master_csvs_file += "364,3900,0,0,0,0\n"  # Cray Claw
-        master_csvs_file += "296,4000,0,0,0,0\n"  # Adamantoise
-        master_csvs_file += "300,4100,0,0,0,0\n"  # Soul Cannon
-        #master_csvs_file += "371,4100,0,0,0,0\n" # Launcher - skipped (leave drops/xp intact)
-        master_csvs_file += "307,4100,0,0,0,0\n"  # Titan
-        master_csvs_file += "306,4100,0,0,0,0\n"  # Chimera Brain
-        master_csvs_file += "\n"
-
-        # Keep "crystal" boss drops (and ramuh, etc.), but give them XP
-        master_csvs_file += "# Add EXP to bosses (and keep their drops) if their items don't go into the item pool\n"
-        master_csvs_file += "Assets/GameAssets/Serial/Data/Master/monster\n"
-        master_csvs_file += "id,exp\n"
-        master_csvs_file += "281,200\n"   # Wing Raptor
-        master_csvs_file += "282,200\n"   # Wing Raptor (Closed)
-        master_csvs_file += "289,1120\n"  # Galura
-        master_csvs_file += "290,1410\n"  # Liquid Flame
-        master_csvs_file += "291,1410\n"  # Liquid Flame (Alt. Form 2)
-        master_csvs_file += "292,1410\n"  # Liquid Flame (Alt. Form 3)
-        master_csvs_file += "40,1500\n"   # Ramuh - should be in item pool but isn't (Note: he's also at 234)
-        master_csvs_file += "301,4500\n"  # Archaeoavis
-        master_csvs_file += "302,4500\n"  # Archaeoavis (Form 2)
-        master_csvs_file += "303,4500\n"  # Archaeoavis (Form 3)
-        master_csvs_file += "304,4500\n"  # Archaeoavis (Form 4)
-        master_csvs_file += "305,4500\n"  # Archaeoavis (Form 5)
-        master_csvs_file += "308,666\n"   # Purobolos (there's 6 of them, and they drop potions)
-        master_csvs_file += "\n"
-
-        # ...and give the bosses AP (via their encounters)
-        master_csvs_file += "# Adjust boss AP amounts via their encounters\n"
-        master_csvs_file += "Assets/GameAssets/Serial/Data/Master/monster_party\n"
-        master_csvs_file += "id,get_ap\n"
-        master_csvs_file += "440,10\n"   # Wing Raptor
-        master_csvs_file += "441,10\n"   # Karlabos
-        master_csvs_file += "442,10\n"   # Siren
-        master_csvs_file += "443,11\n"   # Magissa and Forza - TODO: Confirm; this weird in the data.
-        master_csvs_file += "444,13\n"   # Galura
-        master_csvs_file += "498,20\n"   # Shiva (& Ice Commander)
-        master_csvs_file += "445,15\n"   # Liquid Flame
-        master_csvs_file += "654,16\n"   # Liquid Flame (Note: Unclear why this encounter exists, but its AP is consistent. I'm changing it, but giving it distinct AP so we can track it...)
-        master_csvs_file += "655,17\n"   # Liquid Flame (Note: Unclear why this encounter exists, but its AP is consistent. I'm changing it, but giving it distinct AP so we can track it...)
-        master_csvs_file += "495,20\n"   # Ifrit
-        master_csvs_file += "447,20\n"   # Byblos
-        master_csvs_file += "77,20\n"    # Ramuh
-        master_csvs_file += "448,15\n"   # Sandworm + Holes
-        master_csvs_file += "507,20\n"   # Cray Claw
-        master_csvs_file += "449,15\n"   # Adamantoise
-        master_csvs_file += "452,20\n"   # Soul Cannon & Launchers
-        master_csvs_file += "453,20\n"   # Archeoaevis  (TODO: There's a *bunch* of these, no idea why)
-        master_csvs_file += "456,20\n"   # Purobolos
-        master_csvs_file += "455,20\n"   # Titan
-        master_csvs_file += "454,20\n"   # Chimera Brain
-        master_csvs_file += "\n"
+        # Give bosses EXP+AP, and remove the drops that are in the item pool
+        master_csvs_file.append(get_shared_block('boss_reward_rows', self.gen_boss_reward_rows))
 
 
         # Some stuff is required to interact with the multiworld server, or for general bookkeeping
         # We'll store this all into one big JSON object that the C# app can read and make use of
-        multiworld_data_file = self.serialize_multiworl_data(location_cid_to_item_cid, special_shop_str, special_item_str, mundane_prog_items, fjId, teleport_failsafe)
+        multiworld_data_file = self.serialize_multiworl_data(location_cid_to_item_cid, shop_item_to_location_revlookup, item_cid_to_action, mundane_prog_items, fjId, teleport_failsafe)
+
+        # Make sure none of our patches step on each other
+        self.metrics.start_step('check_patch_writes')
+        patch_writes.check(self.patch_conflicts, self.multiworld.get_player_name(self.player))
+        self.metrics.end_step('check_patch_writes')
 
         # Create a path to the patched ".zip" file":
         file_path = os.path.join(output_directory, f"{self.multiworld.get_out_file_name_base(self.player)}.apff5pr")
         
         # Write our various small files into one big zip file
         APFF5PR = APFF5PRFile(file_path, player=self.player, player_name=self.multiworld.player_name[self.player])
-        with zipfile.ZipFile(file_path, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=3) as zf:
-            zf.writestr("treasure_mod.csv", treasure_mod_file)
-            zf.writestr("script_patch.csv", script_patch_file)
-            zf.writestr("system_strings.csv", system_strings_file)
-            zf.writestr("message_strings.csv", message_strings_file)
-            zf.writestr("nameplate_strings.csv", nameplate_strings_file)
-            zf.writestr("multiworld_data.json", multiworld_data_file)
-            zf.writestr("master_csvs.json", master_csvs_file)
-        
-            APFF5PR.write_contents(zf)
+        # (Each one is compressed as the host asked; see CompressionPlan in Output.py.)
+        self.metrics.start_step('write_zip')
+        write_archive(file_path, [
+            ("treasure_mod.csv", treasure_mod_file),
+            ("script_patch.csv", script_patch_file),
+            ("system_strings.csv", system_strings_file),
+            ("message_strings.csv", message_strings_file),
+            ("nameplate_strings.csv", nameplate_strings_file),
+            ("multiworld_data.json", multiworld_data_file),
+            ("master_csvs.json", master_csvs_file),
+        ], self.compression, finish=APFF5PR.write_contents)
+        self.metrics.end_step('write_zip')
+
+        return file_path
 
 
 # I guess this is how we indicate what our patch files look like?